@@ -0,0 +1 @@
+"""Бенчмарки конвейера бота."""
@@ -0,0 +1,74 @@
+"""
+Стоимость раздачи событий по шине при одном и нескольких приёмниках.
+
+Запуск: python -m benchmarks.bench_bus --events 10000 --sinks 1 4 8
+"""
+import argparse
+import tempfile
+import time
+
+from events import AuditSink, EventBus
+
+ROW = '{:>6} {:>8} {:>16} {:>14} {:>14}'
+
+
+def noop(homework, message):
+    """Приёмник, который ничего не делает."""
+    return True
+
+
+def slow(homework, message):
+    """Медленный приёмник, как внешний вебхук."""
+    time.sleep(0.01)
+    return True
+
+
+def run(events, sinks, directory):
+    """Публикует события и замеряет стоимость публикации и доставку."""
+    bus = EventBus(sinks, capacity=events, spill_dir=directory)
+    homework = {'id': 1, 'homework_name': 'hw.zip', 'status': 'approved'}
+    started = time.perf_counter()
+    for number in range(events):
+        bus.publish(homework, f'Событие {number}')
+    published = time.perf_counter() - started
+    fast = [name for name in sinks if name != 'slow']
+    while any(
+        bus.executors[name].stats()['delivered'] < events for name in fast
+    ):
+        time.sleep(0.001)
+    drained = time.perf_counter() - started
+    bus.shutdown(drain=False)
+    return published, drained
+
+
+def main():
+    """Запускает бенчмарк."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--sinks', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+    print(ROW.format(
+        'sinks', 'slow', 'publish us/evt', 'drain s', 'events/s'
+    ))
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.sinks:
+            for with_slow in (False, True):
+                sinks = {
+                    f'audit{number}': AuditSink(
+                        f'{directory}/audit{number}.jsonl', 'bench'
+                    )
+                    for number in range(count - 1)
+                }
+                sinks['noop'] = noop
+                if with_slow:
+                    sinks['slow'] = slow
+                published, drained = run(args.events, sinks, directory)
+                print(ROW.format(
+                    count, 'yes' if with_slow else 'no',
+                    f'{published / args.events * 1e6:.1f}',
+                    f'{drained:.2f}', f'{args.events / drained:.0f}'
+                ))
+
+
+if __name__ == '__main__':
+    main()
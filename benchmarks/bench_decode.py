@@ -0,0 +1,49 @@
+"""
+Сравнение JSON-декодеров на ответах API разного размера.
+
+Запуск: python -m benchmarks.bench_decode --sizes 1 10 100 1000 10000
+"""
+import argparse
+import json
+import timeit
+
+from benchmarks.workload import Workload
+from decoders import DECODERS
+from homework import check_response
+
+ROW = '{:>9} {:>10} {:<14} {:>12} {:>10}'
+
+
+def text_then_json(content):
+    """Путь requests.Response.json: байты в текст, затем json.loads."""
+    return json.loads(content.decode('utf-8'))
+
+
+def main():
+    """Запускает бенчмарк."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000]
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--comment-length', type=int, default=200)
+    args = parser.parse_args()
+    decoders = dict(text_then_json=text_then_json, **DECODERS)
+    workload = Workload(comment_length=args.comment_length)
+    print(ROW.format('homeworks', 'bytes', 'decoder', 'us/response', 'MB/s'))
+    for size in args.sizes:
+        content = workload.payload_bytes(0, size=size)
+        number = max(1, 20000 // size)
+        for name, decode in decoders.items():
+            seconds = min(timeit.repeat(
+                lambda: check_response(decode(content)),
+                number=number, repeat=args.repeat
+            )) / number
+            print(ROW.format(
+                size, len(content), name, f'{seconds * 1e6:.1f}',
+                f'{len(content) / seconds / 1e6:.0f}'
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Время восстановления и уведомления после сбоев API и Telegram.
+
+Для каждого типа сбоя бот проходит циклы опроса на симулированных
+часах. Вердикт по работе появляется в начале сбоя; сбой начинается
+в разных фазах периода опроса. time-to-recover — от конца сбоя до
+первого успешного запроса (для Telegram — доставки), time-to-notify —
+от появления вердикта до его доставки.
+
+Запуск: python -m benchmarks.bench_faults --durations 60 900 --phases 10
+"""
+import argparse
+import json
+import logging
+
+import homework
+from faults import KINDS, TELEGRAM_DOWN, Fault, FaultInjector
+from transport import Response
+
+ROW = '{:<14} {:>9} {:>10} {:>10} {:>10} {:>10} {:>9}'
+START = 1700000000
+
+
+class SimClock:
+    """Симулированные часы: sleep только сдвигает время."""
+
+    def __init__(self, now=START):
+        """Задаёт начальное время."""
+        self.now = now
+
+    def time(self):
+        """Текущее время."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Сдвигает время."""
+        self.now += seconds
+
+
+class FakeApi:
+    """API домашки с одной работой, которая принимается в verdict_at."""
+
+    def __init__(self, clock, verdict_at):
+        """Задаёт момент вердикта."""
+        self.clock = clock
+        self.verdict_at = verdict_at
+
+    def get(self, url, headers=None, params=None):
+        """Отвечает текущим статусом работы."""
+        now = self.clock.time()
+        status = 'approved' if now >= self.verdict_at else 'reviewing'
+        return Response(200, json.dumps({
+            'homeworks': [{
+                'id': 1, 'homework_name': 'hw.zip', 'status': status,
+                'reviewer_comment': '', 'lesson_name': 'bot',
+            }],
+            'current_date': int(now),
+        }).encode())
+
+
+def recovered_at(injector, kind, end):
+    """Первый успешный запрос или доставка после конца сбоя."""
+    moments = (
+        [sent[0] for sent in injector.sent] if kind == TELEGRAM_DOWN
+        else injector.served
+    )
+    return next((moment for moment in moments if moment >= end), None)
+
+
+def notified_at(injector):
+    """Момент доставки вердикта."""
+    return next((
+        moment for moment, work, _ in injector.sent
+        if work is not None and work['status'] == 'approved'
+    ), None)
+
+
+def scenario(kind, duration, offset, latency):
+    """
+    Прогоняет один сбой.
+
+        Возвращаемое значение (tuple): time-to-recover, time-to-notify
+            и число сообщений о сбоях.
+    """
+    clock = SimClock()
+    fault = Fault(kind, START + offset, duration, latency)
+    end = fault.start + duration
+    injector = FaultInjector([fault], clock.time, clock.sleep)
+    homework.TRANSPORT = injector.wrap_transport(
+        FakeApi(clock, fault.start)
+    )
+    sender = injector.wrap_sender(lambda work, message: True)
+    state = homework.create_state(clock.time, clock.sleep)
+    while clock.time() < end + 20 * homework.RETRY_PERIOD:
+        homework.run_cycle(sender, state)
+        recovered = recovered_at(injector, kind, end)
+        notified = notified_at(injector)
+        if recovered is not None and notified is not None:
+            break
+        clock.sleep(homework.RETRY_PERIOD)
+    failures = sum(work is None for _, work, _ in injector.sent)
+    return (
+        None if recovered is None else recovered - end,
+        None if notified is None else notified - fault.start,
+        failures
+    )
+
+
+def summary(values):
+    """Среднее и максимум в минутах."""
+    values = [value for value in values if value is not None]
+    if not values:
+        return '-', '-'
+    return (
+        f'{sum(values) / len(values) / 60:.1f}', f'{max(values) / 60:.1f}'
+    )
+
+
+def main():
+    """Запускает сценарии сбоев и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--kinds', nargs='+', default=list(KINDS))
+    parser.add_argument('--durations', type=float, nargs='+',
+                        default=[60, 900, 3600])
+    parser.add_argument('--phases', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    transport = homework.TRANSPORT
+    print(ROW.format(
+        'fault', 'duration', 'ttr avg', 'ttr max', 'ttn avg', 'ttn max',
+        'failures'
+    ))
+    try:
+        for kind in args.kinds:
+            for duration in args.durations:
+                results = [
+                    scenario(
+                        kind, duration,
+                        1 + phase * homework.RETRY_PERIOD / args.phases,
+                        args.latency
+                    )
+                    for phase in range(args.phases)
+                ]
+                recover, notify, failures = zip(*results)
+                print(ROW.format(
+                    kind, f'{duration / 60:.0f} min', *summary(recover),
+                    *summary(notify), f'{sum(failures) / len(results):.1f}'
+                ))
+    finally:
+        homework.TRANSPORT = transport
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Стоимость записи в журнал сырых ответов и поиска по нему.
+
+Запуск: python -m benchmarks.bench_journal --writes 20000 --tenants 1000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.workload import Workload
+from journal import Journal
+
+ROW = '{:>8} {:>10} {:>12} {:>10} {:>14}'
+
+
+def main():
+    """Запускает бенчмарк."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writes', type=int, default=20000)
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--segment', type=int, default=4 * 1024 * 1024)
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+    workload = Workload(tenants=args.tenants, comment_length=200)
+    print(ROW.format('homework', 'raw bytes', 'append us', 'ratio',
+                     'lookup us'))
+    for size in args.sizes:
+        bodies = [
+            workload.payload_bytes(tenant, size=size)
+            for tenant in range(min(args.tenants, 100))
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            journal = Journal(directory, args.segment)
+            started = time.perf_counter()
+            for number in range(args.writes):
+                journal.append(
+                    number % args.tenants, 200,
+                    bodies[number % len(bodies)], 1700000000 + number
+                )
+            append = (time.perf_counter() - started) / args.writes
+            stored = sum(
+                os.path.getsize(os.path.join(directory, name))
+                for name in os.listdir(directory) if name.endswith('.log')
+            )
+            raw = sum(
+                len(bodies[number % len(bodies)])
+                for number in range(args.writes)
+            )
+            rng = random.Random(0)
+            started = time.perf_counter()
+            for _ in range(args.lookups):
+                since = 1700000000 + rng.randrange(args.writes)
+                journal.lookup(
+                    rng.randrange(args.tenants), since, since + 10000
+                )
+            lookup = (time.perf_counter() - started) / args.lookups
+            journal.close()
+        print(ROW.format(
+            size, len(bodies[0]), f'{append * 1e6:.1f}',
+            f'{raw / stored:.1f}x', f'{lookup * 1e6:.0f}'
+        ))
+
+
+if __name__ == '__main__':
+    main()
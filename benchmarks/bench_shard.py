@@ -0,0 +1,98 @@
+"""
+Масштабирование разбора ответов API по числу процессов-обработчиков.
+
+Арендаторы раскладываются по процессам консистентным хешированием,
+каждый процесс декодирует ответы своих арендаторов, проверяет их
+check_response и готовит сообщения parse_status. Время считается
+от общего старта до отчёта последнего процесса. Ускорение ограничено
+числом ядер машины: на одном ядре оно около 1x, поэтому выводы
+о масштабировании делаются только по запуску на нескольких ядрах.
+
+Запуск: python -m benchmarks.bench_shard --tenants 4000 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.workload import Workload
+from homework import check_response, parse_status
+from shard import Supervisor
+
+ROW = '{:>8} {:>9} {:>12} {:>10} {:>11}'
+
+
+def bench_worker(node, tenants, control, metrics):
+    """Обработчик: готовит ответы, ждёт старта и разбирает их."""
+    rounds = tenants[0]['rounds'] if tenants else 0
+    workload = Workload(comment_length=200)
+    payloads = [
+        workload.payload_bytes(tenant['id'], size=tenant['size'])
+        for tenant in tenants
+    ]
+    metrics.put(dict(node=node, ready=True))
+    control.get()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for payload in payloads:
+            for homework in check_response(json.loads(payload)):
+                parse_status(homework)
+    metrics.put(dict(
+        node=node, tenants=len(tenants), cycles=rounds * len(tenants),
+        round=time.perf_counter() - started
+    ))
+    control.get()
+
+
+def run(tenants, workers):
+    """Время разбора всех арендаторов на workers процессах."""
+    supervisor = Supervisor(
+        bench_worker, tenants, workers, key=lambda tenant: tenant['id']
+    ).start()
+    for _ in range(workers):
+        supervisor.metrics_queue.get()
+    started = time.perf_counter()
+    for node in range(workers):
+        supervisor.controls[node].put('go')
+    for _ in range(workers):
+        metrics = supervisor.metrics_queue.get()
+        supervisor.metrics[metrics['node']] = metrics
+    elapsed = time.perf_counter() - started
+    stats = supervisor.stats()
+    supervisor.stop()
+    return elapsed, stats
+
+
+def main():
+    """Запускает бенчмарк."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tenants', type=int, default=4000)
+    parser.add_argument('--size', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument(
+        '--workers', type=int, nargs='+',
+        default=sorted({1, 2, max(1, os.cpu_count() or 1)})
+    )
+    args = parser.parse_args()
+    tenants = [
+        dict(id=number, size=args.size, rounds=args.rounds)
+        for number in range(args.tenants)
+    ]
+    print(f'ядер: {os.cpu_count()}')
+    print(ROW.format(
+        'workers', 'seconds', 'tenants/s', 'speedup', 'imbalance'
+    ))
+    baseline, _ = run(tenants, 1)
+    for workers in args.workers:
+        elapsed, stats = run(tenants, workers)
+        shards = [item['tenants'] for item in stats['per_worker'].values()]
+        print(ROW.format(
+            workers, f'{elapsed:.2f}',
+            f'{args.tenants * args.rounds / elapsed:.0f}',
+            f'{baseline / elapsed:.2f}x',
+            f'{max(shards) / (sum(shards) / len(shards)):.2f}'
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Сравнение транспортов get_api_answer при множестве арендаторов.
+
+Запуск: python -m benchmarks.bench_transport --tenants 1000
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_server import FakeServer
+from transport import AsyncTransport, RequestsTransport
+
+ROW = '{:<10} {:>10} {:>10} {:>12} {:>10}'
+
+
+def request_params(server, tenants):
+    """Готовит параметры запросов для каждого арендатора."""
+    return [
+        dict(
+            url=server.url,
+            headers={'Authorization': f'OAuth token-{tenant}'},
+            params={'from_date': 0}
+        )
+        for tenant in range(tenants)
+    ]
+
+
+def peak_threads(stop, result):
+    """Отслеживает максимальное число живых потоков."""
+    while not stop.is_set():
+        result[0] = max(result[0], threading.active_count())
+        time.sleep(0.001)
+
+
+def measure(name, server, run):
+    """Замеряет сокеты, потоки и пропускную способность прогона."""
+    server.reset()
+    stop = threading.Event()
+    threads = [threading.active_count()]
+    monitor = threading.Thread(target=peak_threads, args=(stop, threads))
+    monitor.start()
+    started = time.perf_counter()
+    responses = run()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    monitor.join()
+    failed = sum(
+        1 for response in responses
+        if isinstance(response, Exception) or response.status_code != 200
+    )
+    print(ROW.format(
+        name, server.connections_total, threads[0] - 1,
+        f'{len(responses) / elapsed:.0f}', failed
+    ))
+
+
+def run_threads(params):
+    """Один поток на каждый запрос через requests."""
+    transport = RequestsTransport()
+
+    def get(kwargs):
+        try:
+            return transport.get(**kwargs)
+        except Exception as error:
+            return error
+
+    with ThreadPoolExecutor(max_workers=len(params)) as executor:
+        return list(executor.map(get, params))
+
+
+def main():
+    """Запускает бенчмарк."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--connections', type=int, default=4)
+    args = parser.parse_args()
+    with FakeServer(latency=args.latency) as server:
+        params = request_params(server, args.tenants)
+        print(ROW.format('transport', 'sockets', 'threads', 'req/s', 'failed'))
+        measure('threads', server, lambda: run_threads(params))
+        transport = AsyncTransport(connections=args.connections)
+        transport.ensure_loop()
+        measure('async', server, lambda: transport.get_many(params))
+        transport.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Время от перезапуска обработчика доли до первого опроса.
+
+Для --tenants арендаторов с --homeworks работами каждый строится
+состояние после одного опроса и сохраняется двумя способами:
+водяные знаки и снимки в SQLite (холодный старт читает их по строке
+на арендатора) и образ состояний state_image (тёплый старт отображает
+его в память и читает только горячие поля). Для каждого способа
+печатается время до готовности всех состояний и первого опроса,
+время полной загрузки всех состояний и размер хранилища; строка
+empty — те же состояния без сохранённых данных, то есть цена самих
+объектов, общая для обоих способов. Кеш работ
+для /status есть только в образе, из SQLite он не восстанавливается.
+Файлы читаются из кеша страниц ОС, как при перезапуске процесса
+на той же машине.
+
+Запуск: python -m benchmarks.bench_warmstart --tenants 100000
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import tempfile
+import time
+
+import homework
+from benchmarks.workload import Workload
+from state_image import StateImage, write_image
+from watermark import UPSERT, WatermarkStore
+
+ROW = '{:<6} {:>9} {:>14} {:>12} {:>10}'
+
+
+def tenant(number):
+    """Арендатор в формате SHARD_TENANTS."""
+    return {'id': f't{number}', 'token': 'token', 'chat_id': number}
+
+
+def build(tenants, homeworks):
+    """Состояния арендаторов после одного опроса."""
+    workload = Workload(homeworks=homeworks, comment_length=200)
+    states = {}
+    for number in range(tenants):
+        response = workload.payload(number)
+        state = homework.create_tenant_state(tenant(number))
+        state.fetch = lambda timestamp, response=response: response
+        homework.run_cycle(lambda homework, message: True, state)
+        states[state.tenant] = state
+    return states
+
+
+def save_rows(path, states):
+    """Пишет водяные знаки одной транзакцией."""
+    store = WatermarkStore(path)
+    with store.connection:
+        store.connection.executemany(UPSERT, [
+            (key, json.dumps(state.checkpoint(), ensure_ascii=False), 0)
+            for key, state in states.items()
+        ])
+    store.connection.close()
+
+
+def restart(tenants, first, watermarks=None, image=None):
+    """
+    Строит состояния, как shard_worker после запуска, и опрашивает первое.
+
+        Возвращаемое значение (tuple): время до первого опроса,
+            время полной загрузки и состояния.
+    """
+    started = time.perf_counter()
+    states = [
+        homework.create_tenant_state(
+            tenant(number), watermarks=watermarks, image=image
+        )
+        for number in range(tenants)
+    ]
+    states[0].fetch = lambda timestamp: first
+    states[0].watermarks = None
+    homework.run_cycle(lambda homework, message: True, states[0])
+    ready = time.perf_counter() - started
+    for state in states:
+        state.warm()
+    return ready, time.perf_counter() - started, states
+
+
+def main():
+    """Сравнивает холодный и тёплый старт."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tenants', type=int, default=20000)
+    parser.add_argument('--homeworks', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    states = build(args.tenants, args.homeworks)
+    first = Workload(homeworks=args.homeworks, comment_length=200).payload(0)
+    last = f't{args.tenants - 1}'
+    print(ROW.format('start', 'tenants', 'first poll s', 'all warm s', 'MB'))
+    with tempfile.TemporaryDirectory() as directory:
+        rows = os.path.join(directory, 'watermarks.sqlite3')
+        save_rows(rows, states)
+        image_path = os.path.join(directory, 'shard-0.img')
+        write_image(image_path, states, homework.tenant_priority)
+        store = WatermarkStore(rows)
+        image = StateImage(image_path)
+        for name, options, path in (
+            ('empty', {}, None),
+            ('cold', dict(watermarks=store), rows),
+            ('warm', dict(image=image), image_path),
+        ):
+            gc.collect()
+            ready, warm, restored = restart(args.tenants, first, **options)
+            if path:
+                assert restored[-1].differ.items == states[last].differ.items
+            print(ROW.format(
+                name, args.tenants, f'{ready:.3f}', f'{warm:.3f}',
+                f'{os.path.getsize(path) / 2 ** 20:.1f}' if path else '-'
+            ))
+            del restored
+        store.connection.close()
+        image.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Размер ответа API за опрос при разных правилах сдвига from_date.
+
+Хронология статусов --students студентов одного арендатора (например,
+аккаунта куратора) воспроизводится на
+симулированных часах в течение нескольких недель. Сервер отдаёт
+последние версии работ с date_updated не раньше from_date. Старое
+правило сдвигает from_date только после доставленных изменений,
+новое — к current_date на каждом успешном опросе с перекрытием.
+Доля --failure-rate отправок в Telegram завершается ошибкой.
+Для каждой недели печатаются средний и максимальный размер ответа
+и время его декодирования.
+
+Запуск: python -m benchmarks.bench_watermark --weeks 8 --failure-rate 0.05
+"""
+import argparse
+import json
+import logging
+import random
+import time
+from bisect import bisect_right
+
+import homework
+from benchmarks.bench_faults import SimClock
+from benchmarks.workload import Workload
+from history import parse_date
+
+ROW = '{:<10} {:>5} {:>7} {:>11} {:>11} {:>11}'
+WEEK = 7 * 24 * 3600
+
+
+class ReplayApi:
+    """Сервер с хронологией работ, фильтрующий их по from_date."""
+
+    def __init__(self, clock, timeline):
+        """Задаёт хронологию (время, снимок работы)."""
+        self.clock = clock
+        self.moments = [moment for moment, _ in timeline]
+        self.timeline = timeline
+        self.sizes = []
+        self.decode = []
+
+    def get_answer(self, timestamp):
+        """Ответ сервера, его размер и время декодирования."""
+        now = self.clock.time()
+        latest = {}
+        for _, work in self.timeline[:bisect_right(self.moments, now)]:
+            latest[work['id']] = work
+        payload = json.dumps({
+            'homeworks': [
+                work for work in latest.values()
+                if parse_date(work['date_updated']) >= timestamp
+            ],
+            'current_date': int(now),
+        }, ensure_ascii=False).encode()
+        started = time.perf_counter()
+        response = json.loads(payload)
+        self.decode.append(time.perf_counter() - started)
+        self.sizes.append(len(payload))
+        return response
+
+
+def legacy_cycle(sender, state):
+    """Цикл со старым правилом: from_date сдвигается после доставки."""
+    response = state.fetch(state.timestamp)
+    changes, undelivered = homework.notify_changes(
+        sender, state.differ, homework.check_response(response)
+    )
+    if changes and not undelivered:
+        state.timestamp = response.get('current_date', state.timestamp)
+
+
+def simulate(cycle, timeline, start, weeks, failure_rate):
+    """Прогоняет опросы и возвращает ответы сервера по неделям."""
+    rng = random.Random(0)
+    clock = SimClock(start)
+    api = ReplayApi(clock, timeline)
+    state = homework.create_state(clock.time, clock.sleep)
+    state.fetch = api.get_answer
+    polls = []
+    while clock.time() < start + weeks * WEEK:
+        cycle(lambda work, message: rng.random() >= failure_rate, state)
+        polls.append(int((clock.time() - start) // WEEK))
+        clock.sleep(homework.RETRY_PERIOD)
+    return polls, api.sizes, api.decode
+
+
+def main():
+    """Сравнивает правила сдвига from_date."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--weeks', type=int, default=8)
+    parser.add_argument('--students', type=int, default=20)
+    parser.add_argument('--homeworks', type=int, default=60)
+    parser.add_argument('--comment-length', type=int, default=500)
+    parser.add_argument('--overlap', type=int, default=300)
+    parser.add_argument('--failure-rate', type=float, default=0.05)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    homework.WATERMARK_OVERLAP = args.overlap
+    workload = Workload(
+        homeworks=args.homeworks, comment_length=args.comment_length,
+        review_hours=range(7, 19), review_weekdays=range(5)
+    )
+    timeline = sorted(
+        (event for student in range(args.students)
+         for event in workload.timeline(student)),
+        key=lambda event: event[0]
+    )
+    print(ROW.format(
+        'policy', 'week', 'polls', 'avg bytes', 'max bytes', 'decode us'
+    ))
+    for name, cycle in (
+        ('legacy', legacy_cycle), ('watermark', homework.run_cycle)
+    ):
+        polls, sizes, decode = simulate(
+            cycle, timeline, workload.start, args.weeks, args.failure_rate
+        )
+        for week in range(args.weeks):
+            rows = [
+                index for index, poll in enumerate(polls) if poll == week
+            ]
+            week_sizes = [sizes[index] for index in rows]
+            print(ROW.format(
+                name, week + 1, len(rows),
+                f'{sum(week_sizes) / len(rows):.0f}', max(week_sizes),
+                f'{sum(decode[index] for index in rows) / len(rows) * 1e6:.1f}'
+            ))
+
+
+if __name__ == '__main__':
+    main()
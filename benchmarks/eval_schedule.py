@@ -0,0 +1,102 @@
+"""
+Офлайн-оценка предсказательного опроса против постоянного периода.
+
+Модель обучается на первых --train-days сутках хронологии переходов,
+остальная часть воспроизводится: для каждой смены статуса считается
+задержка до первого опроса после неё.
+
+Запуск: python -m benchmarks.eval_schedule --budgets 24 48 144 [--db FILE]
+"""
+import argparse
+from bisect import bisect_left
+
+from benchmarks.workload import Workload
+from history import HistoryStore
+from poll_schedule import DAY, HazardModel, PollSchedule
+
+ROW = '{:>7} {:<11} {:>10} {:>10} {:>10} {:>10}'
+
+
+def synthetic_times(tenants, homeworks, seed):
+    """Переходы синтетической нагрузки с ревьюерами в будни днём."""
+    workload = Workload(
+        seed=seed, tenants=tenants, homeworks=homeworks,
+        review_hours=range(7, 19), review_weekdays=range(5)
+    )
+    return sorted(
+        moment
+        for tenant in range(tenants)
+        for moment, homework in workload.timeline(tenant)
+    )
+
+
+def simulate(times, next_delay, start, end):
+    """
+    Опрашивает с start до end и измеряет задержки обнаружения.
+
+        Возвращаемое значение (tuple): число опросов и список задержек.
+    """
+    polls = []
+    moment = start
+    while moment < end:
+        polls.append(moment)
+        moment += next_delay(moment)
+    latencies = []
+    for timestamp in times:
+        index = bisect_left(polls, timestamp)
+        if index < len(polls):
+            latencies.append(polls[index] - timestamp)
+    return len(polls), latencies
+
+
+def percentile(values, share):
+    """Перцентиль отсортированного списка."""
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    """Сравнивает постоянный и предсказательный опрос."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--budgets', type=int, nargs='+',
+                        default=[24, 48, 144, 288])
+    parser.add_argument('--db', help='журнал переходов HISTORY_DB')
+    parser.add_argument('--project')
+    parser.add_argument('--train-days', type=int, default=28)
+    parser.add_argument('--tenants', type=int, default=200)
+    parser.add_argument('--homeworks', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.db:
+        times = HistoryStore(args.db).transition_times(args.project)
+    else:
+        times = synthetic_times(args.tenants, args.homeworks, args.seed)
+    split = times[0] + args.train_days * DAY
+    train = [timestamp for timestamp in times if timestamp < split]
+    test = [timestamp for timestamp in times if timestamp >= split]
+    if not train or not test:
+        parser.error('мало переходов для обучения и проверки')
+    days = (test[-1] - split) / DAY
+    model = HazardModel.fit(train)
+    print(f'обучение: {len(train)} переходов, проверка: {len(test)} '
+          f'переходов за {days:.0f} сут')
+    print(ROW.format(
+        'budget', 'strategy', 'req/day', 'mean min', 'p50 min', 'p90 min'
+    ))
+    for budget in args.budgets:
+        strategies = dict(
+            fixed=lambda moment, budget=budget: DAY / budget,
+            predictive=PollSchedule(model, budget).delay,
+        )
+        for name, next_delay in strategies.items():
+            polls, latencies = simulate(test, next_delay, split, test[-1])
+            latencies.sort()
+            print(ROW.format(
+                budget, name, f'{polls / days:.0f}',
+                f'{sum(latencies) / len(latencies) / 60:.1f}',
+                f'{percentile(latencies, 0.5) / 60:.1f}',
+                f'{percentile(latencies, 0.9) / 60:.1f}'
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Локальный фейковый сервер API домашки для бенчмарков."""
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_BODY = json.dumps(
+    {'homeworks': [], 'current_date': 0}
+).encode()
+
+
+def default_handler(path, query, headers):
+    """Отвечает пустым списком домашних работ."""
+    return HTTPStatus.OK, DEFAULT_BODY
+
+
+class FakeServer:
+    """
+    HTTP/1.1 сервер с keep-alive и конвейерной обработкой запросов.
+
+    Запросы одного соединения обрабатываются конкурентно, а ответы
+    пишутся в порядке поступления запросов, как требует HTTP/1.1.
+    Сервер считает открытые соединения и обработанные запросы.
+    """
+
+    def __init__(self, handler=default_handler, latency=0.0):
+        """Задаёт обработчик запросов и задержку ответа в секундах."""
+        self.handler = handler
+        self.latency = latency
+        self.connections_total = 0
+        self.connections_open = 0
+        self.connections_peak = 0
+        self.requests_total = 0
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.port = None
+
+    @property
+    def url(self):
+        """Адрес эндпоинта домашки на фейковом сервере."""
+        return (
+            f'http://127.0.0.1:{self.port}/api/user_api/homework_statuses/'
+        )
+
+    async def respond(self, target, headers):
+        """Готовит байты HTTP-ответа на один запрос."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        parts = urlsplit(target)
+        query = {
+            key: values[0] for key, values in parse_qs(parts.query).items()
+        }
+        status, body = self.handler(parts.path, query, headers)
+        status = HTTPStatus(status)
+        head = (
+            f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Connection: keep-alive\r\n\r\n'
+        )
+        return head.encode('latin-1') + body
+
+    async def write_responses(self, writer, responses):
+        """Пишет ответы в порядке поступления запросов."""
+        while True:
+            task = await responses.get()
+            if task is None:
+                break
+            writer.write(await task)
+            await writer.drain()
+
+    async def handle(self, reader, writer):
+        """Обслуживает одно соединение."""
+        self.connections_total += 1
+        self.connections_open += 1
+        self.connections_peak = max(
+            self.connections_peak, self.connections_open
+        )
+        responses = asyncio.Queue()
+        writer_task = asyncio.create_task(
+            self.write_responses(writer, responses)
+        )
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                self.requests_total += 1
+                target = request_line.decode('latin-1').split(' ')[1]
+                responses.put_nowait(
+                    asyncio.create_task(self.respond(target, headers))
+                )
+                if headers.get('connection', '').lower() == 'close':
+                    break
+            responses.put_nowait(None)
+            await writer_task
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer_task.cancel()
+        finally:
+            self.connections_open -= 1
+            writer.close()
+
+    def start(self):
+        """Запускает сервер в фоновом потоке на свободном порту."""
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        async def serve():
+            self.server = await asyncio.start_server(
+                self.handle, '127.0.0.1', 0, backlog=4096
+            )
+            self.port = self.server.sockets[0].getsockname()[1]
+            started.set()
+
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name='fake-server', daemon=True
+        )
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(serve(), self.loop)
+        started.wait()
+        return self
+
+    def stop(self):
+        """Останавливает сервер."""
+        async def close():
+            self.server.close()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def reset(self):
+        """Обнуляет счётчики соединений и запросов."""
+        self.connections_total = 0
+        self.connections_peak = self.connections_open
+        self.requests_total = 0
+
+    def __enter__(self):
+        """Запускает сервер в контекстном менеджере."""
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        """Останавливает сервер при выходе из контекста."""
+        self.stop()
@@ -0,0 +1,347 @@
+"""
+Базовые замеры конвейера опроса и сравнение с ними.
+
+Сценарии покрывают get_api_answer -> check_response -> parse_status ->
+send_message на ответах разного размера, Telegram и сеть подменены
+заглушками в памяти. Каждый сценарий замеряется --repeat раз по кругу
+вместе с эталонным циклом на чистом Python; время делится на время
+эталона того же круга, чтобы общее замедление машины (соседи по
+CI, частота процессора) не выглядело регрессией. По выборке
+считаются среднее и 95% доверительный интервал. Результаты
+сохраняются в benchmarks/baselines/<имя>.json вместе с версией
+формата, ревизией git и окружением.
+
+compare прогоняет сценарии заново (или берёт --current) и сравнивает
+средние относительных времён по Уэлчу: изменение считается регрессией
+или улучшением, только если оно больше --threshold и доверительный
+интервал разницы не включает ноль. Между запусками на общей машине
+относительное время плавает примерно на 10%, поэтому порог
+по умолчанию 20%. При регрессиях код выхода 1.
+
+Запуск: python -m benchmarks.perf run --repeat 30 --save default
+        python -m benchmarks.perf compare default --threshold 0.2
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+import homework
+from benchmarks.workload import Workload
+from transport import Response
+
+FORMAT_VERSION = 1
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines')
+SIZES = (10, 100)
+# Двусторонние 95% квантили распределения Стьюдента для df = 1..30.
+T95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+ROW = '{:<24} {:>18} {:>18} {:>9} {:>12}'
+REGRESSION = 'регрессия'
+IMPROVEMENT = 'улучшение'
+NOISE = '~'
+REFERENCE = 'reference'
+SUMMARY = 'Регрессий: {}, улучшений: {} (порог {:.0%}, {} -> {})'
+FORMAT_MISMATCH = 'Версия формата {} в {} не поддерживается, нужна {}'
+
+
+class StaticTransport:
+    """Транспорт, отвечающий заранее готовым телом."""
+
+    def __init__(self, content):
+        """Запоминает тело ответа."""
+        self.response = Response(200, content)
+
+    def get(self, url, headers=None, params=None):
+        """Возвращает готовый ответ."""
+        return self.response
+
+
+class NullBot:
+    """Бот, который ничего не отправляет."""
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Принимает сообщение."""
+
+
+def scenarios(sizes=SIZES):
+    """
+    Сценарии замеров.
+
+        Возвращаемое значение (dict): имя -> функция без аргументов,
+            выполняющая одну операцию.
+    """
+    workload = Workload(comment_length=200)
+    bot = NullBot()
+    result = {}
+    for size in sizes:
+        content = workload.payload_bytes(0, size=size)
+        response = json.loads(content)
+        transport = StaticTransport(content)
+
+        def fetch(transport=transport):
+            homework.TRANSPORT = transport
+            return homework.get_api_answer(0)
+
+        def pipeline(fetch=fetch):
+            for work in homework.check_response(fetch()):
+                homework.send_message(bot, homework.parse_status(work))
+
+        result[f'get_api_answer/{size}'] = fetch
+        result[f'check_response/{size}'] = partial_call(
+            homework.check_response, response
+        )
+        result[f'pipeline/{size}'] = pipeline
+    work = workload.payload(0, size=1)['homeworks'][0]
+    message = homework.parse_status(work)
+    result['parse_status'] = partial_call(homework.parse_status, work)
+    result['send_message'] = partial_call(homework.send_message, bot, message)
+    return result
+
+
+def reference():
+    """Эталонная операция: фиксированный цикл на чистом Python."""
+    total = 0
+    for number in range(200):
+        total += number * number
+    return total
+
+
+def partial_call(func, *args):
+    """Функция без аргументов, вызывающая func(*args)."""
+    return lambda: func(*args)
+
+
+def calibrate(timer, target):
+    """Число вызовов, при котором замер длится около target секунд."""
+    number, _ = timer.autorange()
+    elapsed = timer.timeit(number)
+    return max(1, int(number * target / max(elapsed, 1e-9)))
+
+
+def measure(operations, repeat=10, target=0.02):
+    """
+    Выборки времени одной операции в секундах по сценариям.
+
+    Замеры сценариев чередуются по кругу, поэтому медленный дрейф
+    машины попадает в разброс каждой выборки, а не сдвигает отдельные
+    сценарии целиком.
+    """
+    timers = {
+        name: timeit.Timer(operation)
+        for name, operation in operations.items()
+    }
+    numbers = {
+        name: calibrate(timer, target) for name, timer in timers.items()
+    }
+    samples = {name: [] for name in timers}
+    for _ in range(repeat):
+        for name, timer in timers.items():
+            samples[name].append(timer.timeit(numbers[name]) / numbers[name])
+    return samples
+
+
+def t95(df):
+    """Квантиль Стьюдента для 95% интервала."""
+    if df < 1:
+        return float('inf')
+    return T95[int(df) - 1] if df <= len(T95) else 1.96
+
+
+def interval(samples):
+    """Среднее и полуширина 95% доверительного интервала."""
+    mean = statistics.fmean(samples)
+    if len(samples) < 2:
+        return mean, float('inf')
+    error = statistics.stdev(samples) / math.sqrt(len(samples))
+    return mean, t95(len(samples) - 1) * error
+
+
+def summarize(samples, reference_samples):
+    """Замер сценария: секунды, доли эталона и их интервалы."""
+    relative = [
+        value / base for value, base in zip(samples, reference_samples)
+    ]
+    mean, ci = interval(samples)
+    return dict(samples=samples, relative=relative, mean=mean, ci=ci)
+
+
+def compare(base, current, threshold):
+    """
+    Сравнивает два замера сценария по Уэлчу.
+
+        Возвращаемое значение (tuple): относительное изменение среднего,
+            полуширина его 95% интервала и вердикт.
+    """
+    a, b = base['relative'], current['relative']
+    va = statistics.variance(a) / len(a) if len(a) > 1 else 0.0
+    vb = statistics.variance(b) / len(b) if len(b) > 1 else 0.0
+    diff = statistics.fmean(b) - statistics.fmean(a)
+    if va + vb == 0:
+        half = 0.0
+    else:
+        df = (va + vb) ** 2 / (
+            (va ** 2 / (len(a) - 1) if len(a) > 1 else 0)
+            + (vb ** 2 / (len(b) - 1) if len(b) > 1 else 0)
+        )
+        half = t95(math.floor(df)) * math.sqrt(va + vb)
+    mean = statistics.fmean(a)
+    change, margin = diff / mean, half / mean
+    significant = abs(change) > margin
+    if significant and change > threshold:
+        return change, margin, REGRESSION
+    if significant and change < -threshold:
+        return change, margin, IMPROVEMENT
+    return change, margin, NOISE
+
+
+def revision():
+    """Короткая ревизия git или None вне репозитория."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True, cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names=None, repeat=10):
+    """Прогоняет сценарии и возвращает результаты для сохранения."""
+    transport = homework.TRANSPORT
+    logging.disable(logging.CRITICAL)
+    try:
+        operations = {
+            name: operation for name, operation in scenarios().items()
+            if not names or name in names
+        }
+        samples = measure(dict(operations, **{REFERENCE: reference}), repeat)
+    finally:
+        homework.TRANSPORT = transport
+        logging.disable(logging.NOTSET)
+    return dict(
+        version=FORMAT_VERSION,
+        revision=revision(),
+        created=int(time.time()),
+        python=platform.python_version(),
+        machine=platform.machine(),
+        scenarios={
+            name: summarize(values, samples[REFERENCE])
+            for name, values in samples.items()
+        },
+    )
+
+
+def baseline_path(name):
+    """Путь к файлу базовых замеров по имени или пути."""
+    if name.endswith('.json'):
+        return name
+    return os.path.join(BASELINES, f'{name}.json')
+
+
+def load(name):
+    """Читает сохранённые замеры."""
+    path = baseline_path(name)
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if data.get('version') != FORMAT_VERSION:
+        raise ValueError(FORMAT_MISMATCH.format(
+            data.get('version'), path, FORMAT_VERSION
+        ))
+    return data
+
+
+def save(data, name):
+    """Записывает замеры в файл."""
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=1, sort_keys=True)
+        file.write('\n')
+    return path
+
+
+def format_time(result):
+    """Среднее ± интервал в микросекундах."""
+    return f'{result["mean"] * 1e6:.2f}±{result["ci"] * 1e6:.2f} us'
+
+
+def report(base, current, threshold, out=None):
+    """
+    Печатает таблицу сравнения.
+
+        Возвращаемое значение (list): сценарии с регрессией.
+    """
+    out = out or sys.stdout
+    print(ROW.format('scenario', 'baseline', 'current', 'change', 'verdict'),
+          file=out)
+    regressions = []
+    improvements = 0
+    for name, result in current['scenarios'].items():
+        if name == REFERENCE:
+            continue
+        if name not in base['scenarios']:
+            print(ROW.format(name, '-', format_time(result), '', 'новый'),
+                  file=out)
+            continue
+        change, margin, verdict = compare(
+            base['scenarios'][name], result, threshold
+        )
+        if verdict == REGRESSION:
+            regressions.append(name)
+        improvements += verdict == IMPROVEMENT
+        print(ROW.format(
+            name, format_time(base['scenarios'][name]), format_time(result),
+            f'{change:+.1%}', verdict
+        ), file=out)
+    print(SUMMARY.format(
+        len(regressions), improvements, threshold,
+        base.get('revision'), current.get('revision')
+    ), file=out)
+    return regressions
+
+
+def main(argv=None):
+    """Разбирает команду и возвращает код выхода."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('--save', help='имя базовой линии или путь')
+    compare_parser = commands.add_parser('compare')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('--current', help='готовые замеры')
+    compare_parser.add_argument('--threshold', type=float, default=0.2)
+    for command in (run_parser, compare_parser):
+        command.add_argument('--repeat', type=int, default=20)
+        command.add_argument('--scenarios', nargs='+')
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        data = run(args.scenarios, args.repeat)
+        for name, result in data['scenarios'].items():
+            print(f'{name:<24} {format_time(result):>18}')
+        if args.save:
+            print(save(data, args.save))
+        return 0
+    base = load(args.baseline)
+    current = (
+        load(args.current) if args.current
+        else run(args.scenarios or list(base['scenarios']), args.repeat)
+    )
+    regressions = report(base, current, args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Генератор синтетической нагрузки: ответы API домашки и хронология статусов.
+
+Запуск: python -m benchmarks.workload --tenants 10000 --out payloads.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+PROJECTS = (
+    'Проект спринта: Деплой бота',
+    'Проект спринта: Блог на Django',
+    'Проект спринта: API для Yatube',
+    'Проект спринта: Тесты для Yatube',
+    'Проект спринта: Kittygram',
+    'Проект спринта: Foodgram',
+    'Проект спринта: CI/CD',
+    'Итоговый проект',
+)
+COMMENTS = {
+    'approved': ('Принято!', 'Отличная работа.', 'Всё нравится.'),
+    'reviewing': ('',),
+    'rejected': (
+        'Нужно поправить обработку исключений.',
+        'Добавьте докстринги.',
+        'Вынесите константы.',
+    ),
+}
+DEFAULT_STATUS_MIX = {'approved': 0.6, 'reviewing': 0.25, 'rejected': 0.15}
+MALFORMED_KINDS = (
+    'no_name', 'no_status', 'unknown_status', 'not_dict', 'bad_date'
+)
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def isoformat(timestamp):
+    """Форматирует время так же, как API домашки."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+
+
+class Workload:
+    """
+    Детерминированный генератор ответов homework_statuses.
+
+    У каждого арендатора свой генератор случайных чисел, зависящий
+    только от seed и номера арендатора. Поэтому данные любого арендатора
+    воспроизводятся без генерации остальных, а обход миллионов работ
+    идёт лениво и не держит их в памяти.
+    """
+
+    def __init__(
+        self, seed=0, tenants=100, homeworks=10, status_mix=None,
+        malformed_rate=0.0, comment_length=0, start=1700000000,
+        review_hours=None, review_weekdays=None
+    ):
+        """
+        Задаёт параметры нагрузки.
+
+            Параметры:
+                seed (int): зерно генератора.
+                tenants (int): число арендаторов.
+                homeworks (int): работ в ответе одного арендатора.
+                status_mix (dict): доли статусов в ответах.
+                malformed_rate (float): доля некорректных записей.
+                comment_length (int): минимальная длина комментария,
+                    регулирует размер ответа в байтах.
+                start (int): время начала хронологии в секундах.
+                review_hours (iterable): часы суток UTC, в которые
+                    ревьюеры берут и проверяют работы; None — круглосуточно.
+                review_weekdays (iterable): дни недели ревьюеров,
+                    0 — понедельник; None — все.
+        """
+        self.seed = seed
+        self.tenants = tenants
+        self.homeworks = homeworks
+        mix = status_mix or DEFAULT_STATUS_MIX
+        self.statuses = list(mix)
+        self.weights = [mix[status] for status in self.statuses]
+        self.malformed_rate = malformed_rate
+        self.comment_length = comment_length
+        self.start = start
+        self.review_hours = (
+            None if review_hours is None else frozenset(review_hours)
+        )
+        self.review_weekdays = (
+            None if review_weekdays is None else frozenset(review_weekdays)
+        )
+
+    def rng(self, tenant, *salt):
+        """Генератор случайных чисел арендатора."""
+        return random.Random(
+            ':'.join(str(part) for part in (self.seed, tenant) + salt)
+        )
+
+    def reviewer_time(self, rng, moment):
+        """Сдвигает момент на ближайший рабочий час ревьюеров."""
+        if self.review_hours is None and self.review_weekdays is None:
+            return moment
+        for _ in range(7 * 24):
+            hour = time.gmtime(moment)
+            if (
+                (self.review_hours is None
+                 or hour.tm_hour in self.review_hours)
+                and (self.review_weekdays is None
+                     or hour.tm_wday in self.review_weekdays)
+            ):
+                return moment
+            moment = (moment // HOUR + 1) * HOUR + rng.randint(0, 30 * 60)
+        return moment
+
+    def comment(self, rng, status):
+        """Комментарий ревьюера нужной длины."""
+        text = rng.choice(COMMENTS[status])
+        if text and len(text) < self.comment_length:
+            text = (text + ' ') * (self.comment_length // len(text) + 1)
+            text = text[:self.comment_length]
+        return text
+
+    def homework(self, rng, tenant, number, status, date_updated):
+        """Корректная запись о домашней работе."""
+        project = PROJECTS[number % len(PROJECTS)]
+        return {
+            'id': tenant * 1000003 + number,
+            'status': status,
+            'homework_name': f'student{tenant}__hw{number:02d}.zip',
+            'reviewer_comment': self.comment(rng, status),
+            'date_updated': isoformat(date_updated),
+            'lesson_name': project,
+        }
+
+    def malform(self, rng, homework):
+        """Портит запись о домашней работе одним из способов."""
+        kind = rng.choice(MALFORMED_KINDS)
+        if kind == 'no_name':
+            del homework['homework_name']
+        elif kind == 'no_status':
+            del homework['status']
+        elif kind == 'unknown_status':
+            homework['status'] = 'unknown'
+        elif kind == 'not_dict':
+            return [homework]
+        else:
+            homework['date_updated'] = 'вчера'
+        return homework
+
+    def payload(self, tenant, size=None, current_date=None):
+        """
+        Ответ API для арендатора.
+
+            Параметры:
+                tenant (int): номер арендатора.
+                size (int): число работ, по умолчанию self.homeworks.
+                current_date (int): время ответа в секундах.
+            Возвращаемое значение (dict): ответ homework_statuses.
+        """
+        rng = self.rng(tenant, 'payload', current_date)
+        current_date = current_date or self.start
+        homeworks = []
+        for number in range(self.homeworks if size is None else size):
+            status = rng.choices(self.statuses, self.weights)[0]
+            date_updated = current_date - rng.randint(0, 30 * DAY)
+            homework = self.homework(
+                rng, tenant, number, status, date_updated
+            )
+            if rng.random() < self.malformed_rate:
+                homework = self.malform(rng, homework)
+            homeworks.append(homework)
+        homeworks.sort(
+            key=lambda homework: str(
+                homework.get('date_updated')
+                if isinstance(homework, dict) else ''
+            ),
+            reverse=True
+        )
+        return {'homeworks': homeworks, 'current_date': current_date}
+
+    def payload_bytes(self, tenant, size=None, current_date=None):
+        """Ответ API в виде байтов JSON, как он приходит по сети."""
+        return json.dumps(
+            self.payload(tenant, size, current_date), ensure_ascii=False
+        ).encode()
+
+    def payloads(self):
+        """Лениво перебирает ответы всех арендаторов."""
+        for tenant in range(self.tenants):
+            yield tenant, self.payload(tenant)
+
+    def timeline(self, tenant, reject_rate=0.3):
+        """
+        Хронология смены статусов работ арендатора.
+
+        Работа сдаётся, ждёт ревьюера, проверяется, при отклонении
+        дорабатывается и сдаётся снова, пока не будет принята.
+
+            Возвращаемое значение (list): пары (время, снимок работы)
+                в хронологическом порядке.
+        """
+        rng = self.rng(tenant, 'timeline')
+        events = []
+        submitted = self.start
+        for number in range(self.homeworks):
+            submitted += rng.randint(1 * DAY, 10 * DAY)
+            moment = submitted
+            while True:
+                moment = self.reviewer_time(
+                    rng, moment + rng.randint(10 * 60, 2 * DAY)
+                )
+                events.append(
+                    (moment, self.homework(
+                        rng, tenant, number, 'reviewing', moment
+                    ))
+                )
+                moment = self.reviewer_time(
+                    rng, moment + rng.randint(15 * 60, 8 * HOUR)
+                )
+                verdict = (
+                    'rejected' if rng.random() < reject_rate else 'approved'
+                )
+                events.append(
+                    (moment, self.homework(
+                        rng, tenant, number, verdict, moment
+                    ))
+                )
+                if verdict == 'approved':
+                    break
+                moment += rng.randint(HOUR, 3 * DAY)
+        events.sort(key=lambda event: event[0])
+        return events
+
+    def replay(self, tenant, reject_rate=0.3):
+        """
+        Ответы API, которые увидел бы бот, опрашивая арендатора.
+
+            Возвращаемое значение (generator): пары (время, ответ)
+                после каждого события хронологии; в ответе последнее
+                состояние каждой работы, самые свежие первыми.
+        """
+        state = {}
+        for moment, homework in self.timeline(tenant, reject_rate):
+            state[homework['id']] = homework
+            yield moment, {
+                'homeworks': sorted(
+                    state.values(),
+                    key=lambda homework: homework['date_updated'],
+                    reverse=True
+                ),
+                'current_date': moment,
+            }
+
+
+def main():
+    """Пишет сгенерированные ответы в JSONL."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--homeworks', type=int, default=10)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--comment-length', type=int, default=0)
+    parser.add_argument('--out', help='файл JSONL, по умолчанию stdout')
+    args = parser.parse_args()
+    workload = Workload(
+        seed=args.seed, tenants=args.tenants, homeworks=args.homeworks,
+        malformed_rate=args.malformed_rate,
+        comment_length=args.comment_length
+    )
+    out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+    for tenant, payload in workload.payloads():
+        out.write(json.dumps(
+            {'tenant': tenant, 'payload': payload}, ensure_ascii=False
+        ) + '\n')
+    if args.out:
+        out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+import json
+import logging
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telebot.types import Update
+
+logger = logging.getLogger(__name__)
+
+NO_HOMEWORKS = 'Пока нет данных о домашних работах.'
+NO_HISTORY = 'Журнал статусов не включён.'
+NO_LATENCY = 'Учёт задержек не включён.'
+EMPTY_HISTORY = 'В журнале пока нет переходов статусов.'
+STATUS_LINE = '"{}": {}'
+HISTORY_LINE = '{} "{}": {}'
+POLLED_AT = 'Последняя проверка: {}'
+NEVER_POLLED = 'Проверок ещё не было.'
+UNAUTHORIZED = 'Команда {} из чужого чата {} проигнорирована'
+UNKNOWN_MODE = 'Неизвестный режим команд: {}. Доступные: polling, webhook'
+WEBHOOK_STARTED = 'Webhook для команд слушает порт {}'
+HISTORY_LIMIT = 10
+
+
+class Coalescer:
+    """
+    Склеивает одновременные и частые запросы на опрос API.
+
+    Если опрос уже идёт, новый запрос ждёт его завершения. Если опрос
+    закончился не раньше max_age секунд назад, новый не запускается.
+    """
+
+    def __init__(self, poll, clock=time.monotonic):
+        """Запоминает функцию опроса."""
+        self.poll_func = poll
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.done = None
+        self.finished = None
+        self.polls = 0
+        self.coalesced = 0
+        self.generation = 0
+
+    def poll(self, max_age=0):
+        """
+        Выполняет опрос или присоединяется к текущему.
+
+            Возвращаемое значение (bool): True, если опрос запускал
+                именно этот вызов.
+        """
+        with self.lock:
+            if self.done is None and (
+                self.finished is not None
+                and self.clock() - self.finished <= max_age
+            ):
+                self.coalesced += 1
+                return False
+            owner = self.done is None
+            if owner:
+                self.done = threading.Event()
+            else:
+                self.coalesced += 1
+            done = self.done
+            generation = self.generation
+        if not owner:
+            done.wait()
+            return False
+        try:
+            self.polls += 1
+            self.poll_func()
+        finally:
+            with self.lock:
+                if generation == self.generation:
+                    self.finished = self.clock()
+                    self.done = None
+            done.set()
+        return True
+
+    def abandon(self):
+        """
+        Бросает зависший опрос.
+
+        Ожидающие его вызовы освобождаются, следующий poll запускает
+        новый опрос. Если брошенный опрос всё же завершится, он уже
+        не меняет состояние склейки.
+        """
+        with self.lock:
+            done, self.done = self.done, None
+            self.generation += 1
+        if done is not None:
+            done.set()
+
+
+def render_status(state, verdicts):
+    """Ответ на /status из кеша состояния без запроса к API."""
+    homeworks = list(state.homeworks.values())
+    if not homeworks:
+        lines = [NO_HOMEWORKS]
+    else:
+        lines = [
+            STATUS_LINE.format(
+                homework.get('homework_name'),
+                verdicts.get(homework.get('status'), homework.get('status'))
+            )
+            for homework in homeworks
+        ]
+    if state.polled_at is None:
+        lines.append(NEVER_POLLED)
+    else:
+        lines.append(POLLED_AT.format(time.strftime(
+            '%Y-%m-%d %H:%M:%S', time.localtime(state.polled_at)
+        )))
+    return '\n'.join(lines)
+
+
+def render_history(history, tenant):
+    """Ответ на /history из журнала переходов."""
+    if history is None:
+        return NO_HISTORY
+    rows = history.transitions(tenant)[-HISTORY_LIMIT:]
+    if not rows:
+        return EMPTY_HISTORY
+    return '\n'.join(
+        HISTORY_LINE.format(
+            time.strftime(
+                '%Y-%m-%d %H:%M', time.localtime(row['date_updated'] or 0)
+            ),
+            row['homework_name'], row['status']
+        )
+        for row in rows
+    )
+
+
+def register_commands(
+    bot, coalescer, state, verdicts, tenant, chat_ids, now_max_age=60,
+    latency=None
+):
+    """
+    Регистрирует обработчики /status, /now, /history и /latency.
+
+    Команды принимаются только из чатов получателей chat_ids.
+    /now запускает опрос API, склеенный с текущим или недавним опросом.
+    """
+    allowed = {str(chat_id) for chat_id in chat_ids}
+
+    def authorized(message):
+        if str(message.chat.id) in allowed:
+            return True
+        logger.warning(UNAUTHORIZED.format(message.text, message.chat.id))
+        return False
+
+    @bot.message_handler(commands=['status'], func=authorized)
+    def status(message):
+        bot.reply_to(message, render_status(state, verdicts))
+
+    @bot.message_handler(commands=['now'], func=authorized)
+    def now(message):
+        coalescer.poll(max_age=now_max_age)
+        bot.reply_to(message, render_status(state, verdicts))
+
+    @bot.message_handler(commands=['history'], func=authorized)
+    def history(message):
+        bot.reply_to(message, render_history(state.history, tenant))
+
+    @bot.message_handler(commands=['latency'], func=authorized)
+    def latency_report(message):
+        bot.reply_to(
+            message,
+            NO_LATENCY if latency is None else latency.render(tenant)
+        )
+
+    return status, now, history, latency_report
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Принимает обновления Telegram через webhook."""
+
+    bot = None
+    secret = None
+
+    def do_POST(self):
+        """Передаёт обновление боту."""
+        token = self.headers.get('X-Telegram-Bot-Api-Secret-Token')
+        if self.secret and token != self.secret:
+            self.send_response(HTTPStatus.FORBIDDEN)
+            self.end_headers()
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        update = Update.de_json(json.loads(self.rfile.read(length)))
+        self.bot.process_new_updates([update])
+        self.send_response(HTTPStatus.OK)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        """Пишет журнал запросов в logging вместо stderr."""
+        logger.debug(format % args)
+
+
+def start_commands(bot, mode, webhook_url=None, port=8443, secret=None):
+    """
+    Запускает приём команд в фоновом потоке.
+
+        Параметры:
+            mode (str): polling — длинный опрос getUpdates,
+                webhook — HTTP-сервер на port и setWebhook на webhook_url.
+    """
+    if mode == 'polling':
+        bot.remove_webhook()
+        target = bot.infinity_polling
+        server = None
+    elif mode == 'webhook':
+        handler = type(
+            'BotWebhookHandler', (WebhookHandler,),
+            dict(bot=bot, secret=secret)
+        )
+        server = ThreadingHTTPServer(('', port), handler)
+        bot.remove_webhook()
+        bot.set_webhook(url=webhook_url, secret_token=secret)
+        target = server.serve_forever
+        logger.info(WEBHOOK_STARTED.format(port))
+    else:
+        raise ValueError(UNKNOWN_MODE.format(mode))
+    threading.Thread(target=target, name='commands', daemon=True).start()
+    return server
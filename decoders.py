@@ -0,0 +1,39 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+AUTO = 'auto'
+UNKNOWN_DECODER = 'Неизвестный JSON-декодер: {}. Доступные: {}'
+
+DECODERS = {'json': json.loads}
+if orjson is not None:
+    DECODERS['orjson'] = orjson.loads
+
+
+def get_decoder(name=AUTO):
+    """
+    Возвращает функцию декодирования JSON из байтов.
+
+    В режиме auto берётся самый быстрый из установленных декодеров:
+    orjson, если он есть, иначе стандартный json.
+    """
+    if name == AUTO:
+        return DECODERS.get('orjson', json.loads)
+    if name not in DECODERS:
+        raise ValueError(UNKNOWN_DECODER.format(name, ', '.join(DECODERS)))
+    return DECODERS[name]
+
+
+def decode_response(response, decoder):
+    """
+    Декодирует тело ответа прямо из байтов.
+
+    Ответы без атрибута content декодируются их собственным методом json.
+    """
+    content = getattr(response, 'content', None)
+    if content is None:
+        return response.json()
+    return decoder(content)
@@ -0,0 +1,347 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop-oldest'
+SPILL = 'spill'
+POLICIES = (BLOCK, DROP_OLDEST, SPILL)
+
+UNKNOWN_POLICY = 'Неизвестная политика переполнения: {}. Доступные: {}'
+QUEUE_FULL = 'Очередь доставки заполнена ({}), политика: {}'
+DROPPED = 'Сообщение удалено из очереди доставки: {}'
+DELIVERY_FAILED = 'Сбой доставки сообщения: {}'
+DELIVERY_RETRY = 'Повтор доставки через {:.1f} с (попытка {}): {}'
+DEAD_LETTER = 'Сообщение не доставлено за {} попыток, сохранено в {}: {}'
+REVIVED = 'Недоставленные сообщения из {} снова в очереди: {}'
+STATS = (
+    'Очередь {name}: в очереди {queued}/{capacity}, на диске {spilled}, '
+    'доставлено {delivered}, повторов {retried}, сбоев {failed}, '
+    'удалено {dropped}, '
+    'ожидание сред. {wait_avg:.3f} с, макс. {wait_max:.3f} с, '
+    'пик заполнения {saturation_peak:.0%}'
+)
+
+
+class DeliveryExecutor:
+    """
+    Ограниченный пул потоков для доставки сообщений в Telegram.
+
+    Задача доставки — пара (homework, message), которую обрабатывает
+    handler(homework, message). При заполнении очереди действует политика:
+    block ждёт места, drop-oldest вытесняет самое старое сообщение,
+    spill дописывает сообщения в JSONL-файл и подгружает их обратно
+    по мере освобождения очереди.
+
+    Принятое сообщение не теряется при сбое handler: оно возвращается
+    в конец очереди с растущей паузой, пока не кончатся attempts
+    попыток, а затем дописывается в dead_letter_path. Сообщения
+    из этого файла снова ставятся в очередь при запуске и затем раз
+    в revive_interval секунд, так что долгий сбой Telegram задерживает
+    уведомления, но не теряет их до перезапуска.
+    """
+
+    def __init__(
+        self, handler, workers=2, capacity=100, policy=BLOCK,
+        spill_path='delivery_spill.jsonl', report_interval=60,
+        name='delivery', attempts=3, retry_interval=1.0,
+        dead_letter_path='delivery_failed.jsonl', revive_interval=60
+    ):
+        """Запускает потоки доставки."""
+        if policy not in POLICIES:
+            raise ValueError(
+                UNKNOWN_POLICY.format(policy, ', '.join(POLICIES))
+            )
+        self.handler = handler
+        self.name = name
+        self.capacity = capacity
+        self.policy = policy
+        self.spill_path = spill_path
+        self.report_interval = report_interval
+        self.attempts = attempts
+        self.retry_interval = retry_interval
+        self.dead_letter_path = dead_letter_path
+        self.revive_interval = revive_interval
+        self.halt = threading.Event()
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.idle = threading.Condition(self.lock)
+        self.spilled = self.count_spilled()
+        self.stopped = False
+        self.in_progress = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self.full_events = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.saturation_peak = 0.0
+        self.last_report = time.monotonic()
+        self.revive()
+        self.threads = [
+            threading.Thread(
+                target=self.work, name=f'{name}-{number}', daemon=True
+            )
+            for number in range(workers)
+        ]
+        if dead_letter_path and revive_interval:
+            self.threads.append(threading.Thread(
+                target=self.revive_periodically, name=f'{name}-revive',
+                daemon=True
+            ))
+        for thread in self.threads:
+            thread.start()
+
+    def count_spilled(self):
+        """Считает сообщения, оставшиеся на диске с прошлого запуска."""
+        if self.policy != SPILL or not os.path.exists(self.spill_path):
+            return 0
+        with open(self.spill_path, encoding='utf-8') as file:
+            return sum(1 for line in file if line.strip())
+
+    def revive(self):
+        """Ставит в очередь недоставленные сообщения с новыми попытками."""
+        with self.lock:
+            if self.stopped or not self.dead_letter_path or not (
+                os.path.exists(self.dead_letter_path)
+            ):
+                return
+            with open(self.dead_letter_path, encoding='utf-8') as file:
+                items = [
+                    tuple(json.loads(line)[:3])
+                    for line in file if line.strip()
+                ]
+            os.remove(self.dead_letter_path)
+            self.queue.extend(items)
+            self.not_empty.notify_all()
+        if items:
+            logger.warning(REVIVED.format(self.dead_letter_path, len(items)))
+
+    def revive_periodically(self):
+        """Раз в revive_interval возвращает недоставленные в очередь."""
+        while not self.halt.wait(self.revive_interval):
+            self.revive()
+
+    def submit(self, homework, message):
+        """
+        Ставит сообщение в очередь доставки, не дожидаясь отправки.
+
+            Возвращаемое значение (bool): сообщение принято в очередь
+                или на диск (False только после остановки).
+        """
+        item = (time.time(), homework, message)
+        with self.lock:
+            if self.stopped:
+                return False
+            if self.spilled:
+                self.spill(item)
+                return True
+            if len(self.queue) >= self.capacity:
+                self.full_events += 1
+                logger.warning(QUEUE_FULL.format(self.capacity, self.policy))
+                if self.policy == SPILL:
+                    self.spill(item)
+                    return True
+                if self.policy == DROP_OLDEST:
+                    self.dropped += 1
+                    logger.warning(DROPPED.format(self.queue.popleft()[2]))
+                while len(self.queue) >= self.capacity and not self.stopped:
+                    self.not_full.wait()
+                if self.stopped:
+                    return False
+            self.queue.append(item)
+            self.saturation_peak = max(
+                self.saturation_peak, len(self.queue) / self.capacity
+            )
+            self.not_empty.notify()
+        return True
+
+    def spill(self, item):
+        """Дописывает сообщение в файл переполнения."""
+        with open(self.spill_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(item, ensure_ascii=False) + '\n')
+        self.spilled += 1
+
+    def spill_front(self, items):
+        """Записывает сообщения на диск перед уже сохранёнными."""
+        lines = [json.dumps(item, ensure_ascii=False) + '\n' for item in items]
+        if self.spilled:
+            with open(self.spill_path, encoding='utf-8') as file:
+                lines += [line for line in file if line.strip()]
+        tmp_path = f'{self.spill_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.writelines(lines)
+        os.replace(tmp_path, self.spill_path)
+        self.spilled = len(lines)
+
+    def refill(self):
+        """Переносит сообщения с диска в освободившуюся очередь."""
+        with open(self.spill_path, encoding='utf-8') as file:
+            lines = [line for line in file if line.strip()]
+        space = self.capacity - len(self.queue)
+        for line in lines[:space]:
+            self.queue.append(tuple(json.loads(line)))
+        tmp_path = f'{self.spill_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.writelines(lines[space:])
+        os.replace(tmp_path, self.spill_path)
+        self.spilled = len(lines[space:])
+
+    def take(self):
+        """Забирает следующее сообщение из очереди или None при остановке."""
+        with self.lock:
+            while True:
+                if not self.queue and self.spilled and not self.stopped:
+                    self.refill()
+                if self.queue:
+                    item = self.queue.popleft()
+                    self.in_progress += 1
+                    self.not_full.notify()
+                    return item
+                if self.stopped:
+                    return None
+                self.not_empty.wait()
+
+    def work(self):
+        """Цикл потока доставки."""
+        while True:
+            item = self.take()
+            if item is None:
+                return
+            enqueued, homework, message, *rest = item
+            attempt = rest[0] if rest else 1
+            wait = max(0.0, time.time() - enqueued)
+            try:
+                ok = self.handler(homework, message)
+            except Exception as error:
+                logger.exception(DELIVERY_FAILED.format(error))
+                ok = False
+            retried = not ok and self.retry(
+                (enqueued, homework, message, attempt + 1)
+            )
+            if not ok and not retried:
+                self.bury(item, attempt)
+            with self.lock:
+                self.in_progress -= 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+                if ok:
+                    self.delivered += 1
+                elif retried:
+                    self.retried += 1
+                else:
+                    self.failed += 1
+                self.idle.notify_all()
+            self.report()
+
+    def retry(self, item):
+        """
+        Возвращает сообщение в очередь после паузы, если попытки остались.
+
+            Возвращаемое значение (bool): сообщение снова в очереди.
+        """
+        attempt = item[3]
+        if attempt > self.attempts:
+            return False
+        delay = self.retry_interval * 2 ** (attempt - 2)
+        logger.warning(DELIVERY_RETRY.format(delay, attempt, item[2]))
+        if self.halt.wait(delay):
+            return False
+        with self.lock:
+            if self.stopped:
+                return False
+            self.queue.append(item)
+            self.not_empty.notify()
+        return True
+
+    def bury(self, item, attempts):
+        """Сохраняет недоставленное сообщение до следующего запуска."""
+        if self.dead_letter_path:
+            with self.lock, open(
+                self.dead_letter_path, 'a', encoding='utf-8'
+            ) as file:
+                file.write(json.dumps(item[:3], ensure_ascii=False) + '\n')
+        logger.error(DEAD_LETTER.format(
+            attempts, self.dead_letter_path, item[2]
+        ))
+
+    def stats(self):
+        """Возвращает метрики очереди доставки."""
+        with self.lock:
+            processed = self.delivered + self.failed
+            return dict(
+                name=self.name,
+                queued=len(self.queue),
+                capacity=self.capacity,
+                spilled=self.spilled,
+                in_progress=self.in_progress,
+                delivered=self.delivered,
+                retried=self.retried,
+                failed=self.failed,
+                dropped=self.dropped,
+                full_events=self.full_events,
+                saturation=len(self.queue) / self.capacity,
+                saturation_peak=self.saturation_peak,
+                wait_avg=self.wait_total / processed if processed else 0.0,
+                wait_max=self.wait_max,
+            )
+
+    def lag(self):
+        """Сколько секунд ждёт самое старое сообщение в очереди."""
+        with self.lock:
+            if not self.queue:
+                return 0.0
+            return max(0.0, time.time() - self.queue[0][0])
+
+    def report(self):
+        """Пишет метрики в лог не чаще раза в report_interval секунд."""
+        now = time.monotonic()
+        if now - self.last_report < self.report_interval:
+            return
+        self.last_report = now
+        logger.info(STATS.format(**self.stats()))
+
+    def join(self, timeout=None):
+        """Ждёт, пока очередь и файл переполнения опустеют."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while self.queue or self.in_progress or self.spilled:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                self.idle.wait(remaining)
+        return True
+
+    def shutdown(self, drain=True):
+        """
+        Останавливает потоки доставки, сообщения на диске сохраняются.
+
+        При drain=False очередь в памяти не дорабатывается: с политикой
+        spill она переносится на диск перед старыми записями, иначе
+        сообщения отбрасываются. Сообщения, ждущие повтора, сохраняются
+        в dead_letter_path.
+        """
+        self.halt.set()
+        with self.lock:
+            self.stopped = True
+            if not drain and self.queue:
+                if self.policy == SPILL:
+                    self.spill_front(list(self.queue))
+                else:
+                    self.dropped += len(self.queue)
+                self.queue.clear()
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+            self.idle.notify_all()
+        for thread in self.threads:
+            thread.join()
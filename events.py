@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+import requests
+
+from delivery import DeliveryExecutor, SPILL
+from retry import RetryPolicy, backoff
+
+logger = logging.getLogger(__name__)
+
+SINK_RETRY = RetryPolicy(3, 1, 30, 0.5)
+SINK_RETRYING = 'Приёмник {}: повтор {} через {:.1f} с после ошибки: {}'
+SINK_FAILED = 'Приёмник {}: событие не обработано: {}'
+DIGEST_SUBJECT = 'Статусы домашних работ: {} изменений'
+DIGEST_FAILED = 'Не удалось отправить дайджест: {}'
+
+
+class RetryingSink:
+    """Обёртка приёмника с повторами по политике RetryPolicy."""
+
+    def __init__(self, name, handler, policy=SINK_RETRY, sleep=time.sleep):
+        """Запоминает приёмник и политику повторов."""
+        self.name = name
+        self.handler = handler
+        self.policy = policy
+        self.sleep = sleep
+        self.retries = 0
+
+    def __call__(self, homework, message):
+        """Передаёт событие приёмнику, повторяя при сбоях."""
+        for attempt in range(1, self.policy.attempts + 1):
+            try:
+                if self.handler(homework, message):
+                    return True
+                error = None
+            except Exception as exception:
+                error = exception
+            if attempt < self.policy.attempts:
+                delay = backoff(self.policy, attempt)
+                logger.warning(
+                    SINK_RETRYING.format(self.name, attempt, delay, error)
+                )
+                self.retries += 1
+                self.sleep(delay)
+        logger.error(SINK_FAILED.format(self.name, message))
+        return False
+
+
+class AuditSink:
+    """Дописывает события в локальный JSONL-файл аудита."""
+
+    def __init__(self, path, tenant):
+        """Открывает файл аудита на дозапись."""
+        self.path = path
+        self.tenant = tenant
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def __call__(self, homework, message):
+        """Записывает событие одной строкой JSON."""
+        homework = homework or {}
+        line = json.dumps(dict(
+            at=time.time(), tenant=self.tenant, homework_id=homework.get('id'),
+            homework_name=homework.get('homework_name'),
+            status=homework.get('status'), message=message
+        ), ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+        return True
+
+    def close(self):
+        """Закрывает файл аудита."""
+        with self.lock:
+            self.file.close()
+
+
+class WebhookSink:
+    """Отправляет события POST-запросом в вебхук LMS."""
+
+    def __init__(self, url, tenant, timeout=10):
+        """Запоминает адрес вебхука."""
+        self.url = url
+        self.tenant = tenant
+        self.timeout = timeout
+
+    def __call__(self, homework, message):
+        """Отправляет событие, успех — код ответа 2xx."""
+        response = requests.post(self.url, json=dict(
+            tenant=self.tenant, homework=homework, message=message
+        ), timeout=self.timeout)
+        return 200 <= response.status_code < 300
+
+
+class EmailDigestSink:
+    """
+    Собирает события в дайджест и отправляет его письмом раз в interval.
+
+    Событие считается обработанным, когда оно попало в дайджест;
+    если письмо не ушло, события остаются до следующей попытки.
+    """
+
+    def __init__(
+        self, host, port, sender, recipients, interval=3600,
+        smtp=smtplib.SMTP
+    ):
+        """Запускает таймер отправки дайджеста."""
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.interval = interval
+        self.smtp = smtp
+        self.lock = threading.Lock()
+        self.pending = []
+        self.stopped = threading.Event()
+        threading.Thread(
+            target=self.run, name='email-digest', daemon=True
+        ).start()
+
+    def __call__(self, homework, message):
+        """Добавляет событие в дайджест."""
+        with self.lock:
+            self.pending.append(message)
+        return True
+
+    def run(self):
+        """Отправляет дайджест раз в interval секунд."""
+        while not self.stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Отправляет накопленные события одним письмом."""
+        with self.lock:
+            messages, self.pending = self.pending, []
+        if not messages:
+            return
+        email = EmailMessage()
+        email['Subject'] = DIGEST_SUBJECT.format(len(messages))
+        email['From'] = self.sender
+        email['To'] = ', '.join(self.recipients)
+        email.set_content('\n\n'.join(messages))
+        try:
+            with self.smtp(self.host, self.port) as client:
+                client.send_message(email)
+        except Exception as error:
+            logger.exception(DIGEST_FAILED.format(error))
+            with self.lock:
+                self.pending = messages + self.pending
+
+
+class EventBus:
+    """
+    Шина событий об изменениях статусов с независимыми приёмниками.
+
+    У каждого приёмника своя ограниченная очередь, свои потоки,
+    политика повторов и метрики, поэтому медленный приёмник не задерживает
+    ни остальные приёмники, ни цикл опроса. Событие, которое приёмник
+    не обработал после всех повторов, сохраняется в
+    <spill_dir>/<имя>_failed.jsonl и возвращается в очередь раз
+    в revive_interval секунд и при следующем запуске.
+    """
+
+    def __init__(
+        self, sinks, workers=1, capacity=1000, policy=SPILL,
+        spill_dir='.', own_retries=(), revive_interval=60
+    ):
+        """
+        Запускает очереди приёмников.
+
+            Параметры:
+                sinks (dict): имя приёмника -> handler(homework, message).
+                own_retries (iterable): приёмники, которые повторяют
+                    сами; их не оборачивает RetryingSink.
+        """
+        self.executors = {
+            name: DeliveryExecutor(
+                handler if name in own_retries
+                else RetryingSink(name, handler),
+                workers, capacity, policy,
+                os.path.join(spill_dir, f'{name}_spill.jsonl'), name=name,
+                attempts=1,
+                dead_letter_path=os.path.join(
+                    spill_dir, f'{name}_failed.jsonl'
+                ),
+                revive_interval=revive_interval
+            )
+            for name, handler in sinks.items()
+        }
+
+    def publish(self, homework, message):
+        """
+        Раздаёт событие всем приёмникам, не дожидаясь обработки.
+
+            Возвращаемое значение (bool): событие принято всеми очередями.
+        """
+        accepted = [
+            executor.submit(homework, message)
+            for executor in self.executors.values()
+        ]
+        return all(accepted)
+
+    def stats(self):
+        """Возвращает метрики очередей по приёмникам."""
+        return {
+            name: executor.stats()
+            for name, executor in self.executors.items()
+        }
+
+    def lag(self):
+        """Отставание самой медленной очереди приёмника в секундах."""
+        return max(
+            (executor.lag() for executor in self.executors.values()),
+            default=0.0
+        )
+
+    def join(self, timeout=None):
+        """Ждёт обработки всех событий."""
+        return all(
+            executor.join(timeout) for executor in self.executors.values()
+        )
+
+    def shutdown(self, drain=True):
+        """Останавливает очереди приёмников."""
+        for executor in self.executors.values():
+            executor.shutdown(drain)
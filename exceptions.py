@@ -1,6 +1,19 @@
 class StatusCodeException(Exception):
     """Получен HTTP response code отличный от 200."""
 
+    def __init__(self, message, status_code=None):
+        """Сохраняет код ответа для выбора политики повторов."""
+        super().__init__(message)
+        self.status_code = status_code
+
 
 class DenialOfService(Exception):
     """Отказ от обслуживания."""
+
+
+class TransportError(Exception):
+    """Сбой транспорта при запросе к API."""
+
+
+class CycleCancelled(Exception):
+    """Цикл опроса отменён сторожем после перезапуска потока."""
@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+CHAT_RETRY = 'Повторная отправка в чат {} через {} сек. (попытка {})'
+CHAT_FAILED = 'Сообщение не доставлено в чат {} после {} попыток'
+
+
+class RateLimiter:
+    """Выдерживает минимальный интервал между отправками в один чат."""
+
+    def __init__(self, interval):
+        """Запоминает интервал между отправками в секундах."""
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        """Ждёт, пока в чат снова можно отправить сообщение."""
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0.0, self.next_time - now)
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay:
+            time.sleep(delay)
+
+
+class Fanout:
+    """
+    Рассылает одно сообщение в несколько чатов через общий пул потоков.
+
+    Для каждого сообщения, дошедшего не во все чаты, запоминается,
+    в какие чаты оно уже доставлено, поэтому повторная рассылка уходит
+    только в чаты, где отправка не удалась, даже если между повторами
+    рассылались другие сообщения. Сообщение, дошедшее во все чаты,
+    забывается; недоставленных помнится не больше max_pending, самые
+    старые вытесняются.
+    """
+
+    def __init__(
+        self, chat_ids, workers=8, retries=3, interval=1.0, max_pending=1000
+    ):
+        """Создаёт пул отправки и ограничители частоты для чатов."""
+        self.chat_ids = list(chat_ids)
+        self.retries = retries
+        self.interval = interval
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='fanout'
+        )
+        self.limiters = {
+            chat_id: RateLimiter(interval) for chat_id in self.chat_ids
+        }
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.delivered = OrderedDict()
+
+    def deliver_to_chat(self, send, chat_id, message):
+        """Отправляет сообщение в чат с повторами и ограничением частоты."""
+        limiter = self.limiters[chat_id]
+        for attempt in range(1, self.retries + 1):
+            limiter.wait()
+            if send(chat_id, message):
+                return True
+            if attempt < self.retries:
+                delay = self.interval * 2 ** (attempt - 1)
+                logger.warning(CHAT_RETRY.format(chat_id, delay, attempt))
+                time.sleep(delay)
+        logger.error(CHAT_FAILED.format(chat_id, self.retries))
+        return False
+
+    def deliver(self, message, send):
+        """
+        Рассылает сообщение во все чаты, где его ещё нет.
+
+            Параметры:
+                message (str): текст сообщения.
+                send (callable): отправка в чат, send(chat_id, message).
+            Возвращаемое значение (bool): сообщение есть во всех чатах.
+        """
+        with self.lock:
+            done = set(self.delivered.get(message, ()))
+        futures = {
+            chat_id: self.executor.submit(
+                self.deliver_to_chat, send, chat_id, message
+            )
+            for chat_id in self.chat_ids if chat_id not in done
+        }
+        done.update(
+            chat_id for chat_id, future in futures.items() if future.result()
+        )
+        complete = done.issuperset(self.chat_ids)
+        with self.lock:
+            self.delivered.pop(message, None)
+            if not complete:
+                self.delivered[message] = done
+                while len(self.delivered) > self.max_pending:
+                    self.delivered.popitem(last=False)
+        return complete
+
+    def shutdown(self):
+        """Останавливает пул отправки."""
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,160 @@
+import logging
+import time
+from collections import Counter, namedtuple
+
+from exceptions import TransportError
+from transport import REQUEST_TIMEOUT, Response
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = 'timeout'
+SERVER_ERROR = 'server_error'
+DENIAL = 'denial'
+MALFORMED = 'malformed'
+SLOW = 'slow'
+TELEGRAM_DOWN = 'telegram_down'
+API_FAULTS = (TIMEOUT, SERVER_ERROR, DENIAL, MALFORMED, SLOW)
+KINDS = API_FAULTS + (TELEGRAM_DOWN,)
+
+DENIAL_BODY = b'{"code": "UnknownError", "error": "injected fault"}'
+MALFORMED_BODY = b'{"homeworks": [{"status": "approved"'
+UNKNOWN_FAULT = 'Неизвестный тип сбоя: {}. Доступные: {}'
+BAD_FAULT = 'Некорректное описание сбоя: {!r}, нужно kind@start+duration'
+INJECTED = 'Внедрён сбой {}'
+
+Fault = namedtuple('Fault', ('kind', 'start', 'duration', 'latency'))
+Fault.__new__.__defaults__ = (0,)
+
+
+def parse_schedule(text, now=0):
+    """
+    Разбирает расписание сбоев вида kind@start+duration[/latency].
+
+    Время start отсчитывается в секундах от now. Сбои разделяются
+    запятыми: 'server_error@60+300,slow@600+120/20'.
+    """
+    faults = []
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        try:
+            kind, timing = item.split('@')
+            start, rest = timing.split('+')
+            duration, _, latency = rest.partition('/')
+            fault = Fault(
+                kind, now + float(start), float(duration), float(latency or 0)
+            )
+        except ValueError:
+            raise ValueError(BAD_FAULT.format(item))
+        if kind not in KINDS:
+            raise ValueError(UNKNOWN_FAULT.format(kind, ', '.join(KINDS)))
+        faults.append(fault)
+    return faults
+
+
+class FaultInjector:
+    """
+    Внедряет сбои API и Telegram по расписанию.
+
+    Сбои API внедряются в транспорт или в обработчик фейкового сервера,
+    под get_api_answer, поэтому разбор ответа, исключения и повторы
+    работают как при настоящем сбое. Сбой Telegram внедряется в функцию
+    доставки. Успешные вызовы записываются, по ним строится отчёт
+    о восстановлении.
+    """
+
+    def __init__(self, faults, clock=time.time, sleep=time.sleep,
+                 timeout=30):
+        """
+        Задаёт расписание сбоев.
+
+            Параметры:
+                faults (list): объекты Fault.
+                timeout (float): сколько ждёт запрос при сбое timeout.
+        """
+        self.faults = faults
+        self.clock = clock
+        self.sleep = sleep
+        self.timeout = timeout
+        self.injected = Counter()
+        self.served = []
+        self.sent = []
+
+    def active(self, kinds):
+        """Сбой из kinds, действующий сейчас, или None."""
+        now = self.clock()
+        for fault in self.faults:
+            if (
+                fault.kind in kinds
+                and fault.start <= now < fault.start + fault.duration
+            ):
+                return fault
+        return None
+
+    def inject(self, fault):
+        """Учитывает внедрённый сбой."""
+        self.injected[fault.kind] += 1
+        logger.debug(INJECTED.format(fault.kind))
+
+    def fault_response(self, fault, url):
+        """
+        Ответ API при сбое или None, если запрос нужно выполнить.
+
+        Медленный ответ выполняется после задержки latency.
+        """
+        self.inject(fault)
+        if fault.kind == TIMEOUT:
+            self.sleep(self.timeout)
+            raise TransportError(REQUEST_TIMEOUT.format(self.timeout, url))
+        if fault.kind == SERVER_ERROR:
+            return Response(503, b'Service Unavailable')
+        if fault.kind == DENIAL:
+            return Response(200, DENIAL_BODY)
+        if fault.kind == MALFORMED:
+            return Response(200, MALFORMED_BODY)
+        self.sleep(fault.latency)
+        return None
+
+    def wrap_transport(self, transport):
+        """Транспорт с внедрёнными сбоями API."""
+        injector = self
+
+        class FaultyTransport:
+            def get(self, url, headers=None, params=None):
+                fault = injector.active(API_FAULTS)
+                if fault is not None:
+                    response = injector.fault_response(fault, url)
+                    if response is not None:
+                        return response
+                response = transport.get(url, headers=headers, params=params)
+                injector.served.append(injector.clock())
+                return response
+
+        return FaultyTransport()
+
+    def wrap_handler(self, handler):
+        """Обработчик FakeServer с внедрёнными сбоями API."""
+        def faulty_handler(path, query, headers):
+            fault = self.active(API_FAULTS)
+            if fault is not None:
+                try:
+                    response = self.fault_response(fault, path)
+                except TransportError:
+                    return 504, b''
+                if response is not None:
+                    return response.status_code, response.content
+            self.served.append(self.clock())
+            return handler(path, query, headers)
+        return faulty_handler
+
+    def wrap_sender(self, sender):
+        """Функция доставки, которая не доставляет во время сбоя Telegram."""
+        def faulty_sender(homework, message):
+            fault = self.active((TELEGRAM_DOWN,))
+            if fault is not None:
+                self.inject(fault)
+                self.sleep(fault.latency)
+                return False
+            delivered = sender(homework, message)
+            if delivered:
+                self.sent.append((self.clock(), homework, message))
+            return delivered
+        return faulty_sender
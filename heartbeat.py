@@ -0,0 +1,217 @@
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+STALLED = 'Компонент {} завис на этапе {}: нет сигнала {:.0f} с'
+RESTARTED = 'Компонент {} перезапущен на месте'
+RESTART_FAILED = 'Не удалось перезапустить компонент {}'
+STACKS = 'Стеки потоков:\n{}'
+HEALTH_STARTED = 'Проверки живости слушают порт {}'
+
+
+def dump_stacks():
+    """Стеки всех потоков процесса в виде текста."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    return '\n'.join(
+        f'--- {names.get(ident, ident)}\n'
+        + ''.join(traceback.format_stack(frame))
+        for ident, frame in sys._current_frames().items()
+    )
+
+
+class Watchdog:
+    """
+    Сторож зависших циклов по сигналам жизни.
+
+    Компоненты регистрируются с функцией перезапуска и сообщают этап,
+    на котором находятся, через beat. Если сигнала нет дольше deadline
+    секунд сверх ожидаемой длительности этапа, сторож пишет в журнал
+    этап и стеки потоков и перезапускает компонент. Зависший вызов
+    прервать нельзя, поэтому перезапуск бросает застрявшую работу
+    и начинает новую на месте, сохранённое состояние не теряется.
+    """
+
+    def __init__(self, deadline=300, interval=5, clock=time.monotonic):
+        """Задаёт допустимое молчание и период проверок в секундах."""
+        self.deadline = deadline
+        self.interval = interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.components = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def register(self, name, restart=None):
+        """Начинает следить за компонентом."""
+        with self.lock:
+            self.components[name] = dict(
+                restart=restart, stage='start', beat_at=None,
+                due=self.clock() + self.deadline, stalls=0, restarts=0,
+                failed=False,
+            )
+
+    def unregister(self, name):
+        """Перестаёт следить за компонентом."""
+        with self.lock:
+            self.components.pop(name, None)
+
+    def beat(self, name, stage, timeout=0):
+        """
+        Сигнал жизни компонента.
+
+            Параметры:
+                stage (str): этап, на котором находится компонент.
+                timeout (float): ожидаемая длительность этапа сверх
+                    deadline, например время сна между опросами.
+        """
+        now = self.clock()
+        with self.lock:
+            component = self.components.get(name)
+            if component is None:
+                return
+            component.update(
+                stage=stage, beat_at=now, due=now + self.deadline + timeout,
+                failed=False,
+            )
+
+    def check(self):
+        """
+        Перезапускает компоненты, пропустившие срок.
+
+            Возвращаемое значение (list): имена зависших компонентов.
+        """
+        now = self.clock()
+        with self.lock:
+            stalled = [
+                (name, dict(component))
+                for name, component in self.components.items()
+                if component['due'] < now
+            ]
+        for name, component in stalled:
+            silence = now - (component['beat_at'] or now - self.deadline)
+            logger.error(STALLED.format(name, component['stage'], silence))
+            logger.error(STACKS.format(dump_stacks()))
+            restarted = False
+            if component['restart'] is not None:
+                try:
+                    component['restart']()
+                    restarted = True
+                    logger.warning(RESTARTED.format(name))
+                except Exception:
+                    logger.exception(RESTART_FAILED.format(name))
+            with self.lock:
+                current = self.components.get(name)
+                if current is None:
+                    continue
+                current['stalls'] += 1
+                current['restarts'] += restarted
+                current['failed'] = not restarted
+                current.update(
+                    stage='restart', beat_at=None,
+                    due=self.clock() + self.deadline
+                )
+        return [name for name, _ in stalled]
+
+    def status(self):
+        """
+        Состояние для проверок живости и готовности.
+
+        Процесс жив, пока каждый зависший компонент удаётся
+        перезапустить; готов, когда все компоненты подали сигнал
+        после запуска и не просрочили его.
+        """
+        now = self.clock()
+        with self.lock:
+            components = {
+                name: dict(
+                    stage=component['stage'],
+                    silence=(
+                        None if component['beat_at'] is None
+                        else round(now - component['beat_at'], 1)
+                    ),
+                    overdue=component['due'] < now,
+                    stalls=component['stalls'],
+                    restarts=component['restarts'],
+                )
+                for name, component in self.components.items()
+            }
+            failed = any(
+                component['failed'] for component in self.components.values()
+            )
+        return dict(
+            live=not failed,
+            ready=not failed and all(
+                item['silence'] is not None and not item['overdue']
+                for item in components.values()
+            ),
+            components=components,
+        )
+
+    def start(self):
+        """Запускает проверки в фоновом потоке."""
+        self.thread = threading.Thread(
+            target=self.run, name='watchdog', daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def run(self):
+        """Проверяет компоненты каждые interval секунд до остановки."""
+        while not self.stopped.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        """Останавливает фоновые проверки."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    """Отвечает на /live и /ready состоянием сторожа."""
+
+    watchdog = None
+
+    def do_GET(self):
+        """Возвращает 200 или 503 и состояние компонентов в JSON."""
+        if self.path not in ('/live', '/ready'):
+            self.send_response(HTTPStatus.NOT_FOUND)
+            self.end_headers()
+            return
+        status = self.watchdog.status()
+        body = json.dumps(status, ensure_ascii=False).encode()
+        self.send_response(
+            HTTPStatus.OK if status[self.path[1:]]
+            else HTTPStatus.SERVICE_UNAVAILABLE
+        )
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Пишет журнал запросов в logging вместо stderr."""
+        logger.debug(format % args)
+
+
+def start_health(watchdog, port, host='127.0.0.1', poll_interval=0.5):
+    """
+    Запускает HTTP-проверки /live и /ready в фоновом потоке.
+
+    poll_interval — как часто сервер замечает shutdown, в секундах.
+    """
+    handler = type('Health', (HealthHandler,), dict(watchdog=watchdog))
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(
+        target=server.serve_forever, args=(poll_interval,), name='health',
+        daemon=True
+    ).start()
+    logger.info(HEALTH_STARTED.format(server.server_address[1]))
+    return server
@@ -0,0 +1,321 @@
+"""
+Журнал переходов статусов домашних работ и аналитика по нему.
+
+Запуск: python history.py --db history.sqlite3 stats [--project NAME]
+"""
+import argparse
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+VERDICTS = ('approved', 'rejected')
+REVIEWING = 'reviewing'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    homework_id TEXT NOT NULL,
+    homework_name TEXT,
+    project TEXT,
+    status TEXT NOT NULL,
+    previous_status TEXT,
+    date_updated INTEGER,
+    observed_at INTEGER NOT NULL,
+    review_seconds INTEGER
+);
+CREATE INDEX IF NOT EXISTS transitions_homework
+    ON transitions (tenant, homework_id, date_updated);
+CREATE INDEX IF NOT EXISTS transitions_project
+    ON transitions (project, status, date_updated);
+CREATE INDEX IF NOT EXISTS transitions_date
+    ON transitions (date_updated);
+CREATE TABLE IF NOT EXISTS project_stats (
+    project TEXT PRIMARY KEY,
+    transitions INTEGER NOT NULL DEFAULT 0,
+    approved INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    review_total INTEGER NOT NULL DEFAULT 0,
+    review_min INTEGER,
+    review_max INTEGER
+);
+'''
+INSERT_TRANSITION = '''
+INSERT INTO transitions (
+    tenant, homework_id, homework_name, project, status, previous_status,
+    date_updated, observed_at, review_seconds
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+UPSERT_STATS = '''
+INSERT INTO project_stats (
+    project, transitions, approved, rejected, reviews, review_total,
+    review_min, review_max
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (project) DO UPDATE SET
+    transitions = transitions + excluded.transitions,
+    approved = approved + excluded.approved,
+    rejected = rejected + excluded.rejected,
+    reviews = reviews + excluded.reviews,
+    review_total = review_total + excluded.review_total,
+    review_min = min(coalesce(review_min, excluded.review_min),
+                     coalesce(excluded.review_min, review_min)),
+    review_max = max(coalesce(review_max, excluded.review_max),
+                     coalesce(excluded.review_max, review_max))
+'''
+LAST_TRANSITION = '''
+SELECT status, date_updated FROM transitions
+WHERE tenant = ? AND homework_id = ?
+ORDER BY date_updated DESC, id DESC LIMIT 1
+'''
+PROJECT_STATS = '''
+SELECT project, transitions, approved, rejected, reviews, review_total,
+       review_min, review_max
+FROM project_stats {where} ORDER BY project
+'''
+TRANSITIONS = '''
+SELECT tenant, homework_id, homework_name, project, status, previous_status,
+       date_updated, review_seconds
+FROM transitions WHERE tenant = ? {where}
+ORDER BY date_updated, id
+'''
+TRANSITION_TIMES = '''
+SELECT date_updated FROM transitions
+WHERE date_updated IS NOT NULL {where}
+ORDER BY date_updated
+'''
+STATS_ROW = '{:<40} {:>8} {:>9} {:>9} {:>12} {:>10} {:>10}'
+
+
+def parse_date(value):
+    """Переводит дату из ответа API в секунды эпохи."""
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return int(date.timestamp())
+
+
+def summarize(rows):
+    """Сворачивает пачку переходов в строки сводной таблицы по проектам."""
+    summary = {}
+    for row in rows:
+        project, status, review_seconds = row[3], row[4], row[8]
+        if project not in summary:
+            summary[project] = [project, 0, 0, 0, 0, 0, None, None]
+        stats = summary[project]
+        stats[1] += 1
+        stats[2] += status == 'approved'
+        stats[3] += status == 'rejected'
+        if review_seconds is not None:
+            stats[4] += 1
+            stats[5] += review_seconds
+            if stats[6] is None or review_seconds < stats[6]:
+                stats[6] = review_seconds
+            if stats[7] is None or review_seconds > stats[7]:
+                stats[7] = review_seconds
+    return summary
+
+
+class HistoryStore:
+    """
+    Журнал переходов статусов в SQLite с индексами и сводной таблицей.
+
+    Переходы копятся в буфере и пишутся пачками в одной транзакции,
+    поэтому record не замедляет цикл опроса. Сводная таблица по проектам
+    обновляется вместе с пачкой, и агрегаты читаются без сканирования
+    журнала.
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=5.0):
+        """Открывает базу и создаёт схему."""
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.last = {}
+        self.last_flush = time.monotonic()
+
+    def last_transition(self, tenant, homework_id):
+        """Возвращает последний известный статус работы и его дату."""
+        key = (tenant, homework_id)
+        if key not in self.last:
+            row = self.connection.execute(
+                LAST_TRANSITION, key
+            ).fetchone()
+            self.last[key] = tuple(row) if row else (None, None)
+        return self.last[key]
+
+    def record(self, tenant, homework, observed_at=None):
+        """
+        Добавляет переход статуса в буфер записи.
+
+        Неразборчивая date_updated записывается как неизвестная.
+
+            Возвращаемое значение (bool): False, если статус работы
+                не изменился с прошлой записи.
+        """
+        homework_id = str(homework.get('id', homework.get('homework_name')))
+        status = homework.get('status')
+        try:
+            date_updated = parse_date(homework.get('date_updated'))
+        except (AttributeError, TypeError, ValueError):
+            date_updated = None
+        with self.lock:
+            previous, previous_date = self.last_transition(tenant, homework_id)
+            if previous == status:
+                return False
+            review_seconds = None
+            if (
+                previous == REVIEWING and status in VERDICTS
+                and date_updated is not None and previous_date is not None
+            ):
+                review_seconds = max(0, date_updated - previous_date)
+            self.last[(tenant, homework_id)] = (status, date_updated)
+            self.buffer.append((
+                tenant, homework_id, homework.get('homework_name'),
+                homework.get('lesson_name'), status, previous, date_updated,
+                int(observed_at or time.time()), review_seconds
+            ))
+            full = len(self.buffer) >= self.batch_size
+        if full:
+            self.flush()
+        return True
+
+    def maybe_flush(self):
+        """Сбрасывает буфер, если с прошлой записи прошло flush_interval."""
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Записывает буфер пачкой в одной транзакции."""
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+            self.last_flush = time.monotonic()
+            if not rows:
+                return
+            with self.connection:
+                self.connection.executemany(INSERT_TRANSITION, rows)
+                self.connection.executemany(
+                    UPSERT_STATS, summarize(rows).values()
+                )
+
+    def project_stats(self, project=None):
+        """
+        Возвращает агрегаты по проектам.
+
+            Возвращаемое значение (list): словари с числом вердиктов,
+                долей отклонений и временем проверки в секундах.
+        """
+        self.flush()
+        where, params = '', ()
+        if project is not None:
+            where, params = 'WHERE project = ?', (project,)
+        rows = self.connection.execute(
+            PROJECT_STATS.format(where=where), params
+        ).fetchall()
+        stats = []
+        for (
+            name, transitions, approved, rejected, reviews, review_total,
+            review_min, review_max
+        ) in rows:
+            verdicts = approved + rejected
+            stats.append(dict(
+                project=name,
+                transitions=transitions,
+                approved=approved,
+                rejected=rejected,
+                rejection_rate=rejected / verdicts if verdicts else None,
+                reviews=reviews,
+                review_avg=review_total / reviews if reviews else None,
+                review_min=review_min,
+                review_max=review_max,
+            ))
+        return stats
+
+    def transitions(self, tenant, homework_id=None, since=None, until=None):
+        """Возвращает переходы арендатора по индексу в хронологии."""
+        self.flush()
+        conditions, params = [], [tenant]
+        if homework_id is not None:
+            conditions.append('AND homework_id = ?')
+            params.append(str(homework_id))
+        if since is not None:
+            conditions.append('AND date_updated >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('AND date_updated < ?')
+            params.append(until)
+        cursor = self.connection.execute(
+            TRANSITIONS.format(where=' '.join(conditions)), params
+        )
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def transition_times(self, project=None, since=None):
+        """Моменты переходов всех арендаторов, по проекту или все."""
+        self.flush()
+        conditions, params = [], []
+        if project is not None:
+            conditions.append('AND project = ?')
+            params.append(project)
+        if since is not None:
+            conditions.append('AND date_updated >= ?')
+            params.append(since)
+        cursor = self.connection.execute(
+            TRANSITION_TIMES.format(where=' '.join(conditions)), params
+        )
+        return [row[0] for row in cursor]
+
+    def close(self):
+        """Сбрасывает буфер и закрывает базу."""
+        self.flush()
+        self.connection.close()
+
+
+def format_seconds(value):
+    """Форматирует длительность в часах."""
+    return '-' if value is None else f'{value / 3600:.1f} ч'
+
+
+def main():
+    """Выводит аналитику по журналу переходов."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', default='history.sqlite3')
+    commands = parser.add_subparsers(dest='command', required=True)
+    stats_parser = commands.add_parser('stats', help='агрегаты по проектам')
+    stats_parser.add_argument('--project')
+    log_parser = commands.add_parser('log', help='переходы арендатора')
+    log_parser.add_argument('tenant')
+    log_parser.add_argument('--homework')
+    args = parser.parse_args()
+    store = HistoryStore(args.db)
+    started = time.perf_counter()
+    if args.command == 'stats':
+        print(STATS_ROW.format(
+            'project', 'approved', 'rejected', 'rejection', 'reviews',
+            'avg', 'max'
+        ))
+        for row in store.project_stats(args.project):
+            rate = row['rejection_rate']
+            print(STATS_ROW.format(
+                str(row['project'])[:40], row['approved'], row['rejected'],
+                '-' if rate is None else f'{rate:.1%}', row['reviews'],
+                format_seconds(row['review_avg']),
+                format_seconds(row['review_max'])
+            ))
+    else:
+        for row in store.transitions(args.tenant, args.homework):
+            print(row)
+    print(f'{(time.perf_counter() - started) * 1000:.1f} ms')
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,159 @@
+import json
 import logging
 import os
+import queue
+import signal
 import sys
+import threading
 import time
+from functools import partial
 from http import HTTPStatus
 
 from dotenv import load_dotenv
 import requests
 from telebot import TeleBot
+from telebot.apihelper import ApiTelegramException
 
-from exceptions import StatusCodeException, DenialOfService
+from commands import Coalescer, register_commands, start_commands
+from decoders import decode_response, get_decoder
+from delivery import DeliveryExecutor
+from events import AuditSink, EmailDigestSink, EventBus, WebhookSink
+from exceptions import (
+    CycleCancelled, DenialOfService, StatusCodeException, TransportError
+)
+from fanout import Fanout
+from faults import FaultInjector, parse_schedule
+from heartbeat import Watchdog, start_health
+from history import HistoryStore
+from journal import Journal
+from latency import LatencyTracker
+from lease import LeaseKeeper, SqliteLease
+from logs import create_handlers
+from message_store import MessageStore
+from overload import LoadShedder, classify
+from poll_schedule import Scheduler
+from retry import Retrier
+from shard import Supervisor
+from snapshots import (
+    ADDED, COMMENT_CHANGED, STATUS_CHANGED, SnapshotDiffer, homework_key
+)
+from state import PollState
+from state_image import open_image, write_image
+from templates import LOCALES, Templates
+from transport import create_transport
+from watermark import WatermarkStore, advance
 
 load_dotenv()
 
 PRACTICUM_TOKEN = os.getenv('YP_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TG_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TG_CHAT_ID')
+TENANT_ID = os.getenv('TENANT_ID') or TELEGRAM_CHAT_ID
+HISTORY_PATH = os.getenv('HISTORY_DB')
+EDIT_IN_PLACE = os.getenv('TG_EDIT_IN_PLACE', 'false').lower() == 'true'
+MESSAGE_STORE_PATH = os.getenv('TG_MESSAGE_STORE')
+TELEGRAM_CHAT_IDS = [
+    chat_id.strip() for chat_id in os.getenv('TG_CHAT_IDS', '').split(',')
+    if chat_id.strip()
+]
+FANOUT_WORKERS = int(os.getenv('TG_FANOUT_WORKERS', 8))
+FANOUT_RETRIES = int(os.getenv('TG_FANOUT_RETRIES', 3))
+FANOUT_INTERVAL = float(os.getenv('TG_FANOUT_INTERVAL', 1))
+DELIVERY_WORKERS = int(os.getenv('TG_DELIVERY_WORKERS', 0))
+DELIVERY_QUEUE_SIZE = int(os.getenv('TG_DELIVERY_QUEUE_SIZE', 100))
+DELIVERY_POLICY = os.getenv('TG_DELIVERY_POLICY', 'block')
+DELIVERY_SPILL_PATH = os.getenv('TG_DELIVERY_SPILL', 'delivery_spill.jsonl')
+DELIVERY_ATTEMPTS = int(os.getenv('TG_DELIVERY_ATTEMPTS', 3))
+DELIVERY_DEAD_LETTER_PATH = os.getenv(
+    'TG_DELIVERY_DEAD_LETTER', 'delivery_failed.jsonl'
+)
+DELIVERY_REVIVE_INTERVAL = float(os.getenv('TG_DELIVERY_REVIVE_INTERVAL', 60))
+REQUEST_TIMEOUT = float(os.getenv('YP_TIMEOUT', 30))
+TRANSPORT = create_transport(
+    os.getenv('YP_TRANSPORT', 'requests'), REQUEST_TIMEOUT
+)
+PREFETCHED = {}
+FAULT_SCHEDULE = os.getenv('YP_FAULTS', '')
+FAULTS = FaultInjector(
+    parse_schedule(FAULT_SCHEDULE, time.time())
+) if FAULT_SCHEDULE else None
+if FAULTS is not None:
+    TRANSPORT = FAULTS.wrap_transport(TRANSPORT)
+RETRY_BUDGET = float(os.getenv('YP_RETRY_BUDGET', 120))
+RETRY_REPORT_INTERVAL = float(os.getenv('YP_RETRY_REPORT_INTERVAL', 3600))
+EVENT_SINKS = [
+    sink.strip() for sink in os.getenv('EVENT_SINKS', '').split(',')
+    if sink.strip()
+]
+EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', 1000))
+EVENT_POLICY = os.getenv('EVENT_POLICY', 'spill')
+AUDIT_LOG_PATH = os.getenv('AUDIT_LOG_PATH', 'status_audit.jsonl')
+LMS_WEBHOOK_URL = os.getenv('LMS_WEBHOOK_URL')
+SMTP_HOST = os.getenv('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 25))
+EMAIL_FROM = os.getenv('EMAIL_FROM')
+EMAIL_TO = [
+    email.strip() for email in os.getenv('EMAIL_TO', '').split(',')
+    if email.strip()
+]
+EMAIL_DIGEST_INTERVAL = float(os.getenv('EMAIL_DIGEST_INTERVAL', 3600))
+COMMANDS_MODE = os.getenv('TG_COMMANDS', 'off')
+COMMANDS_NOW_MAX_AGE = float(os.getenv('TG_COMMANDS_NOW_MAX_AGE', 60))
+WEBHOOK_URL = os.getenv('TG_WEBHOOK_URL')
+WEBHOOK_PORT = int(os.getenv('TG_WEBHOOK_PORT', 8443))
+WEBHOOK_SECRET = os.getenv('TG_WEBHOOK_SECRET')
+DECODE_JSON = get_decoder(os.getenv('YP_JSON_DECODER', 'auto'))
+LEASE_PATH = os.getenv('LEASE_DB')
+LEASE_TTL = float(os.getenv('LEASE_TTL', 15))
+POLL_BUDGET = int(os.getenv('YP_POLL_BUDGET', 0))
+POLL_PROJECT = os.getenv('YP_POLL_PROJECT')
+JOURNAL_DIR = os.getenv('YP_JOURNAL_DIR')
+JOURNAL_SEGMENT = int(os.getenv('YP_JOURNAL_SEGMENT', 64 * 1024 * 1024))
+JOURNAL = Journal(JOURNAL_DIR, JOURNAL_SEGMENT) if JOURNAL_DIR else None
+LATENCY_WINDOW = float(os.getenv('LATENCY_WINDOW', 24 * 3600))
+LATENCY_ALERT = float(os.getenv('LATENCY_ALERT', 0))
+LATENCY_ALERT_PERCENTILE = float(os.getenv('LATENCY_ALERT_PERCENTILE', 0.95))
+LATENCY = LatencyTracker(
+    LATENCY_WINDOW, LATENCY_ALERT or None, LATENCY_ALERT_PERCENTILE
+)
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', 0))
+SHARD_TENANTS = os.getenv('SHARD_TENANTS', 'tenants.jsonl')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_SAMPLING_INTERVAL = float(os.getenv('LOG_SAMPLING_INTERVAL', 60))
+LOG_SAMPLING_BURST = int(os.getenv('LOG_SAMPLING_BURST', 1))
+TEMPLATE_LOCALE = os.getenv('TG_LOCALE', 'ru')
+TEMPLATE_FORMAT = os.getenv('TG_FORMAT', 'plain')
+TEMPLATES = Templates(cache_size=int(os.getenv('TG_TEMPLATE_CACHE', 4096)))
+MESSAGES = TEMPLATES.renderer(TEMPLATE_LOCALE, TEMPLATE_FORMAT)
+WATERMARK_OVERLAP = int(os.getenv('YP_WATERMARK_OVERLAP', 300))
+WATERMARK_PATH = os.getenv('YP_WATERMARK_DB')
+WATERMARKS = WatermarkStore(WATERMARK_PATH) if WATERMARK_PATH else None
+WATCHDOG_DEADLINE = float(os.getenv('WATCHDOG_DEADLINE', 0))
+WATCHDOG_INTERVAL = float(os.getenv('WATCHDOG_INTERVAL', 5))
+WATCHDOG_PORT = int(os.getenv('WATCHDOG_PORT', 0))
+WATCHDOG = Watchdog(
+    WATCHDOG_DEADLINE, WATCHDOG_INTERVAL
+) if WATCHDOG_DEADLINE else None
+POLL_LOOP = 'poll'
+# Подмены для main: часы, ожидание между опросами и число опросов.
+# None — time.time, time.sleep и бесконечный цикл.
+MAIN_CLOCK = None
+MAIN_SLEEP = None
+MAIN_ITERATIONS = None
+STATE_IMAGE_DIR = os.getenv('SHARD_STATE_IMAGE_DIR')
+STATE_IMAGE_INTERVAL = float(os.getenv('SHARD_STATE_IMAGE_INTERVAL', 300))
+LOAD_SHED_MAX_STRETCH = int(os.getenv('LOAD_SHED_MAX_STRETCH', 8))
+LOAD_SHED_HIGH = float(os.getenv('LOAD_SHED_HIGH', 1.0))
+LOAD_SHED_LOW = float(os.getenv('LOAD_SHED_LOW', 0.7))
+LOAD_SHED_APPROVED_AFTER = float(
+    os.getenv('LOAD_SHED_APPROVED_AFTER', 7 * 24 * 3600)
+)
 
 RETRY_PERIOD = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
-HOMEWORK_VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
+HOMEWORK_VERDICTS = LOCALES['ru']['verdicts']
 
 logger = logging.getLogger(__name__)
 
@@ -50,11 +179,16 @@ SUCCESSFUL_SENDING = 'Удачная отправка сообщения в Tele
 MSG_NO_SEND = 'Сообщение {} не отправлено {}'
 
 
-def send_message(bot, message):
-    """Отправляет сообщение в Telegram чат."""
+def markup(parse_mode):
+    """Аргументы разметки для Bot API, пустые для простого текста."""
+    return {'parse_mode': parse_mode} if parse_mode else {}
+
+
+def send_to_chat(bot, chat_id, message, parse_mode=None):
+    """Отправляет сообщение в указанный чат Telegram."""
     try:
         logging.debug(START_OF_SENDING.format(message))
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        bot.send_message(chat_id, message, **markup(parse_mode))
         logging.debug(SUCCESSFUL_SENDING.format(message))
         return True
     except Exception as error:
@@ -62,6 +196,125 @@ def send_message(bot, message):
         return False
 
 
+def send_message(bot, message):
+    """Отправляет сообщение в Telegram чат."""
+    return send_to_chat(bot, TELEGRAM_CHAT_ID, message, MESSAGES.parse_mode)
+
+
+START_OF_EDITING = 'Начало редактирования сообщения {} в Telegram: {}'
+SUCCESSFUL_EDITING = 'Удачное редактирование сообщения {} в Telegram: {}'
+NOT_MODIFIED = 'message is not modified'
+NOT_EDITABLE = ('message to edit not found', "message can't be edited")
+EDIT_REPLACED = 'Сообщение {} нельзя отредактировать ({}), отправляется новое'
+
+
+def post_message(bot, store, chat_id, homework_id, message):
+    """Отправляет новое сообщение о домашней работе и запоминает его id."""
+    logging.debug(START_OF_SENDING.format(message))
+    sent = bot.send_message(chat_id, message, **markup(MESSAGES.parse_mode))
+    if sent is not None:
+        store.set(chat_id, homework_id, sent.message_id)
+    logging.debug(SUCCESSFUL_SENDING.format(message))
+
+
+def edit_message(bot, store, chat_id, homework, message):
+    """
+    Обновляет сообщение о домашней работе или отправляет новое.
+
+    Новое сообщение отправляется для домашней работы, о которой в чат
+    ещё ничего не писали, а также если прежнее сообщение удалено или
+    больше не редактируется; его id заменяется id нового.
+    """
+    homework_id = homework_key(homework)
+    message_id = store.get(chat_id, homework_id)
+    try:
+        if message_id is not None:
+            try:
+                logging.debug(START_OF_EDITING.format(message_id, message))
+                bot.edit_message_text(
+                    message, chat_id, message_id,
+                    **markup(MESSAGES.parse_mode)
+                )
+                logging.debug(SUCCESSFUL_EDITING.format(message_id, message))
+                return True
+            except ApiTelegramException as error:
+                if NOT_MODIFIED in str(error):
+                    return True
+                if not any(reason in str(error) for reason in NOT_EDITABLE):
+                    raise
+                logging.warning(EDIT_REPLACED.format(message_id, error))
+        post_message(bot, store, chat_id, homework_id, message)
+        return True
+    except Exception as error:
+        logging.exception(MSG_NO_SEND.format(message, error))
+        return False
+
+
+def deliver(bot, store, fanout, homework, message):
+    """
+    Доставляет сообщение о статусе домашней работы в Telegram.
+
+    Сообщения без домашней работы (о сбоях) всегда отправляются новыми.
+    """
+    def send(chat_id, text):
+        if store is None or homework is None:
+            return send_to_chat(bot, chat_id, text, MESSAGES.parse_mode)
+        return edit_message(bot, store, chat_id, homework, text)
+
+    if fanout is not None:
+        return fanout.deliver(message, send)
+    if store is None or homework is None:
+        return send_message(bot, message)
+    return send(TELEGRAM_CHAT_ID, message)
+
+
+def create_sinks(telegram):
+    """Собирает приёмники шины событий из EVENT_SINKS; вебхук — при URL."""
+    sinks = {'telegram': telegram}
+    if 'audit' in EVENT_SINKS:
+        sinks['audit'] = AuditSink(AUDIT_LOG_PATH, TENANT_ID)
+    if 'webhook' in EVENT_SINKS and LMS_WEBHOOK_URL:
+        sinks['webhook'] = WebhookSink(LMS_WEBHOOK_URL, TENANT_ID)
+    if 'email' in EVENT_SINKS:
+        sinks['email'] = EmailDigestSink(
+            SMTP_HOST, SMTP_PORT, EMAIL_FROM, EMAIL_TO, EMAIL_DIGEST_INTERVAL
+        )
+    return sinks
+
+
+def create_sender(bot):
+    """
+    Собирает функцию доставки sender(homework, message) по настройкам.
+
+    При заданных EVENT_SINKS события раздаются через шину во все
+    приёмники, включая Telegram. При TG_DELIVERY_WORKERS > 0 сообщения
+    уходят через ограниченную очередь в отдельных потоках. В обоих
+    случаях цикл опроса не ждёт доставки, а недоставленные сообщения
+    повторяются и сохраняются очередью. При рассылке в несколько чатов
+    повторы делает Fanout, очередь их не дублирует.
+    """
+    store = MessageStore(MESSAGE_STORE_PATH) if EDIT_IN_PLACE else None
+    fanout = Fanout(
+        TELEGRAM_CHAT_IDS, FANOUT_WORKERS, FANOUT_RETRIES, FANOUT_INTERVAL
+    ) if TELEGRAM_CHAT_IDS else None
+    sender = LATENCY.wrap(partial(deliver, bot, store, fanout), TENANT_ID)
+    if EVENT_SINKS:
+        return EventBus(
+            create_sinks(sender), max(DELIVERY_WORKERS, 1), EVENT_QUEUE_SIZE,
+            EVENT_POLICY, os.path.dirname(DELIVERY_SPILL_PATH) or '.',
+            own_retries={'telegram'} if fanout else (),
+            revive_interval=DELIVERY_REVIVE_INTERVAL
+        ).publish
+    if not DELIVERY_WORKERS:
+        return sender
+    return DeliveryExecutor(
+        sender, DELIVERY_WORKERS, DELIVERY_QUEUE_SIZE, DELIVERY_POLICY,
+        DELIVERY_SPILL_PATH, attempts=1 if fanout else DELIVERY_ATTEMPTS,
+        dead_letter_path=DELIVERY_DEAD_LETTER_PATH,
+        revive_interval=DELIVERY_REVIVE_INTERVAL
+    ).submit
+
+
 SANDING_REQUEST = (
     'Отправка запроса к API {url};\nзаголовки: {headers};\n'
     'параметры {params}'
@@ -88,27 +341,63 @@ def get_api_answer(timestamp):
             timestamp (int): время в сек.
         Возвращаемое значение (str): статус сервиса.
     """
-    request_params = dict(
+    return fetch_api_answer(timestamp, HEADERS, TENANT_ID)
+
+
+def api_request(timestamp, headers):
+    """Параметры запроса к API для транспорта."""
+    return dict(
         url=ENDPOINT,
-        headers=HEADERS,
+        headers=headers,
         params={'from_date': timestamp}
     )
+
+
+def redacted(request_params):
+    """Параметры запроса для журнала и сообщений: токен скрыт."""
+    headers = dict(request_params['headers'])
+    if 'Authorization' in headers:
+        scheme = headers['Authorization'].split(' ', 1)[0]
+        headers['Authorization'] = f'{scheme} ***'
+    return dict(request_params, headers=headers)
+
+
+def fetch_api_answer(timestamp, headers, tenant, journal=None):
+    """
+    Запрос к API от имени арендатора с его заголовками.
+
+    Ответ, заранее полученный пачкой для того же from_date
+    (prefetch_answers), используется вместо нового запроса. Сырой ответ
+    пишется в journal, по умолчанию — в общий JOURNAL.
+    """
+    journal = JOURNAL if journal is None else journal
+    request_params = api_request(timestamp, headers)
+    shown = redacted(request_params)
     try:
-        response = requests.get(**request_params)
-    except requests.RequestException as error:
+        response = PREFETCHED.pop((tenant, timestamp), None)
+        if isinstance(response, Exception):
+            raise response
+        if response is None:
+            response = TRANSPORT.get(**request_params)
+    except (requests.RequestException, TransportError) as error:
         raise ConnectionError(
-            UNAVAILABLE_ENDPOINT.format(error, request_params)
+            UNAVAILABLE_ENDPOINT.format(error, shown)
         )
-    logger.debug(SANDING_REQUEST.format(**request_params))
+    logger.debug(
+        SANDING_REQUEST.format(**shown), extra={'log_key': ('request', tenant)}
+    )
+    if journal is not None:
+        journal.append(tenant, response.status_code, response.content)
     if response.status_code != HTTPStatus.OK:
         raise StatusCodeException(
-            STATUS_CODE.format(response.status_code, request_params)
+            STATUS_CODE.format(response.status_code, shown),
+            response.status_code
         )
-    response_json = response.json()
+    response_json = decode_response(response, DECODE_JSON)
     for key in ['code', 'error']:
         if key in response_json:
             raise DenialOfService(
-                DENIAL_SERVICE.format(key, response[key], request_params)
+                DENIAL_SERVICE.format(key, response_json[key], shown)
             )
     return response_json
 
@@ -130,10 +419,6 @@ def check_response(response):
     return homeworks
 
 
-UPDATE_STATUS = (
-    'Изменился статус проверки работы "{}".\n'
-    '{}'
-)
 KEY_ERROR_NAME = 'No "homework_name" at homework keys.'
 KEY_ERROR_STATUS = 'No "status" at homework keys.'
 VALUE_ERROR_STATUS = 'Неожиданный статус домашней работы: {}'
@@ -141,6 +426,11 @@ VALUE_ERROR_STATUS = 'Неожиданный статус домашней ра
 
 def parse_status(homework):
     """Извлекает статус домашней работы."""
+    return render_status(homework, MESSAGES)
+
+
+def render_status(homework, messages):
+    """Сообщение о статусе работы на языке и в формате messages."""
     if 'homework_name' not in homework:
         raise KeyError(KEY_ERROR_NAME)
     if 'status' not in homework:
@@ -148,51 +438,699 @@ def parse_status(homework):
     status = homework['status']
     if status not in HOMEWORK_VERDICTS:
         raise ValueError(VALUE_ERROR_STATUS.format(status))
-    return UPDATE_STATUS.format(
-        homework['homework_name'], HOMEWORK_VERDICTS[status]
-    )
+    return messages.status(homework['homework_name'], status)
+
+
+CHANGE_SKIPPED = 'Изменение {} домашней работы {} без уведомления'
+MALFORMED_HOMEWORK = 'Работа {} пропущена, уведомление не собрано: {}'
+
+
+def render_change(change, messages=MESSAGES):
+    """Готовит текст уведомления об изменении или None, если оно не нужно."""
+    if change.kind in (ADDED, STATUS_CHANGED):
+        return render_status(change.homework, messages)
+    if change.kind == COMMENT_CHANGED:
+        return messages.comment(
+            change.homework.get('homework_name'),
+            change.homework.get('reviewer_comment')
+        )
+    logger.debug(CHANGE_SKIPPED.format(change.kind, change.key))
+    return None
+
+
+def notify_changes(
+    sender, differ, homeworks, history=None, messages=MESSAGES,
+    tenant=TENANT_ID
+):
+    """
+    Уведомляет об изменениях домашних работ с прошлого опроса.
+
+    Переходы статусов работ, для которых собирается сообщение,
+    записываются в журнал history под арендатором tenant, если журнал
+    задан.
+    Работа, для которой не собирается сообщение (неизвестный статус,
+    нет нужных ключей), логируется и принимается в снимок, чтобы
+    не задерживать остальные уведомления и водяной знак; о ней снова
+    сообщится, когда она изменится.
+
+        Возвращаемое значение (tuple): число найденных изменений
+            и список работ, уведомления о которых не доставлены.
+    """
+    changes = differ.diff(homeworks)
+    undelivered = []
+    for change in changes:
+        try:
+            message = render_change(change, messages)
+        except (KeyError, ValueError) as error:
+            logger.error(MALFORMED_HOMEWORK.format(change.key, error))
+            differ.accept(change)
+            continue
+        if history is not None and change.kind in (ADDED, STATUS_CHANGED):
+            history.record(tenant, change.homework)
+        if message is None or sender(change.homework, message):
+            differ.accept(change)
+        else:
+            undelivered.append(change.homework)
+    if history is not None:
+        history.maybe_flush()
+    return len(changes), undelivered
 
 
 NO_NEW_STATUS = 'Отсутствие в ответе новых статусов'
-FAILURE = 'Сбой в работе программы: {}.'
+CYCLE_CANCELLED = 'Цикл опроса отменён после перезапуска, результат отброшен'
+
+
+def create_state(clock=None, sleep=None):
+    """
+    Создаёт состояние цикла опроса.
+
+        Параметры:
+            clock (callable): источник времени в секундах,
+                по умолчанию time.time.
+            sleep (callable): функция ожидания для повторов,
+                по умолчанию time.sleep.
+
+    При заданном YP_WATERMARK_DB опрос продолжается с сохранённого
+    водяного знака.
+    """
+    clock = clock or time.time
+    return PollState(
+        timestamp=int(clock()),
+        differ=SnapshotDiffer(),
+        retrier=Retrier(
+            RETRY_PERIOD, budget=RETRY_BUDGET,
+            sleep=sleep or time.sleep, clock=clock,
+            report_interval=RETRY_REPORT_INTERVAL or None
+        ),
+        history=HistoryStore(HISTORY_PATH) if HISTORY_PATH else None,
+        clock=clock,
+        tenant=TENANT_ID,
+        watermarks=WATERMARKS,
+    ).resume()
+
+
+def heartbeat(stage, timeout=0):
+    """Сигнал жизни цикла опроса для сторожа, если он включён."""
+    if WATCHDOG is not None:
+        WATCHDOG.beat(POLL_LOOP, stage, timeout)
+
+
+def ensure_current(state, generation):
+    """Прерывает цикл, если state отменён после его начала."""
+    if state.generation != generation:
+        raise CycleCancelled()
+
+
+def send_current(sender, state, generation, homework, message):
+    """Отправляет сообщение, только если цикл не отменён."""
+    ensure_current(state, generation)
+    return sender(homework, message)
+
+
+def notify_failure(sender, state, messages, error):
+    """
+    Сообщает о сбое цикла, если сообщение изменилось.
+
+        Возвращаемое значение (bool): False, если цикл отменён.
+    """
+    new_status = messages.failure(error)
+    logger.error(
+        new_status,
+        extra={'log_key': ('failure', state.tenant, type(error).__name__)}
+    )
+    try:
+        if new_status != state.old_status and sender(None, new_status):
+            state.old_status = new_status
+    except CycleCancelled:
+        logger.warning(CYCLE_CANCELLED)
+        return False
+    return True
+
+
+def run_cycle(sender, state):
+    """
+    Выполняет один цикл опроса без ожидания в конце.
+
+    Всё, что переживает цикл, хранится в state, поэтому цикл можно
+    вызывать напрямую из тестов и симуляций. Если за время цикла
+    state отменён (state.cancel), цикл завершается, не меняя состояние
+    и не отправляя сообщений: его продолжает новый поток.
+    """
+    state.cycles += 1
+    generation = state.generation
+    messages = state.messages or MESSAGES
+    send = partial(send_current, sender, state, generation)
+    try:
+        heartbeat('fetch', state.retrier.budget)
+        response = state.retrier.call(
+            state.fetch or get_api_answer, state.timestamp
+        )
+        ensure_current(state, generation)
+        homeworks = check_response(response)
+        state.remember(homeworks)
+        heartbeat('notify')
+        changes, undelivered = notify_changes(
+            send, state.differ, homeworks, state.history, messages,
+            state.tenant
+        )
+        if not changes:
+            logger.error(NO_NEW_STATUS)
+        elif not undelivered:
+            state.old_status = ''
+        state.timestamp = advance(
+            state.timestamp, response.get('current_date'), undelivered,
+            WATERMARK_OVERLAP
+        )
+    except CycleCancelled:
+        logger.warning(CYCLE_CANCELLED)
+        return
+    except Exception as error:
+        if not notify_failure(send, state, messages, error):
+            return
+    state.persist()
+
+
+def lead_cycle(sender, state, keeper):
+    """
+    Цикл опроса в режиме ведущий/резерв.
+
+    Резервный процесс пропускает цикл. Ведущий после цикла сохраняет
+    водяной знак и снимок в checkpoint аренды, с которого продолжит
+    резерв, если ведущий упадёт.
+    """
+    if not keeper.leading:
+        return
+    generation = state.generation
+    run_cycle(sender, state)
+    if state.generation == generation:
+        keeper.lease.save(state.checkpoint())
+
+
+def terminate(signum, frame):
+    """Завершает процесс по сигналу через SystemExit: finally срабатывают."""
+    raise SystemExit(128 + signum)
+
+
+def create_keeper(state):
+    """
+    Запускает аренду ведущего процесса, если задан LEASE_DB.
+
+    При получении аренды состояние восстанавливается из checkpoint.
+    SIGTERM завершает процесс через SystemExit, поэтому main успевает
+    отдать аренду и резерв не ждёт истечения её срока.
+    """
+    if not LEASE_PATH:
+        return None
+
+    def restore(checkpoint):
+        if checkpoint is not None:
+            state.restore(checkpoint)
+
+    signal.signal(signal.SIGTERM, terminate)
+    return LeaseKeeper(
+        SqliteLease(LEASE_PATH, f'poller-{TENANT_ID}', ttl=LEASE_TTL),
+        on_acquire=restore
+    ).start()
+
+
+NO_HISTORY_FOR_SCHEDULE = (
+    'Предсказательный опрос требует HISTORY_DB, период опроса постоянный'
+)
+
+
+def create_scheduler(state):
+    """
+    Включает предсказательный опрос, если задан YP_POLL_BUDGET.
+
+    Расписание учится на журнале переходов, поэтому без HISTORY_DB
+    остаётся постоянный период RETRY_PERIOD.
+    """
+    if not POLL_BUDGET:
+        return None
+    if state.history is None:
+        logger.error(NO_HISTORY_FOR_SCHEDULE)
+        return None
+    return Scheduler(state.history, POLL_BUDGET, POLL_PROJECT)
+
+
+def run(poll, pace, clock=time.monotonic, iterations=None, cancelled=None):
+    """
+    Цикл опроса: после каждого опроса отдаёт паузу до следующего.
+
+    Ждёт вызывающий: main — time.sleep или keeper.wait до смены роли,
+    поток под сторожем — событие отмены; тесты подставляют свои часы.
+
+        Параметры:
+            poll (callable): один опрос, например Coalescer.poll.
+            pace (callable): пауза по длительности опроса в секундах.
+            clock (callable): часы для длительности опроса.
+            iterations (int): число опросов, None — бесконечно.
+            cancelled (threading.Event): отмена цикла; брошенный
+                сторожем опрос не влияет на расчёт паузы.
+    """
+    cancelled = cancelled or threading.Event()
+    while (iterations is None or iterations > 0) and not cancelled.is_set():
+        heartbeat('poll')
+        started = clock()
+        poll()
+        if cancelled.is_set():
+            return
+        period = pace(clock() - started)
+        heartbeat('sleep', period)
+        yield period
+        if iterations is not None:
+            iterations -= 1
+
+
+def load_tenants(path):
+    """Читает арендаторов из JSONL: id, token, chat_id, locale и format."""
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def tenant_messages(tenant):
+    """Отрисовщик сообщений на языке и в формате арендатора."""
+    return TEMPLATES.renderer(
+        tenant.get('locale', TEMPLATE_LOCALE),
+        tenant.get('format', TEMPLATE_FORMAT)
+    )
+
+
+def tenant_headers(tenant):
+    """Заголовки запроса к API с токеном арендатора."""
+    return {'Authorization': f'OAuth {tenant["token"]}'}
+
+
+def prefetch_answers(tenants, states):
+    """
+    Запрашивает ответы API для круга опроса одной пачкой.
+
+    Если транспорт умеет get_many (YP_TRANSPORT=async), запросы всех
+    арендаторов круга идут конкурентно по общим соединениям,
+    а run_cycle берёт готовый ответ. Иначе ничего не делает.
+    """
+    if not hasattr(TRANSPORT, 'get_many') or not states:
+        return
+    results = TRANSPORT.get_many([
+        api_request(state.timestamp, tenant_headers(tenants[state.tenant]))
+        for state in states
+    ])
+    for state, result in zip(states, results):
+        PREFETCHED[(state.tenant, state.timestamp)] = result
+
+
+def create_tenant_state(
+    tenant, clock=None, sleep=None, watermarks=None, image=None, journal=None
+):
+    """
+    Состояние цикла опроса арендатора с его токеном API и языком.
+
+    Состояние берётся из образа image, если арендатор в нём есть
+    и не сохранён в хранилище водяных знаков позже образа,
+    иначе — из хранилища.
+    """
+    clock = clock or time.time
+    state = PollState(
+        timestamp=int(clock()),
+        differ=SnapshotDiffer(),
+        retrier=Retrier(
+            RETRY_PERIOD, budget=RETRY_BUDGET,
+            sleep=sleep or time.sleep, clock=clock
+        ),
+        clock=clock,
+        fetch=partial(
+            fetch_api_answer,
+            headers=tenant_headers(tenant),
+            tenant=tenant['id'],
+            journal=journal
+        ),
+        messages=tenant_messages(tenant),
+        tenant=tenant['id'],
+        watermarks=watermarks,
+    )
+    if image is None or not image.restore(state, tenant['id']):
+        state.resume()
+    return state
+
+
+def create_tenant_sender(bot, tenant, shedder=None):
+    """Доставка в чат арендатора с учётом задержки и перегрузки."""
+    parse_mode = tenant_messages(tenant).parse_mode
+
+    def send(homework, message):
+        return send_to_chat(bot, tenant['chat_id'], message, parse_mode)
+    sender = LATENCY.wrap(send, tenant['id'])
+    return sender if shedder is None else shedder.wrap_sender(sender)
+
+
+def shard_worker(node, tenants, control, metrics):
+    """
+    Процесс-обработчик доли арендаторов в режиме супервизора.
+
+    Состояния арендаторов, оставшихся после перебалансировки,
+    сохраняются; новый список приходит через control, None — остановка.
+    Водяные знаки пишутся через собственное соединение процесса.
+    Если круг не укладывается в период, неактивные арендаторы
+    опрашиваются реже, а сообщения о сбоях откладываются. С асинхронным
+    транспортом запросы круга уходят одной пачкой (prefetch_answers).
+    С SHARD_STATE_IMAGE_DIR состояния раз в SHARD_STATE_IMAGE_INTERVAL
+    и при остановке пишутся в образ, с которого продолжает следующий
+    запуск обработчика той же доли.
+
+    Журнал ответов обработчик пишет в свой подкаталог shard-<node>
+    каталога YP_JOURNAL_DIR: индекс сегмента не рассчитан на запись
+    из нескольких процессов. Гистограмма задержек доставки уходит
+    супервизору вместе с метриками круга. Настройки одиночного режима,
+    которые здесь не применяются, отсекает supervise.
+    """
+    journal = Journal(
+        os.path.join(JOURNAL_DIR, f'shard-{node}'), JOURNAL_SEGMENT
+    ) if JOURNAL_DIR else None
+    bot = TeleBot(token=TELEGRAM_TOKEN)
+    watermarks = WatermarkStore(WATERMARK_PATH) if WATERMARK_PATH else None
+    shedder = create_shedder()
+    image_path = state_image_path(node)
+    image = open_image(
+        image_path, watermarks and watermarks.saved_after
+    )
+    imaged_at = time.monotonic()
+    workers = {}
+    while tenants is not None:
+        forget_moved(shedder, workers, tenants)
+        workers = {
+            tenant['id']: workers.get(tenant['id']) or (
+                create_tenant_state(
+                    tenant, watermarks=watermarks, image=image,
+                    journal=journal
+                ),
+                create_tenant_sender(bot, tenant, shedder)
+            )
+            for tenant in tenants
+        }
+        started = time.monotonic()
+        due = [
+            (state, sender) for key, (state, sender) in workers.items()
+            if shedder is None or shedder.due(key, tenant_priority(state))
+        ]
+        prefetch_answers(
+            {tenant['id']: tenant for tenant in tenants},
+            [state for state, _ in due]
+        )
+        for state, sender in due:
+            run_cycle(sender, state)
+        PREFETCHED.clear()
+        elapsed = time.monotonic() - started
+        shedding = {}
+        if shedder is not None:
+            shedder.observe(elapsed)
+            shedding = shedder.stats()
+        metrics.put(dict(
+            node=node, pid=os.getpid(), tenants=len(workers), round=elapsed,
+            cycles=sum(state.cycles for state, _ in workers.values()),
+            failures=sum(
+                bool(state.old_status) for state, _ in workers.values()
+            ),
+            stretch=shedding.get('stretch', 1),
+            skipped=shedding.get('skipped', 0),
+            deferred=shedding.get('deferred', 0),
+            latency=dict(LATENCY.overall.counts()),
+            retries=sum(
+                state.retrier.retries for state, _ in workers.values()
+            ),
+            recovered=sum(
+                state.retrier.recovered for state, _ in workers.values()
+            ),
+        ))
+        if image_path and (
+            time.monotonic() - imaged_at >= STATE_IMAGE_INTERVAL
+        ):
+            save_state_image(image_path, workers)
+            imaged_at = time.monotonic()
+        try:
+            tenants = control.get(timeout=max(0, RETRY_PERIOD - elapsed))
+        except queue.Empty:
+            pass
+    if image_path:
+        save_state_image(image_path, workers)
+
+
+def forget_moved(shedder, workers, tenants):
+    """Забывает в shedder арендаторов, ушедших к другому обработчику."""
+    if shedder is None:
+        return
+    for key in workers.keys() - {tenant['id'] for tenant in tenants}:
+        shedder.forget(key)
+
+
+STATE_IMAGE_SAVED = 'Образ состояний {} записан: арендаторов {}, байт {}'
+STATE_IMAGE_FAILED = 'Не удалось записать образ состояний {}: {}'
+
+
+def state_image_path(node):
+    """Путь к образу состояний доли node или None, если образы выключены."""
+    if not STATE_IMAGE_DIR:
+        return None
+    return os.path.join(STATE_IMAGE_DIR, f'shard-{node}.img')
+
+
+def save_state_image(path, workers):
+    """Пишет образ состояний обработчика; сбой записи только логируется."""
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        size = write_image(
+            path, {key: state for key, (state, _) in workers.items()},
+            tenant_priority
+        )
+    except OSError as error:
+        logger.error(STATE_IMAGE_FAILED.format(path, error))
+    else:
+        logger.debug(STATE_IMAGE_SAVED.format(path, len(workers), size))
+
+
+SHARD_UNSUPPORTED = (
+    'Режим супервизора (SHARD_WORKERS) не поддерживает настройки: {}. '
+    'Уберите их или запустите бота без SHARD_WORKERS'
+)
+
+
+def shard_unsupported():
+    """Заданные настройки, которые обработчики долей не учитывают."""
+    settings = dict(
+        HISTORY_DB=HISTORY_PATH,
+        TG_EDIT_IN_PLACE=EDIT_IN_PLACE,
+        TG_CHAT_IDS=TELEGRAM_CHAT_IDS,
+        EVENT_SINKS=EVENT_SINKS,
+        TG_DELIVERY_WORKERS=DELIVERY_WORKERS,
+        YP_POLL_BUDGET=POLL_BUDGET,
+        YP_FAULTS=FAULT_SCHEDULE,
+        LEASE_DB=LEASE_PATH,
+        TG_COMMANDS=COMMANDS_MODE != 'off',
+    )
+    return [name for name, value in settings.items() if value]
+
+
+def supervise():
+    """
+    Раздаёт арендаторов из SHARD_TENANTS процессам SHARD_WORKERS.
+
+    При включённом стороже обработчик, не приславший метрики дольше
+    периода опроса и WATCHDOG_DEADLINE, завершается и запускается заново.
+    Задержки доставки сводятся по всем обработчикам в отчёт супервизора.
+    Обработчики доставляют сообщения напрямую в чат арендатора, поэтому
+    настройки одиночного режима из shard_unsupported (история,
+    редактирование, рассылка, шина событий, очередь доставки,
+    расписание, сбои, аренда, команды) не применяются: если какая-то
+    из них задана, супервизор не запускается.
+    """
+    unsupported = shard_unsupported()
+    if unsupported:
+        logger.critical(SHARD_UNSUPPORTED.format(', '.join(unsupported)))
+        return
+    supervisor = Supervisor(
+        shard_worker, load_tenants(SHARD_TENANTS), SHARD_WORKERS,
+        key=lambda tenant: tenant['id'],
+        heartbeat=None if WATCHDOG is None else lambda node: WATCHDOG.beat(
+            f'shard-{node}', 'round', RETRY_PERIOD
+        )
+    ).start()
+    if WATCHDOG is not None:
+        for node in range(SHARD_WORKERS):
+            WATCHDOG.register(
+                f'shard-{node}', partial(supervisor.restart, node)
+            )
+        if WATCHDOG_PORT:
+            start_health(WATCHDOG, WATCHDOG_PORT)
+    try:
+        while True:
+            supervisor.poll()
+            if WATCHDOG is not None:
+                WATCHDOG.check()
+            time.sleep(1)
+    finally:
+        supervisor.stop()
+
+
+def start_command_interface(bot, coalescer, state):
+    """Включает команды /status, /now, /history и /latency, если настроены."""
+    if COMMANDS_MODE == 'off':
+        return
+    register_commands(
+        bot, coalescer, state, HOMEWORK_VERDICTS, TENANT_ID,
+        TELEGRAM_CHAT_IDS or [TELEGRAM_CHAT_ID], COMMANDS_NOW_MAX_AGE,
+        LATENCY
+    )
+    start_commands(
+        bot, COMMANDS_MODE, WEBHOOK_URL, WEBHOOK_PORT, WEBHOOK_SECRET
+    )
+
+
+def create_shedder():
+    """Сброс нагрузки по LOAD_SHED_*; None при растяжении не больше 1."""
+    if LOAD_SHED_MAX_STRETCH <= 1:
+        return None
+    return LoadShedder(
+        RETRY_PERIOD, LOAD_SHED_HIGH, LOAD_SHED_LOW, LOAD_SHED_MAX_STRETCH
+    )
+
+
+def tenant_priority(state):
+    """
+    Приоритет арендатора по последним известным работам.
+
+    Для состояния из образа, ещё не загруженного целиком, берётся
+    сохранённый приоритет, чтобы сброс нагрузки не прогревал всех сразу.
+    """
+    if state.cold is not None and state.priority:
+        return state.priority
+    return classify(
+        state.homeworks.values(), state.polled_at, state.clock(),
+        LOAD_SHED_APPROVED_AFTER
+    )
+
+
+def queue_lag(sender):
+    """Отставание очереди доставки, если sender ставит в очередь."""
+    owner = getattr(sender, '__self__', None)
+    return owner.lag() if hasattr(owner, 'lag') else 0.0
+
+
+def next_period(scheduler, shedder, state, lag, elapsed):
+    """
+    Пауза до следующего опроса.
+
+    Период берётся из расписания, при перегрузке растягивается
+    по приоритету арендатора.
+
+        Параметры:
+            lag (callable): отставание очереди доставки в секундах.
+            elapsed (float): длительность завершившегося опроса.
+    """
+    period = RETRY_PERIOD if scheduler is None else scheduler.delay()
+    if shedder is None:
+        return period
+    shedder.observe(elapsed, lag())
+    return shedder.interval(tenant_priority(state), period)
+
+
+def poll_loop(coalescer, pace, keeper, cancelled):
+    """Цикл опроса в отдельном потоке до отмены."""
+    for period in run(coalescer.poll, pace, cancelled=cancelled):
+        if keeper is None:
+            cancelled.wait(period)
+        else:
+            keeper.wait(period)
+
+
+def start_poll_loop(coalescer, pace, keeper):
+    """Запускает поток цикла опроса; возвращает событие его отмены."""
+    cancelled = threading.Event()
+    threading.Thread(
+        target=poll_loop, args=(coalescer, pace, keeper, cancelled),
+        name='poll', daemon=True
+    ).start()
+    return cancelled
+
+
+def watch(coalescer, pace, keeper, state=None):
+    """
+    Опрос в потоке под присмотром сторожа.
+
+    Зависший поток бросается: склейка отпускает его опрос, и новый
+    поток продолжает с тем же состоянием, поэтому водяной знак, снимок
+    и аренда не теряются. Начатый цикл state отменяется: брошенный
+    запрос к API ограничен YP_TIMEOUT, и когда он вернётся, его поток
+    ничего не изменит и не отправит, а выйдет.
+    """
+    loop = []
+
+    def restart():
+        loop.pop().set()
+        if state is not None:
+            state.cancel()
+        coalescer.abandon()
+        loop.append(start_poll_loop(coalescer, pace, keeper))
+
+    WATCHDOG.register(POLL_LOOP, restart)
+    loop.append(start_poll_loop(coalescer, pace, keeper))
+    if WATCHDOG_PORT:
+        start_health(WATCHDOG, WATCHDOG_PORT)
+    try:
+        WATCHDOG.run()
+    finally:
+        loop.pop().set()
 
 
 def main():
     """Основная логика работы бота."""
     if not check_tokens():
         return
+    if SHARD_WORKERS:
+        supervise()
+        return
     bot = TeleBot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    old_status = ''
-    while True:
-        try:
-            response = get_api_answer(timestamp)
-            homeworks = check_response(response)
-            if homeworks:
-                new_status = parse_status(homeworks[0])
-                if new_status != old_status and send_message(bot, new_status):
-                    old_status = new_status
-                    timestamp = response.get('current_date', timestamp)
-                else:
-                    logger.error(NO_NEW_STATUS)
-        except Exception as error:
-            new_status = FAILURE.format(error)
-            logger.error(new_status)
-            if new_status != old_status and send_message(bot, new_status):
-                old_status = new_status
-        finally:
-            time.sleep(RETRY_PERIOD)
+    sender = create_sender(bot)
+    lag = partial(queue_lag, sender)
+    if FAULTS is not None:
+        sender = FAULTS.wrap_sender(sender)
+    shedder = create_shedder()
+    if shedder is not None:
+        sender = shedder.wrap_sender(sender)
+    state = create_state(MAIN_CLOCK, MAIN_SLEEP)
+    keeper = create_keeper(state)
+    coalescer = Coalescer(
+        partial(run_cycle, sender, state) if keeper is None
+        else partial(lead_cycle, sender, state, keeper)
+    )
+    pace = partial(
+        next_period, create_scheduler(state), shedder, state, lag
+    )
+    start_command_interface(bot, coalescer, state)
+    try:
+        if WATCHDOG is not None:
+            watch(coalescer, pace, keeper, state)
+            return
+        polls = run(
+            coalescer.poll, pace, MAIN_CLOCK or time.monotonic,
+            MAIN_ITERATIONS
+        )
+        for period in polls:
+            if keeper is not None:
+                keeper.wait(period)
+            elif MAIN_SLEEP is not None:
+                MAIN_SLEEP(period)
+            else:
+                time.sleep(period)
+    finally:
+        if keeper is not None:
+            keeper.stop()
 
 
 if __name__ == '__main__':
     logging.basicConfig(
         level=logging.DEBUG,
-        format=(
-            '%(lineno)d, %(funcName)s, %(asctime)s, %(levelname)s, %(message)s'
-        ),
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler(f'{__file__}.log')
-        ]
+        handlers=create_handlers(
+            f'{__file__}.log', sys.stdout, LOG_FORMAT, LOG_SAMPLING_INTERVAL,
+            LOG_SAMPLING_BURST
+        )
     )
     main()
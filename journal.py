@@ -0,0 +1,272 @@
+"""
+Журнал сырых ответов API: сжатые записи и индекс по арендатору и времени.
+
+Запуск: python journal.py --dir journal show TENANT [--since DATE]
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+
+from history import parse_date
+
+RECORD = struct.Struct('<dIH')
+INDEX = struct.Struct('<QdQII')
+DATA_SUFFIX = '.log'
+INDEX_SUFFIX = '.idx'
+
+Entry = namedtuple('Entry', ('tenant', 'timestamp', 'status_code', 'body'))
+
+
+def tenant_key(tenant):
+    """64-битный ключ арендатора для индекса."""
+    return int.from_bytes(
+        hashlib.blake2b(str(tenant).encode(), digest_size=8).digest(),
+        'little'
+    )
+
+
+class IndexView:
+    """
+    Индекс сегмента, отображённый в память.
+
+    Элементы — пары (ключ арендатора, время), поэтому по запечатанному
+    сегменту, отсортированному по ним, работает bisect.
+    """
+
+    def __init__(self, path):
+        """Отображает файл индекса в память."""
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = size // INDEX.size
+        self.map = (
+            mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.count else None
+        )
+
+    def __len__(self):
+        """Число записей в индексе."""
+        return self.count
+
+    def __getitem__(self, position):
+        """Ключ сортировки записи."""
+        return self.entry(position)[:2]
+
+    def entry(self, position):
+        """Запись индекса: ключ, время, смещение, длина, код ответа."""
+        return INDEX.unpack_from(self.map, position * INDEX.size)
+
+    def close(self):
+        """Снимает отображение и закрывает файл."""
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+class Journal:
+    """
+    Журнал сырых тел ответов API с ротацией по размеру.
+
+    Тела сжимаются zlib и дописываются в текущий сегмент, рядом
+    в файл индекса пишется запись фиксированного размера. При ротации
+    индекс сегмента сортируется по арендатору и времени, поэтому поиск
+    в запечатанных сегментах занимает O(log n). Записи текущего сегмента
+    дополнительно сгруппированы по арендатору в памяти.
+    """
+
+    def __init__(
+        self, directory, max_segment=64 * 1024 * 1024, level=1,
+        clock=time.time
+    ):
+        """Открывает журнал и продолжает последний сегмент."""
+        self.directory = directory
+        self.max_segment = max_segment
+        self.level = level
+        self.clock = clock
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        segments = self.segments()
+        self.sequence = segments[-1] if segments else 0
+        self.open_segment()
+
+    def path(self, sequence, suffix):
+        """Путь к файлу сегмента."""
+        return os.path.join(self.directory, f'{sequence:06d}{suffix}')
+
+    def segments(self):
+        """Номера сегментов по возрастанию."""
+        return sorted(
+            int(name[:-len(DATA_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(DATA_SUFFIX)
+        )
+
+    def open_segment(self):
+        """Открывает текущий сегмент, отбрасывая недописанный хвост."""
+        data_path = self.path(self.sequence, DATA_SUFFIX)
+        index_path = self.path(self.sequence, INDEX_SUFFIX)
+        self.data = open(data_path, 'ab')
+        self.index = open(index_path, 'ab')
+        size = self.data.tell()
+        count = self.index.tell() // INDEX.size
+        self.active = defaultdict(list)
+        if count:
+            view = IndexView(index_path)
+            while count and sum(view.entry(count - 1)[2:4]) > size:
+                count -= 1
+            for position in range(count):
+                entry = view.entry(position)
+                self.active[entry[0]].append(entry)
+            view.close()
+        self.index.truncate(count * INDEX.size)
+        self.index.seek(count * INDEX.size)
+
+    def append(self, tenant, status_code, body, timestamp=None):
+        """Дописывает сырое тело ответа в журнал."""
+        timestamp = self.clock() if timestamp is None else timestamp
+        name = str(tenant).encode()
+        record = (
+            RECORD.pack(timestamp, status_code, len(name)) + name
+            + zlib.compress(body, self.level)
+        )
+        with self.lock:
+            offset = self.data.tell()
+            self.data.write(record)
+            self.data.flush()
+            entry = (
+                tenant_key(tenant), timestamp, offset, len(record),
+                status_code
+            )
+            self.index.write(INDEX.pack(*entry))
+            self.index.flush()
+            self.active[entry[0]].append(entry)
+            if offset + len(record) >= self.max_segment:
+                self.rotate()
+
+    def rotate(self):
+        """Запечатывает текущий сегмент и начинает новый."""
+        self.data.close()
+        self.index.close()
+        self.seal(self.sequence)
+        self.sequence += 1
+        self.open_segment()
+
+    def seal(self, sequence):
+        """Сортирует индекс сегмента по арендатору и времени."""
+        path = self.path(sequence, INDEX_SUFFIX)
+        view = IndexView(path)
+        entries = sorted(map(view.entry, range(len(view))))
+        view.close()
+        with open(path + '.tmp', 'wb') as file:
+            file.write(b''.join(INDEX.pack(*entry) for entry in entries))
+        os.replace(path + '.tmp', path)
+
+    def read(self, file, offset, length):
+        """Читает и распаковывает запись сегмента."""
+        file.seek(offset)
+        record = file.read(length)
+        timestamp, status_code, name_length = RECORD.unpack_from(record)
+        start = RECORD.size + name_length
+        return Entry(
+            record[RECORD.size:start].decode(), timestamp, status_code,
+            zlib.decompress(record[start:])
+        )
+
+    def lookup(self, tenant, since=None, until=None):
+        """
+        Ответы арендатора за интервал [since, until) по времени.
+
+            Возвращаемое значение (list): объекты Entry.
+        """
+        key = tenant_key(tenant)
+        since = float('-inf') if since is None else since
+        until = float('inf') if until is None else until
+        with self.lock:
+            self.data.flush()
+            sequences = self.segments()
+            active = self.sequence
+            recent = list(self.active.get(key, ()))
+        found = []
+        for sequence in sequences:
+            if sequence == active:
+                candidates = recent
+            else:
+                view = IndexView(self.path(sequence, INDEX_SUFFIX))
+                start = bisect_left(view, (key, since))
+                stop = bisect_left(view, (key, until), lo=start)
+                candidates = list(map(view.entry, range(start, stop)))
+                view.close()
+            matches = [
+                entry for entry in candidates
+                if entry[0] == key and since <= entry[1] < until
+            ]
+            if not matches:
+                continue
+            with open(self.path(sequence, DATA_SUFFIX), 'rb') as file:
+                found += [
+                    entry for entry in (
+                        self.read(file, offset, length)
+                        for _, _, offset, length, _ in matches
+                    )
+                    if entry.tenant == str(tenant)
+                ]
+        return sorted(found, key=lambda entry: entry.timestamp)
+
+    def entries(self):
+        """Все записи журнала в порядке записи, для воспроизведения."""
+        with self.lock:
+            self.data.flush()
+            sequences = self.segments()
+        for sequence in sequences:
+            view = IndexView(self.path(sequence, INDEX_SUFFIX))
+            positions = sorted(
+                view.entry(position)[2:4] for position in range(len(view))
+            )
+            view.close()
+            with open(self.path(sequence, DATA_SUFFIX), 'rb') as file:
+                for offset, length in positions:
+                    yield self.read(file, offset, length)
+
+    def close(self):
+        """Закрывает файлы текущего сегмента."""
+        with self.lock:
+            self.data.close()
+            self.index.close()
+
+
+def main():
+    """Показывает ответы арендатора или выгружает журнал в JSONL."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dir', default='journal')
+    commands = parser.add_subparsers(dest='command', required=True)
+    show_parser = commands.add_parser('show', help='ответы арендатора')
+    show_parser.add_argument('tenant')
+    show_parser.add_argument('--since')
+    show_parser.add_argument('--until')
+    commands.add_parser('dump', help='все ответы в JSONL')
+    args = parser.parse_args()
+    journal = Journal(args.dir)
+    if args.command == 'show':
+        entries = journal.lookup(
+            args.tenant, parse_date(args.since), parse_date(args.until)
+        )
+    else:
+        entries = journal.entries()
+    for entry in entries:
+        print(json.dumps(dict(
+            tenant=entry.tenant, timestamp=entry.timestamp,
+            status_code=entry.status_code,
+            payload=entry.body.decode('utf-8', 'replace')
+        ), ensure_ascii=False))
+    journal.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import logging
+import math
+import threading
+import time
+from collections import Counter, deque
+
+from history import parse_date
+
+logger = logging.getLogger(__name__)
+
+GROWTH = 2 ** 0.25
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+ALERT = (
+    'Задержка уведомлений p{:.0f} = {} превышает порог {} '
+    '({} доставок за окно)'
+)
+ALERT_CLEARED = 'Задержка уведомлений p{:.0f} = {} снова в пределах порога {}'
+REPORT_ROW = '{:<12} {:>7} {:>9} {:>9} {:>9} {:>9}'
+NO_DELIVERIES = 'Доставок за окно пока не было.'
+
+
+def bucket(seconds):
+    """Номер логарифмического интервала гистограммы, шаг около 19%."""
+    if seconds <= 1:
+        return 0
+    return math.ceil(math.log(seconds, GROWTH))
+
+
+def bucket_bound(index):
+    """Верхняя граница интервала в секундах."""
+    return GROWTH ** index
+
+
+def format_seconds(seconds):
+    """Короткая запись длительности."""
+    if seconds is None:
+        return '-'
+    if seconds < 120:
+        return f'{seconds:.0f} с'
+    if seconds < 2 * 3600:
+        return f'{seconds / 60:.1f} мин'
+    return f'{seconds / 3600:.1f} ч'
+
+
+def percentiles(counts, shares=PERCENTILES):
+    """
+    Перцентили по счётчикам интервалов.
+
+    Счётчики нескольких гистограмм можно сложить и посчитать
+    перцентили по сумме: границы интервалов у всех гистограмм общие.
+
+        Возвращаемое значение (tuple): число доставок и словарь
+            доля -> секунды, пустой при отсутствии доставок.
+    """
+    total = sum(counts.values())
+    if not total:
+        return 0, {}
+    result = {}
+    seen = 0
+    pending = sorted(shares)
+    for index in sorted(counts):
+        seen += counts[index]
+        while pending and seen >= pending[0] * total:
+            result[pending.pop(0)] = bucket_bound(index)
+    return total, result
+
+
+class RollingHistogram:
+    """
+    Гистограмма задержек за скользящее окно.
+
+    Окно делится на slices частей, у каждой свой разреженный счётчик
+    интервалов; устаревшие части отбрасываются целиком. Перцентиль
+    возвращает верхнюю границу интервала, то есть оценку сверху
+    с погрешностью не больше шага интервала.
+    """
+
+    def __init__(self, window=24 * 3600, slices=24, clock=time.time):
+        """Задаёт окно в секундах и число частей."""
+        self.slice_length = window / slices
+        self.slices = slices
+        self.clock = clock
+        self.parts = deque()
+
+    def expire(self, slot):
+        """Отбрасывает части, вышедшие из окна."""
+        while self.parts and self.parts[0][0] <= slot - self.slices:
+            self.parts.popleft()
+
+    def record(self, seconds):
+        """Учитывает одну задержку."""
+        slot = int(self.clock() // self.slice_length)
+        self.expire(slot)
+        if not self.parts or self.parts[-1][0] != slot:
+            self.parts.append((slot, Counter()))
+        self.parts[-1][1][bucket(seconds)] += 1
+
+    def counts(self):
+        """Счётчики интервалов за окно."""
+        self.expire(int(self.clock() // self.slice_length))
+        total = Counter()
+        for _, counts in self.parts:
+            total.update(counts)
+        return total
+
+    def percentiles(self, shares=PERCENTILES):
+        """
+        Перцентили задержки за окно.
+
+            Возвращаемое значение (tuple): число доставок и словарь
+                доля -> секунды, пустой при отсутствии доставок.
+        """
+        return percentiles(self.counts(), shares)
+
+
+class LatencyTracker:
+    """
+    Сквозная задержка: от date_updated работы до доставки уведомления.
+
+    Задержки собираются по арендаторам и в целом по скользящему окну.
+    Если перцентиль alert_percentile общей задержки превышает порог
+    alert_threshold, в журнал пишется ошибка; возврат в норму тоже
+    отмечается, повторные превышения не повторяют тревогу.
+    """
+
+    def __init__(
+        self, window=24 * 3600, alert_threshold=None, alert_percentile=0.95,
+        clock=time.time
+    ):
+        """Задаёт окно и порог тревоги в секундах."""
+        self.window = window
+        self.alert_threshold = alert_threshold
+        self.alert_percentile = alert_percentile
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.overall = RollingHistogram(window, clock=clock)
+        self.tenants = {}
+        self.alerting = False
+
+    def observe(self, tenant, homework, delivered_at=None):
+        """
+        Учитывает доставленное уведомление о работе.
+
+            Возвращаемое значение: задержка в секундах или None,
+                если у работы нет date_updated.
+        """
+        try:
+            updated = parse_date(homework.get('date_updated'))
+        except (AttributeError, TypeError, ValueError):
+            return None
+        if updated is None:
+            return None
+        delivered_at = self.clock() if delivered_at is None else delivered_at
+        delay = max(0.0, delivered_at - updated)
+        with self.lock:
+            self.overall.record(delay)
+            if tenant not in self.tenants:
+                self.tenants[tenant] = RollingHistogram(
+                    self.window, clock=self.clock
+                )
+            self.tenants[tenant].record(delay)
+            self.check()
+        return delay
+
+    def check(self):
+        """Поднимает или снимает тревогу по порогу."""
+        if not self.alert_threshold:
+            return
+        count, values = self.overall.percentiles((self.alert_percentile,))
+        value = values.get(self.alert_percentile)
+        exceeded = value is not None and value > self.alert_threshold
+        share = self.alert_percentile * 100
+        if exceeded and not self.alerting:
+            logger.error(ALERT.format(
+                share, format_seconds(value),
+                format_seconds(self.alert_threshold), count
+            ))
+        elif self.alerting and not exceeded:
+            logger.info(ALERT_CLEARED.format(
+                share, format_seconds(value),
+                format_seconds(self.alert_threshold)
+            ))
+        self.alerting = exceeded
+
+    def wrap(self, sender, tenant):
+        """Функция доставки, которая учитывает задержку доставленных."""
+        def tracked(homework, message):
+            delivered = sender(homework, message)
+            if delivered and homework is not None:
+                self.observe(tenant, homework)
+            return delivered
+        return tracked
+
+    def report(self, tenant=None):
+        """
+        Перцентили по арендатору и в целом.
+
+            Возвращаемое значение (dict): имя строки -> (число доставок,
+                словарь перцентилей).
+        """
+        with self.lock:
+            rows = {'all': self.overall.percentiles()}
+            if tenant is not None and tenant in self.tenants:
+                rows[str(tenant)] = self.tenants[tenant].percentiles()
+        return rows
+
+    def render(self, tenant=None):
+        """Отчёт в виде текста."""
+        rows = self.report(tenant)
+        if not rows['all'][0]:
+            return NO_DELIVERIES
+        lines = [REPORT_ROW.format(
+            '', 'n', *(f'p{share * 100:g}' for share in PERCENTILES)
+        )]
+        for name, (count, values) in rows.items():
+            lines.append(REPORT_ROW.format(
+                name[:12], count,
+                *(format_seconds(values.get(share)) for share in PERCENTILES)
+            ))
+        return '\n'.join(lines)
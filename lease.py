@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires REAL NOT NULL,
+    term INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name TEXT PRIMARY KEY,
+    term INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    saved_at REAL NOT NULL
+);
+'''
+ACQUIRED = 'Аренда {} получена ({}, срок {}), процесс ведущий'
+LOST = 'Аренда {} потеряна ({}), процесс переходит в резерв'
+RENEW_FAILED = 'Не удалось продлить аренду {}: {}'
+
+
+def default_holder():
+    """Имя процесса-владельца аренды: хост и pid."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Lease(ABC):
+    """
+    Аренда ведущего процесса с ограниченным сроком.
+
+    Ведущий продлевает аренду чаще, чем истекает ttl. Если он упал или
+    завис, аренду забирает резервный процесс. Номер срока term растёт
+    при каждой смене владельца; по нему отсекаются записи checkpoint
+    от процесса, который уже потерял аренду. Хранилище задают
+    наследники через grab, drop, put и load.
+    """
+
+    def __init__(self, name, holder=None, ttl=15, clock=time.time):
+        """Задаёт имя аренды, владельца и срок в секундах."""
+        self.name = name
+        self.holder = holder or default_holder()
+        self.ttl = ttl
+        self.clock = clock
+        self.term = None
+        self.expires = 0
+
+    @property
+    def held(self):
+        """Аренда принадлежит процессу и её срок не истёк."""
+        return self.term is not None and self.clock() < self.expires
+
+    def acquire(self):
+        """Получает или продлевает аренду; False, если она занята."""
+        now = self.clock()
+        self.term = self.grab(now, now + self.ttl)
+        if self.term is not None:
+            self.expires = now + self.ttl
+        return self.term is not None
+
+    def release(self):
+        """Отдаёт аренду, чтобы резерв не ждал истечения срока."""
+        if self.term is not None:
+            self.drop()
+        self.term = None
+
+    def save(self, data):
+        """
+        Сохраняет checkpoint, если аренда всё ещё у этого процесса.
+
+            Возвращаемое значение (bool): запись выполнена.
+        """
+        if not self.held:
+            return False
+        return self.put(json.dumps(data), self.clock())
+
+    @abstractmethod
+    def grab(self, now, expires):
+        """Атомарно занимает аренду, возвращает term или None."""
+
+    @abstractmethod
+    def drop(self):
+        """Атомарно освобождает аренду."""
+
+    @abstractmethod
+    def put(self, data, now):
+        """Атомарно пишет checkpoint при действующей аренде."""
+
+    @abstractmethod
+    def load(self):
+        """Возвращает последний checkpoint или None."""
+
+
+class MemoryLease(Lease):
+    """Аренда в общем словаре: замена SQLite для тестов и симуляций."""
+
+    def __init__(self, store, name, holder=None, ttl=15, clock=time.time):
+        """
+        Запоминает общее хранилище.
+
+            Параметры:
+                store (dict): общий для всех участников словарь.
+        """
+        super().__init__(name, holder, ttl, clock)
+        self.store = store
+        store.setdefault('lock', threading.Lock())
+
+    def grab(self, now, expires):
+        """Атомарно занимает аренду, возвращает term или None."""
+        with self.store['lock']:
+            holder, until, term = self.store.get(
+                ('lease', self.name), ('', 0, 0)
+            )
+            if holder != self.holder and until > now:
+                return None
+            term += holder != self.holder
+            self.store[('lease', self.name)] = (self.holder, expires, term)
+            return term
+
+    def drop(self):
+        """Атомарно освобождает аренду."""
+        with self.store['lock']:
+            holder, until, term = self.store.get(
+                ('lease', self.name), ('', 0, 0)
+            )
+            if holder == self.holder:
+                self.store[('lease', self.name)] = (holder, 0, term)
+
+    def put(self, data, now):
+        """Атомарно пишет checkpoint при действующей аренде."""
+        with self.store['lock']:
+            holder, until, term = self.store.get(
+                ('lease', self.name), ('', 0, 0)
+            )
+            if holder != self.holder or until <= now:
+                return False
+            self.store[('checkpoint', self.name)] = data
+            return True
+
+    def load(self):
+        """Возвращает последний checkpoint или None."""
+        with self.store['lock']:
+            data = self.store.get(('checkpoint', self.name))
+        return None if data is None else json.loads(data)
+
+
+class SqliteLease(Lease):
+    """Аренда и checkpoint в общей базе SQLite на локальном диске."""
+
+    def __init__(self, path, name, holder=None, ttl=15, clock=time.time):
+        """Открывает базу и создаёт таблицы."""
+        super().__init__(name, holder, ttl, clock)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path, timeout=ttl / 3, isolation_level=None,
+            check_same_thread=False
+        )
+        self.connection.executescript(SCHEMA)
+
+    def transaction(self, *statements):
+        """
+        Выполняет запросы в одной транзакции BEGIN IMMEDIATE.
+
+            Возвращаемое значение (tuple): число изменённых строк
+                по каждому запросу и строки результата последнего.
+        """
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                rowcounts = [
+                    cursor.execute(sql, params).rowcount
+                    for sql, params in statements
+                ]
+                rows = rowcounts, cursor.fetchall()
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+        return rows
+
+    def grab(self, now, expires):
+        """Атомарно занимает аренду, возвращает term или None."""
+        params = dict(
+            name=self.name, holder=self.holder, expires=expires, now=now
+        )
+        rowcounts, rows = self.transaction(
+            ("INSERT OR IGNORE INTO leases VALUES (:name, '', 0, 0)", params),
+            (
+                'UPDATE leases SET term = term + (holder != :holder), '
+                'holder = :holder, expires = :expires '
+                'WHERE name = :name AND (holder = :holder OR expires <= :now)',
+                params
+            ),
+            ('SELECT term FROM leases WHERE name = :name', params),
+        )
+        return rows[0][0] if rowcounts[1] else None
+
+    def drop(self):
+        """Атомарно освобождает аренду."""
+        self.transaction((
+            'UPDATE leases SET expires = 0 WHERE name = ? AND holder = ?',
+            (self.name, self.holder)
+        ))
+
+    def put(self, data, now):
+        """Атомарно пишет checkpoint при действующей аренде."""
+        rowcounts, rows = self.transaction((
+            'INSERT INTO checkpoints (name, term, data, saved_at) '
+            'SELECT name, term, :data, :now FROM leases '
+            'WHERE name = :name AND holder = :holder AND expires > :now '
+            'ON CONFLICT (name) DO UPDATE SET term = excluded.term, '
+            'data = excluded.data, saved_at = excluded.saved_at',
+            dict(name=self.name, holder=self.holder, data=data, now=now)
+        ))
+        return rowcounts[0] > 0
+
+    def load(self):
+        """Возвращает последний checkpoint или None."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT data FROM checkpoints WHERE name = ?', (self.name,)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self.lock:
+            self.connection.close()
+
+
+class LeaseKeeper:
+    """
+    Фоновое продление аренды и переключение ведущий/резерв.
+
+    Резервный процесс держит бота, журнал и транспорт открытыми и раз
+    в interval пытается забрать аренду. При получении аренды вызывается
+    on_acquire (восстановление checkpoint), и только после этого held
+    становится True, поэтому цикл опроса не стартует со старым снимком.
+    """
+
+    def __init__(self, lease, interval=None, on_acquire=None):
+        """Задаёт аренду и период продления, по умолчанию ttl / 3."""
+        self.lease = lease
+        self.interval = interval or lease.ttl / 3
+        self.on_acquire = on_acquire
+        self.held = False
+        self.changed = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.takeovers = 0
+
+    @property
+    def leading(self):
+        """Процесс ведущий и срок аренды по его часам не истёк."""
+        return self.held and self.lease.held
+
+    def tick(self):
+        """Продлевает или пытается получить аренду."""
+        try:
+            acquired = self.lease.acquire()
+        except sqlite3.Error as error:
+            logger.error(RENEW_FAILED.format(self.lease.name, error))
+            acquired = False
+        if acquired and not self.held:
+            if self.on_acquire is not None:
+                self.on_acquire(self.lease.load())
+            self.takeovers += 1
+            logger.warning(ACQUIRED.format(
+                self.lease.name, self.lease.holder, self.lease.term
+            ))
+        elif self.held and not acquired:
+            logger.warning(LOST.format(self.lease.name, self.lease.holder))
+        if acquired != self.held:
+            self.held = acquired
+            self.changed.set()
+
+    def run(self):
+        """Продлевает аренду до остановки."""
+        while not self.stopped.wait(self.interval):
+            self.tick()
+
+    def start(self):
+        """Делает первую попытку сразу и запускает фоновый поток."""
+        self.tick()
+        self.thread = threading.Thread(
+            target=self.run, name='lease', daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def wait(self, timeout):
+        """Ждёт timeout секунд или смены роли, что наступит раньше."""
+        self.changed.wait(timeout)
+        self.changed.clear()
+
+    def stop(self):
+        """Останавливает продление и отдаёт аренду."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.held = False
+        self.lease.release()
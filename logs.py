@@ -0,0 +1,128 @@
+import json
+import logging
+import threading
+import time
+
+SUPPRESSED = ' [ещё {} похожих сообщений подавлено за {:.0f} с]'
+TEXT_FORMAT = (
+    '%(lineno)d, %(funcName)s, %(asctime)s, %(levelname)s, %(message)s'
+)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает не больше burst одинаковых записей за interval секунд.
+
+    Одинаковыми считаются записи одного логгера и уровня с одним текстом;
+    вызов может задать свой ключ через extra={'log_key': ...}. Число
+    подавленных повторов сохраняется в атрибутах suppressed
+    и suppressed_for первой записи следующего окна, форматтеры
+    дописывают его к сообщению.
+    """
+
+    def __init__(self, interval=60, burst=1, max_keys=10000,
+                 clock=time.monotonic):
+        """Задаёт окно выборки и предел числа отслеживаемых ключей."""
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.suppressed = 0
+
+    def key(self, record):
+        """Ключ, по которому записи считаются повторами."""
+        log_key = getattr(record, 'log_key', None)
+        if log_key is not None:
+            return record.name, record.levelno, log_key
+        return record.name, record.levelno, record.getMessage()
+
+    def filter(self, record):
+        """Решает, писать ли запись, и подписывает сводку подавленных."""
+        key = self.key(record)
+        now = self.clock()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is None and len(self.windows) >= self.max_keys:
+                    self.prune(now)
+                self.windows[key] = [now, 1, 0]
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                    record.suppressed_for = now - window[0]
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+    def prune(self, now):
+        """Забывает закрытые окна, чтобы словарь ключей не рос."""
+        self.windows = {
+            key: window for key, window in self.windows.items()
+            if now - window[0] < self.interval
+        }
+
+
+def suppressed_suffix(record):
+    """Сводка подавленных повторов для текста записи."""
+    if not getattr(record, 'suppressed', None):
+        return ''
+    return SUPPRESSED.format(record.suppressed, record.suppressed_for)
+
+
+class TextFormatter(logging.Formatter):
+    """Текстовый формат со сводкой подавленных повторов."""
+
+    def formatMessage(self, record):
+        """Дописывает сводку к сообщению записи."""
+        return super().formatMessage(record) + suppressed_suffix(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись одной строкой JSON."""
+
+    def format(self, record):
+        """Возвращает запись в виде JSON-объекта без переводов строк."""
+        entry = dict(
+            time=record.created,
+            level=record.levelname,
+            logger=record.name,
+            func=record.funcName,
+            line=record.lineno,
+            message=record.getMessage(),
+        )
+        if getattr(record, 'suppressed', None):
+            entry['suppressed'] = record.suppressed
+            entry['suppressed_for'] = round(record.suppressed_for, 3)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def create_handlers(path, stream, fmt='text', interval=60, burst=1):
+    """
+    Собирает обработчики журнала для консоли и файла.
+
+        Параметры:
+            fmt (str): text — строки как раньше, jsonl — JSON по строке.
+            interval (float): окно выборки повторов, 0 — без выборки.
+
+    Фильтр у каждого обработчика свой: общий фильтр принял бы
+    вторую проверку той же записи за повтор.
+    """
+    formatter = (
+        JsonFormatter() if fmt == 'jsonl' else TextFormatter(TEXT_FORMAT)
+    )
+    handlers = [
+        logging.StreamHandler(stream), logging.FileHandler(path)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        if interval > 0:
+            handler.addFilter(SamplingFilter(interval, burst))
+    return handlers
@@ -0,0 +1,41 @@
+import json
+import os
+import threading
+
+
+class MessageStore:
+    """Хранит id сообщений Telegram по паре (чат, домашняя работа)."""
+
+    def __init__(self, path=None):
+        """Загружает сохранённые id сообщений из файла, если он задан."""
+        self.path = path
+        self.lock = threading.Lock()
+        self.ids = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.ids = json.load(file)
+
+    @staticmethod
+    def key(chat_id, homework_id):
+        """Возвращает ключ хранилища для чата и домашней работы."""
+        return f'{chat_id}:{homework_id}'
+
+    def get(self, chat_id, homework_id):
+        """Возвращает id сообщения о домашней работе или None."""
+        with self.lock:
+            return self.ids.get(self.key(chat_id, homework_id))
+
+    def set(self, chat_id, homework_id, message_id):
+        """Запоминает id сообщения о домашней работе."""
+        with self.lock:
+            self.ids[self.key(chat_id, homework_id)] = message_id
+            self.save()
+
+    def save(self):
+        """Атомарно записывает id сообщений в файл, если он задан."""
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.ids, file)
+        os.replace(tmp_path, self.path)
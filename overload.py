@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from history import parse_date
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = 'active'
+NORMAL = 'normal'
+IDLE = 'idle'
+PRIORITIES = (ACTIVE, NORMAL, IDLE)
+DAY = 24 * 3600
+
+OVERLOADED = (
+    'Перегрузка: нагрузка {load:.2f} от периода, интервалы неактивных '
+    'арендаторов растянуты в {stretch} раз'
+)
+RECOVERED = 'Нагрузка {load:.2f} от периода, растяжение снижено до {stretch}'
+STATS = (
+    'Нагрузка {load:.2f}, растяжение x{stretch}, перегруженных кругов '
+    '{overloaded}, пропущено опросов {skipped}, отложено сообщений '
+    'о сбоях {deferred}'
+)
+
+
+def updated_at(homework):
+    """Время изменения работы или None, если дата пуста или не разбирается."""
+    try:
+        return parse_date(homework.get('date_updated'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def classify(homeworks, polled_at, now, approved_after=7 * DAY):
+    """
+    Приоритет арендатора по последним известным работам.
+
+    active — есть работа на проверке или арендатора ещё не опрашивали;
+    idle — работ нет или все приняты дольше approved_after секунд назад;
+    normal — остальные, например с отклонённой работой или принятой
+    работой без разборчивой даты изменения.
+    """
+    if polled_at is None:
+        return ACTIVE
+    statuses = {homework.get('status') for homework in homeworks}
+    if 'reviewing' in statuses:
+        return ACTIVE
+    if statuses - {'approved'}:
+        return NORMAL
+    updated = [updated_at(homework) for homework in homeworks]
+    if None in updated:
+        return NORMAL
+    if max(updated, default=0) <= now - approved_after:
+        return IDLE
+    return NORMAL
+
+
+class LoadShedder:
+    """
+    Обнаружение перегрузки и сброс нагрузки по приоритетам.
+
+    Нагрузка — сглаженная доля периода, которую занимает круг опроса
+    или отставание очереди доставки. Выше high растяжение удваивается
+    до max_stretch, ниже low — уменьшается вдвое; между порогами
+    остаётся прежним. Арендаторы active опрашиваются каждый период,
+    normal — с половинным растяжением, idle — с полным. Под перегрузкой
+    сообщения о сбоях откладываются до её окончания.
+    """
+
+    def __init__(
+        self, period, high=1.0, low=0.7, max_stretch=8, smoothing=0.3,
+        clock=time.monotonic
+    ):
+        """Задаёт период опроса в секундах и пороги нагрузки."""
+        self.period = period
+        self.high = high
+        self.low = low
+        self.max_stretch = max_stretch
+        self.smoothing = smoothing
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.load = 0.0
+        self.stretch = 1
+        self.rounds = 0
+        self.overloaded = 0
+        self.changes = 0
+        self.polled = {}
+        self.skipped = Counter()
+        self.deferred = 0
+
+    def observe(self, round_seconds, lag=0.0):
+        """
+        Учитывает длительность круга и отставание очереди в секундах.
+
+            Возвращаемое значение (int): новое растяжение.
+        """
+        sample = max(round_seconds, lag) / self.period
+        with self.lock:
+            self.rounds += 1
+            self.load += self.smoothing * (sample - self.load)
+            stretch = self.stretch
+            if self.load > self.high:
+                self.overloaded += 1
+                stretch = min(self.max_stretch, stretch * 2)
+            elif self.load < self.low:
+                stretch = max(1, stretch // 2)
+            if stretch == self.stretch:
+                return stretch
+            message = OVERLOADED if stretch > self.stretch else RECOVERED
+            self.stretch = stretch
+            self.changes += 1
+        log = logger.warning if message is OVERLOADED else logger.info
+        log(message.format(load=self.load, stretch=stretch))
+        return stretch
+
+    def factor(self, priority):
+        """Во сколько раз растянут интервал арендатора."""
+        if priority == ACTIVE:
+            return 1
+        if priority == NORMAL:
+            return max(1, self.stretch // 2)
+        return self.stretch
+
+    def interval(self, priority, period=None):
+        """Интервал до следующего опроса арендатора."""
+        return (period or self.period) * self.factor(priority)
+
+    def due(self, key, priority):
+        """
+        Нужно ли опрашивать арендатора в этом круге.
+
+        Пропуск учитывается в метриках по приоритету.
+        """
+        now = self.clock()
+        last = self.polled.get(key)
+        if last is not None and (
+            now - last < self.interval(priority) - self.period / 2
+        ):
+            with self.lock:
+                self.skipped[priority] += 1
+            return False
+        self.polled[key] = now
+        return True
+
+    def forget(self, key):
+        """Убирает арендатора, ушедшего к другому обработчику."""
+        self.polled.pop(key, None)
+
+    def wrap_sender(self, sender):
+        """Доставка, откладывающая сообщения о сбоях под перегрузкой."""
+        def send(homework, message):
+            if homework is None and self.stretch > 1:
+                with self.lock:
+                    self.deferred += 1
+                return False
+            return sender(homework, message)
+        return send
+
+    def stats(self):
+        """Метрики перегрузки и сброса нагрузки."""
+        with self.lock:
+            return dict(
+                load=self.load,
+                stretch=self.stretch,
+                rounds=self.rounds,
+                overloaded=self.overloaded,
+                changes=self.changes,
+                skipped=sum(self.skipped.values()),
+                skipped_by_priority=dict(self.skipped),
+                deferred=self.deferred,
+            )
+
+    def report(self):
+        """Пишет метрики в журнал."""
+        logger.info(STATS.format(**self.stats()))
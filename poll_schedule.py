@@ -0,0 +1,181 @@
+import math
+import time
+
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK_HOURS = 7 * 24
+
+
+def hour_of_week(timestamp):
+    """Номер часа недели UTC: 0 — понедельник 00:00."""
+    moment = time.gmtime(timestamp)
+    return moment.tm_wday * 24 + moment.tm_hour
+
+
+class HazardModel:
+    """
+    Интенсивность смен статусов по часам недели.
+
+    Считает переходы в каждом из 168 часов недели и сглаживает счётчики
+    априорным prior, чтобы час без наблюдений не выпадал из опроса.
+    """
+
+    def __init__(self, prior=1.0):
+        """Создаёт модель без наблюдений."""
+        self.prior = prior
+        self.counts = [0] * WEEK_HOURS
+        self.observed = 0
+
+    @classmethod
+    def fit(cls, timestamps, prior=1.0):
+        """Обучает модель на моментах переходов."""
+        model = cls(prior)
+        for timestamp in timestamps:
+            model.observe(timestamp)
+        return model
+
+    def observe(self, timestamp):
+        """Учитывает один переход."""
+        self.counts[hour_of_week(timestamp)] += 1
+        self.observed += 1
+
+    def rates(self):
+        """Сглаженная относительная интенсивность по часам недели."""
+        return [count + self.prior for count in self.counts]
+
+
+class PollSchedule:
+    """
+    Интервалы опроса по часам недели при дневном бюджете запросов.
+
+    Если переходы в час приходят с интенсивностью r, а опросов в этот
+    час n, средняя задержка обнаружения пропорциональна r / n. Сумма
+    таких задержек при фиксированном числе опросов за сутки минимальна
+    при n, пропорциональном корню из r. Каждому часу гарантируется
+    не меньше одного опроса за max_interval и не больше одного
+    за min_interval; бюджет сверх этого предела достаётся остальным
+    часам суток.
+    """
+
+    def __init__(
+        self, model, budget, min_interval=60, max_interval=3 * HOUR
+    ):
+        """
+        Распределяет бюджет по часам недели.
+
+            Параметры:
+                model (HazardModel): интенсивность переходов.
+                budget (int): запросов к API в сутки.
+        """
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.polls = self.plan(model.rates())
+
+    def plan(self, rates):
+        """Число опросов в каждый час недели."""
+        polls = []
+        for day in range(7):
+            polls += self.plan_day([
+                math.sqrt(rate) for rate in rates[day * 24:(day + 1) * 24]
+            ])
+        return polls
+
+    def plan_day(self, weights):
+        """
+        Делит суточный бюджет между часами пропорционально весам.
+
+        Час, которому досталось больше cap опросов, получает cap,
+        а его излишек делится между остальными часами, поэтому бюджет
+        расходуется целиком, пока все часы не упрутся в cap.
+        """
+        floor = min(HOUR / self.max_interval, self.budget / len(weights))
+        cap = HOUR / self.min_interval
+        capped = set()
+        while True:
+            hours = [
+                hour for hour in range(len(weights)) if hour not in capped
+            ]
+            spare = self.budget - cap * len(capped) - floor * len(hours)
+            total = sum(weights[hour] for hour in hours)
+            polls = [cap] * len(weights)
+            for hour in hours:
+                polls[hour] = floor + (
+                    spare * weights[hour] / total if total else 0
+                )
+            over = {hour for hour in hours if polls[hour] > cap}
+            if not over:
+                return polls
+            capped |= over
+
+    def interval(self, timestamp):
+        """Интервал опроса в час, которому принадлежит timestamp."""
+        return HOUR / self.polls[hour_of_week(timestamp)]
+
+    def delay(self, now):
+        """
+        Секунды до следующего опроса.
+
+        Частота опросов меняется на границах часов, поэтому ожидание
+        набирается по часам, пока не наберётся ровно один опрос.
+        """
+        need = 1.0
+        moment = now
+        while True:
+            hour_end = (moment // HOUR + 1) * HOUR
+            rate = self.polls[hour_of_week(moment)] / HOUR
+            if (hour_end - moment) * rate >= need:
+                return moment + need / rate - now
+            need -= (hour_end - moment) * rate
+            moment = hour_end
+
+
+class Scheduler:
+    """
+    Предсказательный опрос по журналу переходов.
+
+    Модель переобучается по журналу history раз в refit_interval
+    секунд, так что расписание подстраивается под новые наблюдения.
+    """
+
+    def __init__(
+        self, history, budget, project=None, window=8 * 7 * DAY,
+        refit_interval=DAY, clock=time.time
+    ):
+        """
+        Задаёт источник переходов и бюджет.
+
+            Параметры:
+                history (HistoryStore): журнал переходов.
+                budget (int): запросов к API в сутки.
+                project (str): учитывать только переходы проекта.
+                window (int): обучаться на последних window секундах.
+        """
+        self.history = history
+        self.budget = budget
+        self.project = project
+        self.window = window
+        self.refit_interval = refit_interval
+        self.clock = clock
+        self.schedule = None
+        self.fitted_at = None
+
+    def refit(self):
+        """Переобучает модель и пересчитывает расписание."""
+        now = self.clock()
+        model = HazardModel.fit(self.history.transition_times(
+            self.project, since=now - self.window
+        ))
+        self.schedule = PollSchedule(model, self.budget)
+        self.fitted_at = now
+        return self.schedule
+
+    def delay(self):
+        """Секунды до следующего опроса по текущему расписанию."""
+        now = self.clock()
+        if (
+            self.schedule is None
+            or now - self.fitted_at >= self.refit_interval
+        ):
+            self.refit()
+        return self.schedule.delay(now)
@@ -0,0 +1,146 @@
+import logging
+import random
+import time
+from collections import Counter, namedtuple
+
+from exceptions import DenialOfService, StatusCodeException, TransportError
+
+logger = logging.getLogger(__name__)
+
+RetryPolicy = namedtuple(
+    'RetryPolicy', ('attempts', 'base_delay', 'max_delay', 'jitter')
+)
+NO_RETRY = RetryPolicy(1, 0, 0, 0)
+SERVER_ERRORS = range(500, 600)
+
+# Таблица просматривается сверху вниз: первая строка, подходящая
+# по классу исключения и коду ответа (None — любой код), задаёт политику.
+POLICIES = (
+    (ConnectionError, None, RetryPolicy(4, 1, 30, 0.5)),
+    (TransportError, None, RetryPolicy(4, 1, 30, 0.5)),
+    (StatusCodeException, {429}, RetryPolicy(3, 5, 60, 0.5)),
+    (StatusCodeException, SERVER_ERRORS, RetryPolicy(3, 2, 60, 0.5)),
+    (StatusCodeException, None, NO_RETRY),
+    (DenialOfService, None, NO_RETRY),
+    (KeyError, None, NO_RETRY),
+    (TypeError, None, NO_RETRY),
+)
+
+RETRYING = 'Повтор {} из {} через {:.1f} с после ошибки: {}'
+RECOVERED = (
+    'Запрос удался после {} повторов за {:.1f} с, '
+    'уведомление ускорено на {:.0f} с'
+)
+STATS = (
+    'Повторы запросов: вызовов {calls}, повторов {retries}, '
+    'восстановлено {recovered}, сбоев {failed}, '
+    'уведомления ускорены на {latency_saved:.0f} с, '
+    'по ошибкам {retries_by_error}'
+)
+
+
+def policy_for(error, policies=POLICIES):
+    """Находит политику повторов для исключения."""
+    status_code = getattr(error, 'status_code', None)
+    for error_class, status_codes, policy in policies:
+        if not isinstance(error, error_class):
+            continue
+        if status_codes is None or status_code in status_codes:
+            return policy
+    return NO_RETRY
+
+
+def backoff(policy, attempt, rng=random.random):
+    """Задержка перед повтором: экспонента с долей случайного разброса."""
+    delay = min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1))
+    return delay * (1 - policy.jitter * rng())
+
+
+class Retrier:
+    """
+    Быстрые повторы внутри цикла опроса по таблице политик.
+
+    Временные сбои повторяются с экспоненциальной задержкой, постоянные
+    пробрасываются сразу. Суммарное время повторов за вызов ограничено
+    budget секундами. Метрики показывают потраченные повторы и выигрыш
+    во времени уведомления относительно ожидания следующего цикла;
+    при заданном report_interval они пишутся в лог не чаще раза
+    в report_interval секунд.
+    """
+
+    def __init__(
+        self, retry_period, policies=POLICIES, budget=120,
+        sleep=time.sleep, clock=time.monotonic, rng=random.random,
+        report_interval=None
+    ):
+        """Задаёт таблицу политик и период основного цикла."""
+        self.retry_period = retry_period
+        self.policies = policies
+        self.budget = budget
+        self.sleep = sleep
+        self.clock = clock
+        self.rng = rng
+        self.calls = 0
+        self.retries = 0
+        self.recovered = 0
+        self.failed = 0
+        self.latency_saved = 0.0
+        self.retries_by_error = Counter()
+        self.report_interval = report_interval
+        self.last_report = clock()
+
+    def report(self):
+        """Пишет метрики в лог не чаще раза в report_interval секунд."""
+        if self.report_interval is None:
+            return
+        now = self.clock()
+        if now - self.last_report < self.report_interval:
+            return
+        self.last_report = now
+        logger.info(STATS.format(**self.stats()))
+
+    def call(self, func, *args):
+        """Вызывает функцию, повторяя её при временных сбоях."""
+        self.report()
+        self.calls += 1
+        started = self.clock()
+        attempt = 1
+        while True:
+            try:
+                result = func(*args)
+            except Exception as error:
+                policy = policy_for(error, self.policies)
+                delay = backoff(policy, attempt, self.rng)
+                spent = self.clock() - started
+                if (
+                    attempt >= policy.attempts
+                    or spent + delay > self.budget
+                ):
+                    self.failed += 1
+                    raise
+                logger.warning(RETRYING.format(
+                    attempt, policy.attempts - 1, delay, error
+                ))
+                self.retries += 1
+                self.retries_by_error[type(error).__name__] += 1
+                self.sleep(delay)
+                attempt += 1
+                continue
+            if attempt > 1:
+                spent = self.clock() - started
+                saved = max(0.0, self.retry_period - spent)
+                self.recovered += 1
+                self.latency_saved += saved
+                logger.info(RECOVERED.format(attempt - 1, spent, saved))
+            return result
+
+    def stats(self):
+        """Возвращает метрики повторов."""
+        return dict(
+            calls=self.calls,
+            retries=self.retries,
+            recovered=self.recovered,
+            failed=self.failed,
+            latency_saved=self.latency_saved,
+            retries_by_error=dict(self.retries_by_error),
+        )
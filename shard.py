@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import multiprocessing
+import queue
+import time
+from bisect import bisect
+from collections import Counter, defaultdict
+
+from latency import format_seconds, percentiles
+
+logger = logging.getLogger(__name__)
+
+WORKER_DIED = 'Обработчик {} (pid {}) завершился с кодом {}, перезапуск'
+REBALANCED = 'Обработчиков: {}, перенесено арендаторов: {}'
+SUMMARY = (
+    'Обработчиков: {workers}, арендаторов: {tenants}, '
+    'циклов: {cycles}, сбоев: {failures}, перезапусков: {restarts}, '
+    'самый долгий круг: {round_max:.1f} с, растяжение: x{stretch_max}, '
+    'пропущено опросов: {skipped}, отложено сообщений о сбоях: {deferred}, '
+    'повторов запросов: {retries}, восстановлено повтором: {recovered}, '
+    'задержка доставки p50/p95: {latency_p50} / {latency_p95}'
+)
+
+
+def ring_hash(value):
+    """Точка на кольце для строки."""
+    return int.from_bytes(
+        hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class HashRing:
+    """
+    Консистентное хеширование арендаторов по обработчикам.
+
+    У каждого обработчика replicas виртуальных точек на кольце.
+    Арендатор достаётся первой точке по часовой стрелке, поэтому при
+    добавлении или удалении обработчика переезжает примерно 1/N
+    арендаторов, остальные остаются на месте.
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        """Строит кольцо для обработчиков nodes."""
+        self.replicas = replicas
+        self.points = []
+        self.owners = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        """Добавляет обработчик."""
+        for replica in range(self.replicas):
+            point = ring_hash(f'{node}#{replica}')
+            self.owners[point] = node
+        self.points = sorted(self.owners)
+
+    def remove(self, node):
+        """Удаляет обработчик."""
+        self.owners = {
+            point: owner for point, owner in self.owners.items()
+            if owner != node
+        }
+        self.points = sorted(self.owners)
+
+    def node_for(self, key):
+        """Обработчик, которому принадлежит ключ."""
+        index = bisect(self.points, ring_hash(key)) % len(self.points)
+        return self.owners[self.points[index]]
+
+    def assign(self, keys):
+        """Раскладывает ключи по обработчикам."""
+        assignment = defaultdict(list)
+        for key in keys:
+            assignment[self.node_for(key)].append(key)
+        return assignment
+
+
+class Supervisor:
+    """
+    Запускает процессы-обработчики и раздаёт им арендаторов.
+
+    Обработчик — функция target(node, tenants, control, metrics),
+    выполняемая в отдельном процессе. Из очереди control он получает
+    новый список арендаторов или None для остановки, в очередь metrics
+    отправляет словари метрик со своим node; счётчики интервалов
+    гистограммы задержек под ключом latency складываются по всем
+    обработчикам. Упавший процесс перезапускается с теми же
+    арендаторами. heartbeat(node) вызывается на каждое сообщение метрик
+    и служит сигналом жизни для сторожа.
+    """
+
+    def __init__(
+        self, target, tenants, workers, key=str, context=None,
+        report_interval=60, clock=time.monotonic, heartbeat=None
+    ):
+        """
+        Задаёт обработчик и арендаторов.
+
+            Параметры:
+                tenants (list): описания арендаторов.
+                key (callable): ключ арендатора для кольца.
+        """
+        self.target = target
+        self.tenants = {key(tenant): tenant for tenant in tenants}
+        self.context = context or multiprocessing.get_context()
+        self.ring = HashRing(range(workers))
+        self.workers = workers
+        self.assignment = self.ring.assign(self.tenants)
+        self.metrics_queue = self.context.Queue()
+        self.processes = {}
+        self.controls = {}
+        self.metrics = {}
+        self.restarts = 0
+        self.report_interval = report_interval
+        self.clock = clock
+        self.reported_at = clock()
+        self.heartbeat = heartbeat
+
+    def shard(self, node):
+        """Арендаторы обработчика."""
+        return [self.tenants[key] for key in self.assignment.get(node, ())]
+
+    def spawn(self, node):
+        """Запускает процесс обработчика."""
+        control = self.context.Queue()
+        process = self.context.Process(
+            target=self.target,
+            args=(node, self.shard(node), control, self.metrics_queue),
+            name=f'shard-{node}', daemon=True
+        )
+        process.start()
+        self.processes[node] = process
+        self.controls[node] = control
+
+    def start(self):
+        """Запускает все обработчики."""
+        for node in range(self.workers):
+            self.spawn(node)
+        return self
+
+    def collect(self):
+        """Забирает накопившиеся метрики обработчиков."""
+        while True:
+            try:
+                metrics = self.metrics_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.metrics[metrics['node']] = metrics
+            if self.heartbeat is not None:
+                self.heartbeat(metrics['node'])
+
+    def poll(self):
+        """Собирает метрики и перезапускает упавшие процессы."""
+        self.collect()
+        for node, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            logger.error(WORKER_DIED.format(
+                node, process.pid, process.exitcode
+            ))
+            self.restarts += 1
+            self.spawn(node)
+        if self.clock() - self.reported_at >= self.report_interval:
+            self.reported_at = self.clock()
+            logger.info(SUMMARY.format(**self.stats()))
+
+    def resize(self, workers):
+        """
+        Меняет число обработчиков.
+
+        Оставшимся обработчикам новый список арендаторов уходит через
+        control, их процессы не перезапускаются.
+        """
+        for node in range(self.workers, workers):
+            self.ring.add(node)
+        for node in range(workers, self.workers):
+            self.ring.remove(node)
+        assignment = self.ring.assign(self.tenants)
+        moved = sum(
+            self.ring.node_for(key) != node
+            for node, keys in self.assignment.items() for key in keys
+        )
+        old_workers, self.workers = self.workers, workers
+        self.assignment = assignment
+        for node in range(workers, old_workers):
+            self.stop_worker(node)
+        for node in range(min(workers, old_workers)):
+            self.controls[node].put(self.shard(node))
+        for node in range(old_workers, workers):
+            self.spawn(node)
+        logger.info(REBALANCED.format(workers, moved))
+        return moved
+
+    def restart(self, node):
+        """Завершает зависший процесс обработчика и запускает новый."""
+        process = self.processes.pop(node)
+        process.terminate()
+        process.join()
+        self.restarts += 1
+        self.spawn(node)
+
+    def stop_worker(self, node, timeout=10):
+        """Останавливает обработчик."""
+        process = self.processes.pop(node)
+        self.controls.pop(node).put(None)
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        self.metrics.pop(node, None)
+
+    def stop(self):
+        """Останавливает все обработчики."""
+        for node in list(self.processes):
+            self.stop_worker(node)
+        self.collect()
+
+    def stats(self):
+        """Сводные метрики по всем обработчикам."""
+        self.collect()
+        metrics = list(self.metrics.values())
+        latency = Counter()
+        for item in metrics:
+            latency.update(item.get('latency', {}))
+        _, values = percentiles(latency, (0.5, 0.95))
+        return dict(
+            workers=self.workers,
+            tenants=sum(item.get('tenants', 0) for item in metrics),
+            cycles=sum(item.get('cycles', 0) for item in metrics),
+            failures=sum(item.get('failures', 0) for item in metrics),
+            restarts=self.restarts,
+            round_max=max(
+                (item.get('round', 0) for item in metrics), default=0
+            ),
+            stretch_max=max(
+                (item.get('stretch', 1) for item in metrics), default=1
+            ),
+            skipped=sum(item.get('skipped', 0) for item in metrics),
+            deferred=sum(item.get('deferred', 0) for item in metrics),
+            retries=sum(item.get('retries', 0) for item in metrics),
+            recovered=sum(item.get('recovered', 0) for item in metrics),
+            latency=latency,
+            latency_p50=format_seconds(values.get(0.5)),
+            latency_p95=format_seconds(values.get(0.95)),
+            per_worker=dict(self.metrics),
+        )
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+ADDED = 'added'
+STATUS_CHANGED = 'status-changed'
+COMMENT_CHANGED = 'comment-changed'
+UPDATED = 'updated'
+
+Change = namedtuple('Change', ('kind', 'key', 'homework', 'digests'))
+NOT_A_HOMEWORK = 'Запись ответа API не похожа на работу, пропущена: {!r:.200}'
+
+
+def digest(value):
+    """Возвращает компактный 8-байтовый хеш JSON-представления значения."""
+    data = json.dumps(
+        value, sort_keys=True, ensure_ascii=False, default=str
+    ).encode()
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+def homework_key(homework):
+    """Возвращает идентификатор домашней работы."""
+    return homework.get('id', homework.get('homework_name'))
+
+
+def homework_digests(homework):
+    """Хеши статуса, комментария ревьюера и всей домашней работы."""
+    return (
+        digest(homework.get('status')),
+        digest(homework.get('reviewer_comment')),
+        digest(homework),
+    )
+
+
+class SnapshotDiffer:
+    """
+    Сравнивает последовательные снимки списка домашних работ.
+
+    Для каждой работы хранятся только хеши статуса, комментария и всей
+    записи. Если хеш всего списка не изменился, сравнение завершается
+    без разбора отдельных работ. Изменения применяются к снимку только
+    через accept, поэтому неотправленное уведомление найдётся снова.
+    Ответ API ограничен окном from_date, поэтому работа, которой нет
+    в ответе, не считается удалённой и остаётся в снимке. Записи,
+    которые не являются словарями, пропускаются с ошибкой в журнале.
+    """
+
+    def __init__(self):
+        """Создаёт пустой снимок."""
+        self.response_hash = None
+        self.items = {}
+        self.pending_hash = None
+        self.pending = set()
+
+    def diff(self, homeworks):
+        """
+        Возвращает изменения относительно предыдущего снимка.
+
+            Параметры:
+                homeworks (list): домашние работы из ответа API.
+            Возвращаемое значение (list): объекты Change.
+        """
+        response_hash = digest(homeworks)
+        if response_hash == self.response_hash:
+            return []
+        changes = []
+        for homework in homeworks:
+            if not isinstance(homework, dict):
+                logger.error(NOT_A_HOMEWORK.format(homework))
+                continue
+            key = homework_key(homework)
+            digests = homework_digests(homework)
+            previous = self.items.get(key)
+            if previous == digests:
+                continue
+            if previous is None:
+                kind = ADDED
+            elif previous[0] != digests[0]:
+                kind = STATUS_CHANGED
+            elif previous[1] != digests[1]:
+                kind = COMMENT_CHANGED
+            else:
+                kind = UPDATED
+            changes.append(Change(kind, key, homework, digests))
+        self.pending_hash = response_hash
+        self.pending = {change.key for change in changes}
+        if not changes:
+            self.response_hash = response_hash
+        return changes
+
+    def accept(self, change):
+        """Применяет изменение к снимку после его обработки."""
+        self.items[change.key] = change.digests
+        self.pending.discard(change.key)
+        if not self.pending:
+            self.response_hash = self.pending_hash
+
+    def dump(self):
+        """Снимок в виде, пригодном для JSON."""
+        return [
+            [key, [value.hex() for value in digests]]
+            for key, digests in self.items.items()
+        ]
+
+    def load(self, items):
+        """Восстанавливает снимок из dump; сравнение начнётся заново."""
+        self.load_items({
+            key: tuple(bytes.fromhex(value) for value in digests)
+            for key, digests in items
+        })
+
+    def load_items(self, items):
+        """Восстанавливает снимок из словаря ключ -> хеши."""
+        self.items = items
+        self.response_hash = None
+        self.pending_hash = None
+        self.pending = set()
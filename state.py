@@ -0,0 +1,128 @@
+import time
+
+from snapshots import homework_key
+
+
+class PollState:
+    """
+    Состояние цикла опроса одного арендатора.
+
+    Хранит водяной знак from_date, последнее сообщение о сбое и объекты,
+    которые переживают циклы: снимок работ, журнал и политику повторов.
+    Последние увиденные работы кешируются для ответов на команды бота.
+    fetch — запрос к API для арендатора, отличного от заданного
+    в окружении; None — get_api_answer. messages — отрисовщик сообщений
+    арендатора; None — общий из окружения. watermarks — хранилище
+    водяных знаков, в котором checkpoint сохраняется под ключом tenant.
+    cold — ещё не разобранные снимок и кеш работ из образа состояния,
+    они загружаются при первом обращении к homeworks; до этого priority
+    подсказывает сохранённый приоритет арендатора. generation растёт
+    при cancel: цикл, начатый в прежнем поколении, не меняет состояние
+    и не отправляет сообщений.
+    """
+
+    def __init__(
+        self, timestamp, differ, retrier, history=None, clock=time.time,
+        fetch=None, messages=None, tenant=None, watermarks=None
+    ):
+        """Создаёт состояние с начальным значением from_date."""
+        self.timestamp = timestamp
+        self.old_status = ''
+        self.differ = differ
+        self.retrier = retrier
+        self.history = history
+        self.clock = clock
+        self.fetch = fetch
+        self.messages = messages
+        self.tenant = tenant
+        self.watermarks = watermarks
+        self.cycles = 0
+        self.known = {}
+        self.polled_at = None
+        self.priority = None
+        self.cold = None
+        self.generation = 0
+
+    @property
+    def homeworks(self):
+        """Последние версии домашних работ по идентификатору."""
+        self.warm()
+        return self.known
+
+    @homeworks.setter
+    def homeworks(self, homeworks):
+        self.known = homeworks
+
+    def remember(self, homeworks):
+        """
+        Кеширует последние версии домашних работ.
+
+        Словарь заменяется целиком, поэтому другие потоки читают
+        согласованный снимок без блокировок.
+        """
+        known = dict(self.homeworks)
+        for homework in homeworks:
+            if isinstance(homework, dict):
+                known[homework_key(homework)] = homework
+        self.homeworks = known
+        self.polled_at = self.clock()
+
+    def cancel(self):
+        """Отменяет начатые циклы опроса."""
+        self.generation += 1
+
+    def thaw(self, timestamp, old_status, polled_at, cycles, priority, cold):
+        """Продолжает с горячих полей образа, холодные загрузит warm."""
+        self.timestamp = timestamp
+        self.old_status = old_status
+        self.polled_at = polled_at
+        self.cycles = cycles
+        self.priority = priority
+        self.cold = cold
+
+    def warm(self):
+        """
+        Загружает снимок и кеш работ из образа, если они ещё не загружены.
+
+        cold сбрасывается последним: поток, прочитавший homeworks
+        одновременно, разберёт ту же запись повторно, но не увидит
+        пустой кеш.
+        """
+        cold = self.cold
+        if cold is None:
+            return
+        items, homeworks = cold.load()
+        self.differ.load_items(items)
+        self.known = {
+            homework_key(homework): homework for homework in homeworks
+        }
+        self.cold = None
+
+    def checkpoint(self):
+        """Водяной знак и снимок работ для продолжения в другом процессе."""
+        self.warm()
+        return dict(
+            timestamp=self.timestamp,
+            old_status=self.old_status,
+            snapshot=self.differ.dump(),
+        )
+
+    def restore(self, checkpoint):
+        """Продолжает с сохранённого checkpoint."""
+        self.timestamp = checkpoint['timestamp']
+        self.old_status = checkpoint['old_status']
+        self.differ.load(checkpoint['snapshot'])
+
+    def resume(self):
+        """Продолжает с водяного знака из хранилища, если он сохранён."""
+        if self.watermarks is None:
+            return self
+        checkpoint = self.watermarks.load(self.tenant)
+        if checkpoint is not None:
+            self.restore(checkpoint)
+        return self
+
+    def persist(self):
+        """Сохраняет водяной знак и снимок в хранилище, если оно задано."""
+        if self.watermarks is not None:
+            self.watermarks.save(self.tenant, self.checkpoint())
@@ -0,0 +1,297 @@
+"""
+Двоичный образ состояний арендаторов для быстрого перезапуска.
+
+Запись арендатора делится на горячую часть — водяной знак, сообщение
+о сбое, время последнего опроса, число циклов и приоритет — и холодную:
+хеши снимка работ и кеш последних работ. При запуске образ отображается
+в память, горячие поля читаются по индексу сразу, холодные разбираются,
+когда состояние арендатора понадобится целиком.
+
+Запуск: python state_image.py show FILE [TENANT]
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left
+
+from journal import tenant_key
+
+MAGIC = b'HWSI'
+VERSION = 2
+HEADER = struct.Struct('<4sHIQd')
+KEY = struct.Struct('<Q')
+RECORD = struct.Struct('<qdIHHBI')
+ITEM = struct.Struct('<H')
+COUNT = struct.Struct('<I')
+DIGESTS = 24
+BAD_IMAGE = 'Файл {} не является образом состояния версии {}'
+
+
+def encode_cold(items, homeworks):
+    """Холодная часть: хеши снимка и кеш последних работ."""
+    parts = [COUNT.pack(len(items))]
+    for key, digests in items.items():
+        encoded = json.dumps(key).encode()
+        parts += [ITEM.pack(len(encoded)), encoded, b''.join(digests)]
+    parts.append(json.dumps(homeworks, ensure_ascii=False).encode())
+    return b''.join(parts)
+
+
+def decode_cold(data):
+    """
+    Разбирает холодную часть.
+
+        Возвращаемое значение (tuple): элементы снимка в виде
+            SnapshotDiffer.items и список работ.
+    """
+    count, = COUNT.unpack_from(data, 0)
+    position = COUNT.size
+    items = {}
+    for _ in range(count):
+        length, = ITEM.unpack_from(data, position)
+        position += ITEM.size
+        key = json.loads(bytes(data[position:position + length]))
+        position += length
+        digests = bytes(data[position:position + DIGESTS])
+        position += DIGESTS
+        items[key] = tuple(
+            digests[start:start + 8] for start in range(0, DIGESTS, 8)
+        )
+    return items, json.loads(bytes(data[position:]))
+
+
+def write_image(path, states, priority=None, clock=time.time):
+    """
+    Атомарно записывает образ состояний.
+
+    Холодная часть ещё не прогретого состояния копируется из прежнего
+    образа без разбора. Индекс — отсортированный массив ключей
+    арендаторов и массив смещений записей в том же порядке; образ
+    локален для машины, поэтому массивы пишутся в её порядке байтов.
+
+        Параметры:
+            states (dict): арендатор -> PollState.
+            priority (callable): приоритет по состоянию для сброса
+                нагрузки до прогрева; None — не сохранять.
+            clock (callable): время записи образа для сравнения
+                со свежестью других хранилищ.
+        Возвращаемое значение (int): размер образа в байтах.
+    """
+    tmp_path = f'{path}.tmp'
+    entries = []
+    saved_at = clock()
+    with open(tmp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, 0, 0, saved_at))
+        for tenant, state in states.items():
+            tenant_bytes = str(tenant).encode()
+            status = state.old_status.encode()
+            level = (priority(state) if priority else '').encode()
+            if state.cold is not None:
+                cold = state.cold.raw()
+            else:
+                cold = encode_cold(
+                    state.differ.items, list(state.homeworks.values())
+                )
+            entries.append((tenant_key(tenant), file.tell()))
+            file.write(RECORD.pack(
+                state.timestamp,
+                math.nan if state.polled_at is None else state.polled_at,
+                state.cycles, len(tenant_bytes), len(status), len(level),
+                len(cold)
+            ))
+            file.write(b''.join((tenant_bytes, status, level, cold)))
+        index_offset = file.tell()
+        entries.sort()
+        file.write(struct.pack(
+            f'={2 * len(entries)}Q',
+            *(key for key, _ in entries), *(offset for _, offset in entries)
+        ))
+        size = file.tell()
+        file.seek(0)
+        file.write(HEADER.pack(
+            MAGIC, VERSION, len(entries), index_offset, saved_at
+        ))
+    os.replace(tmp_path, path)
+    return size
+
+
+class ColdRecord:
+    """Холодная часть записи в отображённом образе."""
+
+    def __init__(self, image, start, length):
+        """Запоминает положение холодной части."""
+        self.image = image
+        self.start = start
+        self.length = length
+        self.decoded = None
+
+    def raw(self):
+        """Байты холодной части."""
+        return self.image.map[self.start:self.start + self.length]
+
+    def load(self):
+        """Элементы снимка и список работ; разбираются один раз."""
+        if self.decoded is None:
+            self.decoded = decode_cold(self.raw())
+        return self.decoded
+
+
+class StateImage:
+    """
+    Образ состояний, отображённый в память.
+
+    Открытие читает только заголовок, массивы индекса видны через
+    memoryview без копирования. Горячие поля арендатора находятся
+    bisect по ключам, холодные — хеши снимка и кеш работ — разбираются
+    при первом обращении к ним в PollState. Арендаторы из stale
+    сохранены в другом хранилище позже образа и из него не берутся.
+    """
+
+    def __init__(self, path):
+        """Отображает образ в память и проверяет заголовок."""
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(
+                self.file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            (
+                magic, version, self.count, self.index_offset, self.saved_at
+            ) = HEADER.unpack_from(self.map, 0)
+        except (ValueError, struct.error):
+            self.file.close()
+            raise ValueError(BAD_IMAGE.format(path, VERSION))
+        index_end = self.index_offset + 2 * self.count * KEY.size
+        if (
+            magic != MAGIC or version != VERSION
+            or index_end != len(self.map)
+        ):
+            self.close()
+            raise ValueError(BAD_IMAGE.format(path, VERSION))
+        index = memoryview(self.map)[self.index_offset:index_end].cast('Q')
+        self.keys = index[:self.count]
+        self.offsets = index[self.count:]
+        self.stale = set()
+
+    def __len__(self):
+        """Число записей в индексе."""
+        return self.count
+
+    def find(self, tenant):
+        """Смещение записи арендатора или None."""
+        key = tenant_key(tenant)
+        tenant_bytes = str(tenant).encode()
+        position = bisect_left(self.keys, key)
+        while position < self.count and self.keys[position] == key:
+            offset = self.offsets[position]
+            start = offset + RECORD.size
+            length = RECORD.unpack_from(self.map, offset)[3]
+            if self.map[start:start + length] == tenant_bytes:
+                return offset
+            position += 1
+        return None
+
+    def __contains__(self, tenant):
+        """Есть ли арендатор в образе."""
+        return self.find(tenant) is not None
+
+    def read(self, tenant):
+        """
+        Горячие поля арендатора без разбора холодной части.
+
+            Возвращаемое значение (dict): поля и ColdRecord или None.
+        """
+        offset = self.find(tenant)
+        if offset is None:
+            return None
+        (
+            timestamp, polled_at, cycles,
+            tenant_length, status_length, priority_length, cold_length
+        ) = RECORD.unpack_from(self.map, offset)
+        start = offset + RECORD.size + tenant_length
+        priority = start + status_length
+        cold = priority + priority_length
+        return dict(
+            timestamp=timestamp,
+            polled_at=None if math.isnan(polled_at) else polled_at,
+            cycles=cycles,
+            old_status=self.map[start:priority].decode(),
+            priority=self.map[priority:cold].decode() or None,
+            cold=ColdRecord(self, cold, cold_length),
+        )
+
+    def restore(self, state, tenant):
+        """
+        Восстанавливает состояние арендатора из образа.
+
+            Возвращаемое значение (bool): арендатор найден в образе
+                и не устарел.
+        """
+        if str(tenant) in self.stale:
+            return False
+        record = self.read(tenant)
+        if record is None:
+            return False
+        state.thaw(**record)
+        return True
+
+    def close(self):
+        """Снимает отображение и закрывает файл."""
+        if hasattr(self, 'keys'):
+            self.keys.release()
+            self.offsets.release()
+        self.map.close()
+        self.file.close()
+
+
+def open_image(path, newer=None):
+    """
+    Образ по пути или None, если его нет или он повреждён.
+
+        Параметры:
+            newer (callable): по времени записи образа возвращает
+                арендаторов, сохранённых позже в другом хранилище.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        image = StateImage(path)
+    except (OSError, ValueError):
+        return None
+    if newer is not None:
+        image.stale = set(newer(image.saved_at))
+    return image
+
+
+def main():
+    """Печатает сводку образа или состояние арендатора."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('show')
+    show.add_argument('path')
+    show.add_argument('tenant', nargs='?')
+    args = parser.parse_args()
+    image = StateImage(args.path)
+    if args.tenant is None:
+        print(f'арендаторов: {len(image)}, байт: {len(image.map)}')
+        return
+    record = image.read(args.tenant)
+    if record is None:
+        parser.exit(1, f'арендатора {args.tenant} нет в образе\n')
+    items, homeworks = record.pop('cold').load()
+    snapshot = [
+        [key, [value.hex() for value in digests]]
+        for key, digests in items.items()
+    ]
+    print(json.dumps(
+        dict(record, snapshot=snapshot, homeworks=homeworks),
+        ensure_ascii=False, indent=1
+    ))
+
+
+if __name__ == '__main__':
+    main()
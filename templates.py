@@ -0,0 +1,139 @@
+import re
+from functools import lru_cache
+from string import Formatter
+
+PLAIN = 'plain'
+MARKDOWN = 'markdownv2'
+FORMATS = (PLAIN, MARKDOWN)
+PARSE_MODES = {PLAIN: None, MARKDOWN: 'MarkdownV2'}
+MARKDOWN_SPECIAL = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+
+LOCALES = {
+    'ru': dict(
+        status='Изменился статус проверки работы "{name}".\n{verdict}',
+        comment='Обновлён комментарий ревьюера к работе "{name}":\n{comment}',
+        failure='Сбой в работе программы: {error}.',
+        verdicts={
+            'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+            'reviewing': 'Работа взята на проверку ревьюером.',
+            'rejected': 'Работа проверена: у ревьюера есть замечания.',
+        },
+    ),
+    'en': dict(
+        status='Review status of "{name}" has changed.\n{verdict}',
+        comment='Reviewer updated the comment on "{name}":\n{comment}',
+        failure='Bot failure: {error}.',
+        verdicts={
+            'approved': 'Reviewed: the reviewer liked everything. Hooray!',
+            'reviewing': 'The reviewer has started reviewing your work.',
+            'rejected': 'Reviewed: the reviewer left some remarks.',
+        },
+    ),
+}
+UNKNOWN_LOCALE = 'Неизвестный язык сообщений: {}. Доступные: {}'
+UNKNOWN_FORMAT = 'Неизвестный формат сообщений: {}. Доступные: {}'
+
+
+def escape_markdown(text):
+    """Экранирует спецсимволы Telegram MarkdownV2."""
+    return MARKDOWN_SPECIAL.sub(r'\\\1', str(text))
+
+
+ESCAPES = {PLAIN: str, MARKDOWN: escape_markdown}
+
+
+def compile_template(template, fmt):
+    """
+    Разбирает шаблон один раз.
+
+    Постоянный текст экранируется сразу, подстановки — при отрисовке.
+
+        Возвращаемое значение (tuple): пары (текст, имя поля или None).
+    """
+    escape = ESCAPES[fmt]
+    return tuple(
+        (escape(literal), field)
+        for literal, field, _, _ in Formatter().parse(template)
+    )
+
+
+class Templates:
+    """
+    Скомпилированные шаблоны сообщений по языкам и форматам.
+
+    Все шаблоны разбираются при создании, поэтому ошибка в каталоге
+    видна при запуске. Сообщения о статусах повторяются при рассылке
+    по чатам и повторах доставки, поэтому они кешируются в LRU по
+    (язык, формат, работа, статус).
+    """
+
+    def __init__(self, locales=LOCALES, cache_size=4096):
+        """Компилирует каталог шаблонов для всех форматов."""
+        self.locales = locales
+        self.compiled = {
+            (locale, fmt, key): compile_template(template, fmt)
+            for locale, templates in locales.items()
+            for fmt in FORMATS
+            for key, template in templates.items()
+            if key != 'verdicts'
+        }
+        self.status = lru_cache(maxsize=cache_size)(self.render_status)
+
+    def check(self, locale, fmt):
+        """Проверяет язык и формат."""
+        if locale not in self.locales:
+            raise ValueError(UNKNOWN_LOCALE.format(
+                locale, ', '.join(self.locales)
+            ))
+        if fmt not in FORMATS:
+            raise ValueError(UNKNOWN_FORMAT.format(fmt, ', '.join(FORMATS)))
+
+    def render(self, locale, fmt, key, **values):
+        """Отрисовывает шаблон key с экранированными подстановками."""
+        escape = ESCAPES[fmt]
+        return ''.join(
+            literal if field is None else literal + escape(values[field])
+            for literal, field in self.compiled[locale, fmt, key]
+        )
+
+    def render_status(self, locale, fmt, homework_name, status):
+        """Сообщение о смене статуса работы."""
+        return self.render(
+            locale, fmt, 'status', name=homework_name,
+            verdict=self.locales[locale]['verdicts'][status]
+        )
+
+    def renderer(self, locale, fmt):
+        """Отрисовщик сообщений для одного языка и формата."""
+        self.check(locale, fmt)
+        return Renderer(self, locale, fmt)
+
+
+class Renderer:
+    """Сообщения бота на языке и в формате арендатора."""
+
+    def __init__(self, templates, locale, fmt):
+        """Запоминает каталог, язык и формат."""
+        self.templates = templates
+        self.locale = locale
+        self.fmt = fmt
+        self.parse_mode = PARSE_MODES[fmt]
+
+    def status(self, homework_name, status):
+        """Сообщение о смене статуса, из кеша."""
+        return self.templates.status(
+            self.locale, self.fmt, homework_name, status
+        )
+
+    def comment(self, homework_name, comment):
+        """Сообщение о новом комментарии ревьюера."""
+        return self.templates.render(
+            self.locale, self.fmt, 'comment', name=homework_name,
+            comment=comment
+        )
+
+    def failure(self, error):
+        """Сообщение о сбое."""
+        return self.templates.render(
+            self.locale, self.fmt, 'failure', error=error
+        )
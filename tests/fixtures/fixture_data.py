@@ -46,3 +46,31 @@ def data_with_new_hw_status(random_timestamp):
         ],
         'current_date': random_timestamp
     }
+
+
+@pytest.fixture
+def workload():
+    from benchmarks.workload import Workload
+
+    def make_workload(**kwargs):
+        kwargs.setdefault('seed', 42)
+        return Workload(**kwargs)
+    return make_workload
+
+
+class FakeClock:
+    def __init__(self, start=1700000000):
+        self.now = start
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_clock():
+    return FakeClock()
@@ -0,0 +1,88 @@
+import threading
+from types import SimpleNamespace
+
+from commands import Coalescer, register_commands
+
+
+class FakeBot:
+    def __init__(self):
+        self.handlers = {}
+        self.replies = []
+
+    def message_handler(self, commands, func):
+        def decorator(handler):
+            for command in commands:
+                self.handlers[command] = (func, handler)
+            return handler
+        return decorator
+
+    def reply_to(self, message, text):
+        self.replies.append(text)
+
+    def command(self, name, chat_id='12345'):
+        message = SimpleNamespace(
+            text=f'/{name}', chat=SimpleNamespace(id=chat_id)
+        )
+        func, handler = self.handlers[name]
+        if func(message):
+            handler(message)
+
+
+def test_concurrent_polls_are_coalesced():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def poll():
+        calls.append(1)
+        started.set()
+        release.wait()
+
+    coalescer = Coalescer(poll)
+    owner = threading.Thread(target=coalescer.poll)
+    owner.start()
+    started.wait()
+    joiners = [threading.Thread(target=coalescer.poll) for _ in range(5)]
+    for joiner in joiners:
+        joiner.start()
+    release.set()
+    for thread in [owner] + joiners:
+        thread.join()
+    assert len(calls) == 1
+    assert coalescer.poll(max_age=60) is False
+    assert coalescer.poll() is True
+    assert len(calls) == 2
+
+
+def test_commands(monkeypatch, homework_module, fake_clock):
+    requests = []
+
+    def get_api_answer(timestamp):
+        requests.append(timestamp)
+        return {
+            'homeworks': [{
+                'id': 1, 'homework_name': 'hw.zip', 'status': 'approved'
+            }],
+            'current_date': timestamp,
+        }
+
+    monkeypatch.setattr(homework_module, 'get_api_answer', get_api_answer)
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    coalescer = Coalescer(lambda: homework_module.run_cycle(
+        lambda homework, message: True, state
+    ))
+    bot = FakeBot()
+    register_commands(
+        bot, coalescer, state, homework_module.HOMEWORK_VERDICTS, 't1',
+        ['12345']
+    )
+    bot.command('status')
+    assert requests == []
+    for _ in range(3):
+        bot.command('now')
+    assert len(requests) == 1
+    assert 'ревьюеру всё понравилось' in bot.replies[-1]
+    bot.command('history')
+    assert bot.replies[-1] == 'Журнал статусов не включён.'
+    bot.command('now', chat_id='666')
+    assert len(bot.replies) == 5
@@ -0,0 +1,114 @@
+import inspect
+import logging
+import threading
+from functools import partial
+
+from exceptions import StatusCodeException
+
+
+def replay_api(workload, clock, tenant=0):
+    events = iter(workload.timeline(tenant))
+    pending = [next(events, None)]
+    latest = {}
+
+    def get_api_answer(timestamp):
+        while pending[0] is not None and pending[0][0] <= clock.time():
+            moment, homework = pending[0]
+            latest[homework['id']] = (moment, homework)
+            pending[0] = next(events, None)
+        return {
+            'homeworks': [
+                homework for moment, homework in latest.values()
+                if moment >= timestamp
+            ],
+            'current_date': clock.time(),
+        }
+    return get_api_answer
+
+
+def test_run_honours_iterations(monkeypatch, homework_module, fake_clock):
+    monkeypatch.setattr(
+        homework_module, 'get_api_answer',
+        lambda timestamp: {'homeworks': [], 'current_date': timestamp}
+    )
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    poll = partial(
+        homework_module.run_cycle, lambda homework, message: True, state
+    )
+    pace = partial(homework_module.next_period, None, None, state, None)
+    for period in homework_module.run(poll, pace, fake_clock.time, 3):
+        fake_clock.sleep(period)
+    assert state.cycles == 3
+    assert fake_clock.sleeps == [homework_module.RETRY_PERIOD] * 3
+    cancelled = threading.Event()
+    assert list(homework_module.run(
+        cancelled.set, pace, fake_clock.time, cancelled=cancelled
+    )) == []
+
+
+def test_main_honours_hooks(monkeypatch, homework_module, fake_clock):
+    calls = []
+
+    def get_api_answer(timestamp):
+        calls.append(timestamp)
+        return {'homeworks': [], 'current_date': fake_clock.time()}
+
+    for name in homework_module.NAMES:
+        monkeypatch.setattr(homework_module, name, '1234:abcdefg')
+    monkeypatch.setattr(homework_module, 'get_api_answer', get_api_answer)
+    monkeypatch.setattr(homework_module, 'MAIN_CLOCK', fake_clock.time)
+    monkeypatch.setattr(homework_module, 'MAIN_SLEEP', fake_clock.sleep)
+    monkeypatch.setattr(homework_module, 'MAIN_ITERATIONS', 3)
+    start = fake_clock.time()
+    # test_bot оборачивает main проверкой бесконечного цикла.
+    inspect.unwrap(homework_module.main)()
+    assert fake_clock.sleeps == [homework_module.RETRY_PERIOD] * 3
+    assert len(calls) == 3 and calls[0] == start
+
+
+def test_retries_use_injected_sleep(monkeypatch, homework_module, fake_clock):
+    calls = []
+
+    def get_api_answer(timestamp):
+        calls.append(timestamp)
+        if len(calls) == 1:
+            raise StatusCodeException('', 503)
+        return {'homeworks': [], 'current_date': timestamp}
+
+    monkeypatch.setattr(homework_module, 'get_api_answer', get_api_answer)
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    homework_module.run_cycle(lambda homework, message: True, state)
+    assert len(calls) == 2
+    assert 0 < fake_clock.sleeps[0] <= 2
+
+
+def test_thousands_of_cycles(monkeypatch, caplog, homework_module,
+                             fake_clock, workload):
+    caplog.set_level(logging.CRITICAL, logger='homework')
+    load = workload(homeworks=10)
+    monkeypatch.setattr(
+        homework_module, 'get_api_answer', replay_api(load, fake_clock)
+    )
+    sent = []
+
+    def sender(homework, message):
+        sent.append((homework['id'], homework['status']))
+        return True
+
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    end = load.timeline(0)[-1][0] + homework_module.RETRY_PERIOD
+    cycles = (end - fake_clock.time()) // homework_module.RETRY_PERIOD + 1
+    poll = partial(homework_module.run_cycle, sender, state)
+    for period in homework_module.run(
+        poll, lambda elapsed: homework_module.RETRY_PERIOD, fake_clock.time,
+        cycles
+    ):
+        fake_clock.sleep(period)
+
+    assert state.cycles > 5000
+    final = {}
+    for homework_id, status in sent:
+        assert final.get(homework_id) != status
+        final[homework_id] = status
+    assert len(final) == 10
+    assert set(final.values()) == {'approved'}
@@ -0,0 +1,18 @@
+import pytest
+
+from decoders import DECODERS, decode_response, get_decoder
+from transport import Response
+
+
+@pytest.mark.parametrize('name', list(DECODERS))
+def test_decoders_read_bytes(name, workload):
+    content = workload(homeworks=5).payload_bytes(0)
+    response = Response(200, content)
+    assert decode_response(response, get_decoder(name)) == (
+        DECODERS['json'](content)
+    )
+
+
+def test_unknown_decoder():
+    with pytest.raises(ValueError):
+        get_decoder('simdjson')
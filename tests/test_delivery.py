@@ -0,0 +1,117 @@
+import threading
+import time
+
+from delivery import DROP_OLDEST, SPILL, DeliveryExecutor
+
+
+def blocked_handler(delivered):
+    started = threading.Event()
+    gate = threading.Event()
+
+    def handler(homework, message):
+        started.set()
+        gate.wait()
+        delivered.append(message)
+        return True
+
+    return started, gate, handler
+
+
+def test_drop_oldest_policy():
+    delivered = []
+    started, gate, handler = blocked_handler(delivered)
+    executor = DeliveryExecutor(handler, workers=1, capacity=2,
+                                policy=DROP_OLDEST)
+    executor.submit(None, 'in progress')
+    started.wait()
+    for number in range(4):
+        assert executor.submit(None, f'message {number}')
+    gate.set()
+    assert executor.join(timeout=1)
+    executor.shutdown()
+    assert delivered == ['in progress', 'message 2', 'message 3']
+    stats = executor.stats()
+    assert stats['dropped'] == 2
+    assert stats['saturation_peak'] == 1
+
+
+def test_spill_policy_keeps_order(tmp_path):
+    delivered = []
+    started, gate, handler = blocked_handler(delivered)
+    executor = DeliveryExecutor(
+        handler, workers=1, capacity=2, policy=SPILL,
+        spill_path=str(tmp_path / 'spill.jsonl')
+    )
+    executor.submit(None, 'in progress')
+    started.wait()
+    messages = [f'message {number}' for number in range(6)]
+    for message in messages:
+        assert executor.submit({'id': 1}, message)
+    assert executor.stats()['spilled'] == 4
+    gate.set()
+    assert executor.join(timeout=1)
+    executor.shutdown()
+    assert delivered == ['in progress'] + messages
+
+
+def test_failed_delivery_is_retried_then_kept(tmp_path):
+    dead_letters = str(tmp_path / 'failed.jsonl')
+    calls = []
+
+    def flaky(homework, message):
+        calls.append(message)
+        return len(calls) > 2
+
+    executor = DeliveryExecutor(
+        flaky, workers=1, retry_interval=0.01, dead_letter_path=dead_letters
+    )
+    assert executor.submit(None, 'flaky')
+    assert executor.join(timeout=1)
+    executor.shutdown()
+    assert calls == ['flaky'] * 3
+    assert (executor.stats()['retried'], executor.stats()['delivered']) == (
+        2, 1
+    )
+
+    executor = DeliveryExecutor(
+        lambda homework, message: False, workers=1, attempts=2,
+        retry_interval=0.01, dead_letter_path=dead_letters
+    )
+    executor.submit({'id': 1}, 'lost')
+    assert executor.join(timeout=1)
+    executor.shutdown()
+    assert executor.stats()['failed'] == 1
+    delivered = []
+    executor = DeliveryExecutor(
+        lambda homework, message: delivered.append(message) or True,
+        workers=1, dead_letter_path=dead_letters
+    )
+    assert executor.join(timeout=1)
+    executor.shutdown()
+    assert delivered == ['lost']
+
+
+def test_outage_longer_than_retries_is_delivered(tmp_path):
+    outage = threading.Event()
+    outage.set()
+    delivered = []
+
+    def handler(homework, message):
+        if outage.is_set():
+            return False
+        delivered.append(message)
+        return True
+
+    executor = DeliveryExecutor(
+        handler, workers=1, attempts=2, retry_interval=0.01,
+        dead_letter_path=str(tmp_path / 'failed.jsonl'), revive_interval=0.05
+    )
+    executor.submit({'id': 1}, 'late')
+    deadline = time.monotonic() + 1
+    while executor.stats()['failed'] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    outage.clear()
+    while not delivered and time.monotonic() < deadline:
+        time.sleep(0.01)
+    executor.shutdown()
+    assert delivered == ['late']
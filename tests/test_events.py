@@ -0,0 +1,150 @@
+import json
+import threading
+
+from events import AuditSink, EmailDigestSink, EventBus, RetryingSink
+from retry import RetryPolicy
+
+
+def test_slow_sink_does_not_block_others(tmp_path):
+    gate = threading.Event()
+    fast = []
+
+    def slow(homework, message):
+        gate.wait()
+        return True
+
+    def quick(homework, message):
+        fast.append(message)
+        return True
+
+    bus = EventBus(
+        {'slow': slow, 'quick': quick}, capacity=2, spill_dir=str(tmp_path)
+    )
+    messages = [f'event {number}' for number in range(10)]
+    for message in messages:
+        assert bus.publish({'id': 1}, message)
+    assert bus.executors['quick'].join(timeout=1)
+    assert fast == messages
+    assert bus.stats()['slow']['spilled'] > 0
+    gate.set()
+    assert bus.join(timeout=1)
+    bus.shutdown()
+    assert bus.stats()['slow']['delivered'] == 10
+
+
+def test_shutdown_without_drain_spills_queue(tmp_path):
+    gate = threading.Event()
+    started = threading.Event()
+
+    def blocked(homework, message):
+        started.set()
+        gate.wait()
+        return True
+
+    bus = EventBus({'slow': blocked}, capacity=5, spill_dir=str(tmp_path))
+    for number in range(4):
+        bus.publish({'id': 1}, f'event {number}')
+    started.wait()
+    executor = bus.executors['slow']
+    stopper = threading.Thread(target=bus.shutdown, args=(False,))
+    stopper.start()
+    while not executor.stopped:
+        pass
+    gate.set()
+    stopper.join(timeout=1)
+    spill = tmp_path / 'slow_spill.jsonl'
+    messages = [json.loads(line)[2] for line in spill.read_text().splitlines()]
+    assert messages == ['event 1', 'event 2', 'event 3']
+    assert executor.stats()['delivered'] == 1
+
+
+def test_audit_sink_writes_jsonl(tmp_path):
+    path = tmp_path / 'audit.jsonl'
+    sink = AuditSink(str(path), 'tenant')
+    sink({'id': 7, 'homework_name': 'hw.zip', 'status': 'approved'}, 'ok')
+    sink.close()
+    [record] = [json.loads(line) for line in path.read_text().splitlines()]
+    assert record['tenant'] == 'tenant'
+    assert record['homework_id'] == 7
+    assert record['status'] == 'approved'
+    assert record['message'] == 'ok'
+
+
+def test_retrying_sink_retries_failures():
+    calls = []
+    sleeps = []
+
+    def flaky(homework, message):
+        calls.append(message)
+        if len(calls) < 3:
+            raise ConnectionError('down')
+        return True
+
+    sink = RetryingSink(
+        'flaky', flaky, RetryPolicy(3, 1, 10, 0), sleep=sleeps.append
+    )
+    assert sink(None, 'event')
+    assert sleeps == [1, 2]
+    assert sink.retries == 2
+    assert not RetryingSink(
+        'broken', lambda homework, message: False,
+        RetryPolicy(2, 1, 10, 0), sleep=sleeps.append
+    )(None, 'event')
+
+
+def test_email_digest_keeps_events_on_failure():
+    sent = []
+
+    class FailingSMTP:
+        def __init__(self, host, port):
+            pass
+
+        def __enter__(self):
+            raise OSError('no smtp')
+
+        def __exit__(self, *args):
+            return False
+
+    class SMTP(FailingSMTP):
+        def __enter__(self):
+            return self
+
+        def send_message(self, email):
+            sent.append(email)
+
+    sink = EmailDigestSink('localhost', 25, 'bot@example.com',
+                           ['teacher@example.com'], 3600, FailingSMTP)
+    sink(None, 'first')
+    sink(None, 'second')
+    sink.flush()
+    assert sink.pending == ['first', 'second']
+    sink.smtp = SMTP
+    sink.flush()
+    sink.stopped.set()
+    assert sink.pending == []
+    assert '2' in sent[0]['Subject']
+
+
+def test_failed_event_is_kept_for_next_start(tmp_path):
+    calls = []
+
+    def broken(homework, message):
+        calls.append(message)
+        return False
+
+    bus = EventBus(
+        {'telegram': broken}, spill_dir=str(tmp_path),
+        own_retries={'telegram'}
+    )
+    assert bus.publish({'id': 1}, 'event')
+    assert bus.join(timeout=1)
+    bus.shutdown()
+    assert calls == ['event']
+    failed = tmp_path / 'telegram_failed.jsonl'
+    assert json.loads(failed.read_text())[2] == 'event'
+
+
+def test_webhook_sink_needs_url(monkeypatch, homework_module):
+    monkeypatch.setattr(homework_module, 'EVENT_SINKS', ['webhook'])
+    monkeypatch.setattr(homework_module, 'LMS_WEBHOOK_URL', None)
+    assert list(homework_module.create_sinks(print)) == ['telegram']
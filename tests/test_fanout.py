@@ -0,0 +1,45 @@
+from fanout import Fanout
+
+
+def test_failed_chat_does_not_retrigger_others():
+    calls = []
+    broken = {'2'}
+
+    def send(chat_id, message):
+        calls.append(chat_id)
+        return chat_id not in broken
+
+    fanout = Fanout(['1', '2', '3'], workers=3, retries=1, interval=0)
+    assert not fanout.deliver('status', send)
+    assert sorted(calls) == ['1', '2', '3']
+
+    assert not fanout.deliver('comment', send)
+
+    calls.clear()
+    broken.clear()
+    assert fanout.deliver('status', send)
+    assert fanout.deliver('comment', send)
+    assert calls == ['2', '2']
+    assert fanout.delivered == {}
+    fanout.shutdown()
+
+
+def test_pending_messages_are_bounded():
+    fanout = Fanout(['1'], workers=1, retries=1, interval=0, max_pending=2)
+    for number in range(3):
+        fanout.deliver(f'message {number}', lambda chat_id, message: False)
+    assert list(fanout.delivered) == ['message 1', 'message 2']
+    fanout.shutdown()
+
+
+def test_retries_failed_chat():
+    attempts = []
+
+    def send(chat_id, message):
+        attempts.append(chat_id)
+        return len(attempts) > 1
+
+    fanout = Fanout(['1'], workers=1, retries=3, interval=0)
+    assert fanout.deliver('status', send)
+    assert attempts == ['1', '1']
+    fanout.shutdown()
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from exceptions import DenialOfService, StatusCodeException, TransportError
+from faults import (
+    DENIAL, MALFORMED, SERVER_ERROR, SLOW, TELEGRAM_DOWN, TIMEOUT, Fault,
+    FaultInjector, parse_schedule
+)
+from transport import Response
+
+BODY = json.dumps({'homeworks': [], 'current_date': 1}).encode()
+
+
+class Api:
+    def get(self, url, headers=None, params=None):
+        return Response(200, BODY)
+
+
+def test_parse_schedule():
+    assert parse_schedule('server_error@60+300, slow@600+120/20', 1000) == [
+        Fault(SERVER_ERROR, 1060, 300, 0), Fault(SLOW, 1600, 120, 20)
+    ]
+    with pytest.raises(ValueError):
+        parse_schedule('meteor@0+1')
+    with pytest.raises(ValueError):
+        parse_schedule('slow@soon')
+
+
+@pytest.mark.parametrize('kind, error', [
+    (TIMEOUT, TransportError),
+    (SERVER_ERROR, StatusCodeException),
+    (DENIAL, DenialOfService),
+    (MALFORMED, ValueError),
+])
+def test_api_faults_go_through_get_api_answer(
+        monkeypatch, homework_module, fake_clock, kind, error):
+    injector = FaultInjector(
+        [Fault(kind, fake_clock.time(), 60)], fake_clock.time,
+        fake_clock.sleep
+    )
+    monkeypatch.setattr(
+        homework_module, 'TRANSPORT', injector.wrap_transport(Api())
+    )
+    with pytest.raises((error, ConnectionError)):
+        homework_module.get_api_answer(0)
+    fake_clock.sleep(60)
+    assert homework_module.get_api_answer(0)['current_date'] == 1
+    assert injector.injected[kind] == 1
+    assert injector.served == [fake_clock.time()]
+
+
+def test_slow_fault_delays_response(fake_clock):
+    injector = FaultInjector(
+        [Fault(SLOW, fake_clock.time(), 60, 15)], fake_clock.time,
+        fake_clock.sleep
+    )
+    assert injector.wrap_transport(Api()).get('url').content == BODY
+    assert fake_clock.sleeps == [15]
+
+
+def test_telegram_outage_and_handler(fake_clock):
+    injector = FaultInjector(
+        [Fault(TELEGRAM_DOWN, fake_clock.time(), 60),
+         Fault(SERVER_ERROR, fake_clock.time(), 60)],
+        fake_clock.time, fake_clock.sleep
+    )
+    send = injector.wrap_sender(lambda homework, message: True)
+    handler = injector.wrap_handler(lambda path, query, headers: (200, BODY))
+    assert not send(None, 'message')
+    assert handler('/', {}, {})[0] == 503
+    fake_clock.sleep(60)
+    assert send(None, 'message')
+    assert handler('/', {}, {}) == (200, BODY)
+    assert injector.sent == [(fake_clock.time(), None, 'message')]
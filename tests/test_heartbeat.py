@@ -0,0 +1,196 @@
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from functools import partial
+
+from commands import Coalescer
+from heartbeat import Watchdog, start_health
+from shard import Supervisor
+
+
+def test_watchdog_restarts_stalled_component(caplog, fake_clock):
+    restarts = []
+    watchdog = Watchdog(deadline=60, clock=fake_clock.time)
+    watchdog.register('poll', lambda: restarts.append(fake_clock.time()))
+    watchdog.beat('poll', 'sleep', timeout=600)
+    fake_clock.sleep(600)
+    assert watchdog.check() == []
+    assert watchdog.status()['ready']
+    watchdog.beat('poll', 'fetch')
+    fake_clock.sleep(61)
+    with caplog.at_level(logging.ERROR, logger='heartbeat'):
+        assert watchdog.check() == ['poll']
+    assert 'fetch' in caplog.text
+    assert 'test_watchdog_restarts_stalled_component' in caplog.text
+    assert len(restarts) == 1
+    status = watchdog.status()
+    assert status['live'] and not status['ready']
+    assert status['components']['poll']['restarts'] == 1
+
+
+def test_failed_restart_is_not_live(fake_clock):
+    def restart():
+        raise RuntimeError('no')
+
+    watchdog = Watchdog(deadline=1, clock=fake_clock.time)
+    watchdog.register('poll', restart)
+    fake_clock.sleep(2)
+    watchdog.check()
+    assert not watchdog.status()['live']
+
+
+def test_abandoned_poll_does_not_block_new_polls():
+    release = threading.Event()
+    calls = []
+
+    def poll():
+        calls.append(threading.current_thread().name)
+        if len(calls) == 1:
+            release.wait(1)
+
+    coalescer = Coalescer(poll)
+    stuck = threading.Thread(target=coalescer.poll, name='stuck')
+    stuck.start()
+    while not calls:
+        time.sleep(0.001)
+    coalescer.abandon()
+    assert coalescer.poll()
+    release.set()
+    stuck.join()
+    assert calls == ['stuck', 'MainThread']
+    assert coalescer.done is None
+
+
+def test_health_endpoint_reports_readiness():
+    watchdog = Watchdog(deadline=60)
+    watchdog.register('poll')
+    server = start_health(watchdog, 0, poll_interval=0.01)
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        try:
+            urllib.request.urlopen(f'{url}/ready', timeout=1)
+        except urllib.error.HTTPError as error:
+            assert error.code == 503
+        else:
+            raise AssertionError('ready before the first heartbeat')
+        watchdog.beat('poll', 'fetch')
+        with urllib.request.urlopen(f'{url}/ready', timeout=1) as response:
+            status = json.loads(response.read())
+        assert status['components']['poll']['stage'] == 'fetch'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_watch_restarts_stuck_poll_loop(monkeypatch, homework_module):
+    watchdog = Watchdog(deadline=0.05, interval=0.01)
+    release = threading.Event()
+    threads = []
+
+    def poll():
+        threads.append(threading.current_thread())
+        if len(threads) == 1:
+            release.wait(1)
+
+    def run():
+        while len(threads) < 3:
+            watchdog.check()
+            time.sleep(0.01)
+
+    monkeypatch.setattr(homework_module, 'WATCHDOG', watchdog)
+    monkeypatch.setattr(watchdog, 'run', run)
+    homework_module.watch(Coalescer(poll), lambda elapsed: 0.01, None)
+    release.set()
+    assert watchdog.status()['components']['poll']['restarts'] == 1
+    assert threads[0] is not threads[1] and threads[1] is threads[2]
+
+
+class ThreadProcess:
+    """Обработчик шарда в потоке: terminate будит зависший цикл."""
+
+    def __init__(self, target, args, name, daemon):
+        self.terminated = args[1][0]['terminated']
+        self.thread = threading.Thread(
+            target=target, args=args, name=name, daemon=daemon
+        )
+        self.pid = None
+        self.exitcode = None
+
+    def start(self):
+        self.thread.start()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def terminate(self):
+        self.terminated.set()
+
+
+class ThreadContext:
+    Queue = queue.Queue
+    Process = ThreadProcess
+
+
+def hanging_worker(node, tenants, control, metrics):
+    tenant = tenants[0]
+    tenant['spawns'] += 1
+    if tenant['spawns'] == 1:
+        tenant['terminated'].wait(1)
+        return
+    metrics.put(dict(node=node, tenants=len(tenants), cycles=1))
+    control.get()
+
+
+def test_hung_shard_worker_is_restarted(fake_clock):
+    watchdog = Watchdog(deadline=60, clock=fake_clock.time)
+    tenant = dict(id=0, spawns=0, terminated=threading.Event())
+    supervisor = Supervisor(
+        hanging_worker, [tenant], 1, key=lambda tenant: tenant['id'],
+        context=ThreadContext(), clock=fake_clock.time,
+        heartbeat=lambda node: watchdog.beat(f'shard-{node}', 'round')
+    )
+    watchdog.register('shard-0', partial(supervisor.restart, 0))
+    supervisor.start()
+    try:
+        assert watchdog.check() == []
+        fake_clock.sleep(61)
+        assert watchdog.check() == ['shard-0']
+        supervisor.controls[0].put(None)
+        supervisor.processes[0].join(1)
+        assert supervisor.stats()['cycles'] == 1
+        assert supervisor.restarts == 1 and tenant['spawns'] == 2
+        assert watchdog.status()['ready']
+    finally:
+        supervisor.stop()
+
+
+def test_cancelled_cycle_does_not_touch_state(homework_module, fake_clock):
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    sent = []
+
+    def restarted_during_fetch(timestamp):
+        state.cancel()
+        return {
+            'homeworks': [{'homework_name': 'hw.zip', 'status': 'approved'}],
+            'current_date': timestamp + 600,
+        }
+
+    def failed_during_fetch(timestamp):
+        state.cancel()
+        raise ConnectionError('late')
+
+    timestamp = state.timestamp
+    for fetch in (restarted_during_fetch, failed_during_fetch):
+        state.fetch = fetch
+        homework_module.run_cycle(
+            lambda homework, message: sent.append(message) or True, state
+        )
+    assert sent == [] and state.old_status == ''
+    assert state.timestamp == timestamp and state.differ.items == {}
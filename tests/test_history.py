@@ -0,0 +1,83 @@
+from history import HistoryStore
+
+
+def homework(status, date, id=1, project='Спринт 1'):
+    return {
+        'id': id,
+        'homework_name': f'hw{id}.zip',
+        'lesson_name': project,
+        'status': status,
+        'date_updated': date,
+    }
+
+
+def test_turnaround_and_rejection_rate(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'), batch_size=2)
+    store.record('t1', homework('reviewing', '2024-01-01T10:00:00Z'))
+    assert not store.record('t1', homework('reviewing', '2024-01-01T10:00:00Z'))
+    store.record('t1', homework('rejected', '2024-01-01T12:00:00Z'))
+    store.record('t1', homework('reviewing', '2024-01-02T10:00:00Z'))
+    store.record('t1', homework('approved', '2024-01-02T11:00:00Z'))
+    store.record('t2', homework('reviewing', 1704103200, project='Спринт 2'))
+    [sprint_1, sprint_2] = store.project_stats()
+    assert sprint_1['rejection_rate'] == 0.5
+    assert sprint_1['reviews'] == 2
+    assert sprint_1['review_avg'] == 5400
+    assert sprint_1['review_max'] == 7200
+    assert sprint_2['rejection_rate'] is None
+    statuses = [row['status'] for row in store.transitions('t1', 1)]
+    assert statuses == ['reviewing', 'rejected', 'reviewing', 'approved']
+    store.close()
+
+
+def test_last_status_survives_restart(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    store = HistoryStore(path)
+    store.record('t1', homework('reviewing', '2024-01-01T10:00:00Z'))
+    store.close()
+    store = HistoryStore(path)
+    assert not store.record('t1', homework('reviewing', '2024-01-01T10:00:00Z'))
+    assert store.record('t1', homework('approved', '2024-01-01T11:00:00Z'))
+    assert store.project_stats('Спринт 1')[0]['review_avg'] == 3600
+    store.close()
+
+
+def test_cycle_records_under_state_tenant(tmp_path, homework_module,
+                                          fake_clock):
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    state.tenant = 't9'
+    state.history = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    state.fetch = lambda timestamp: {
+        'homeworks': [homework('reviewing', '2024-01-01T10:00:00Z')],
+        'current_date': 0,
+    }
+    homework_module.run_cycle(lambda homework, message: True, state)
+    state.history.flush()
+    assert [row['status'] for row in state.history.transitions('t9', 1)] == [
+        'reviewing'
+    ]
+    state.history.close()
+
+
+def test_bad_date_does_not_stop_notifications(tmp_path, homework_module,
+                                              fake_clock):
+    sent = []
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    state.tenant = 't1'
+    state.history = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    broken = homework('reviewing', 'вчера')
+    state.fetch = lambda timestamp: {
+        'homeworks': [
+            broken, {'id': 2, 'homework_name': 'hw2.zip'},
+            dict(broken, id=3, homework_name='hw3.zip'),
+        ],
+        'current_date': 0,
+    }
+    homework_module.run_cycle(
+        lambda homework, message: sent.append(message) or True, state
+    )
+    state.history.flush()
+    assert len(sent) == 2
+    rows = state.history.transitions('t1', 1)
+    assert [row['date_updated'] for row in rows] == [None]
+    state.history.close()
@@ -0,0 +1,58 @@
+import json
+
+from journal import INDEX, Journal
+from transport import Response
+
+
+def fill(journal):
+    for number in range(60):
+        journal.append(
+            f'tenant{number % 3}', 200,
+            json.dumps({'number': number}).encode(), 1000 + number
+        )
+
+
+def test_lookup_across_rotated_segments(tmp_path):
+    journal = Journal(str(tmp_path), max_segment=500)
+    fill(journal)
+    assert len(journal.segments()) > 3
+    entries = journal.lookup('tenant1', since=1010, until=1040)
+    assert [json.loads(entry.body)['number'] for entry in entries] == list(
+        range(10, 40, 3)
+    )
+    assert {entry.tenant for entry in entries} == {'tenant1'}
+    assert [entry.timestamp for entry in journal.entries()] == list(
+        range(1000, 1060)
+    )
+    journal.close()
+
+
+def test_reopen_drops_torn_index_tail(tmp_path):
+    journal = Journal(str(tmp_path))
+    fill(journal)
+    journal.close()
+    index_path = tmp_path / '000000.idx'
+    with open(index_path, 'ab') as file:
+        file.write(INDEX.pack(1, 2000, 10 ** 9, 10, 200)[:-3])
+    journal = Journal(str(tmp_path))
+    assert index_path.stat().st_size == 60 * INDEX.size
+    journal.append('tenant0', 500, b'{}', 3000)
+    assert journal.lookup('tenant0', since=2000)[0].status_code == 500
+    journal.close()
+
+
+def test_get_api_answer_journals_raw_body(monkeypatch, homework_module,
+                                          tmp_path):
+    body = b'{"homeworks": [], "current_date": 1}'
+
+    class Transport:
+        def get(self, url, headers, params):
+            return Response(200, body)
+
+    journal = Journal(str(tmp_path))
+    monkeypatch.setattr(homework_module, 'TRANSPORT', Transport())
+    monkeypatch.setattr(homework_module, 'JOURNAL', journal)
+    assert homework_module.get_api_answer(0) == json.loads(body)
+    [entry] = journal.lookup(homework_module.TENANT_ID)
+    assert entry.body == body
+    journal.close()
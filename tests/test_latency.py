@@ -0,0 +1,43 @@
+import logging
+
+import pytest
+
+from latency import LatencyTracker, RollingHistogram, bucket_bound, bucket
+
+
+def test_bucket_bounds_are_within_step():
+    for seconds in (1.5, 30, 600, 86400):
+        assert seconds <= bucket_bound(bucket(seconds)) < seconds * 1.2
+
+
+def test_rolling_histogram_expires_old_slices(fake_clock):
+    histogram = RollingHistogram(window=3600, slices=6, clock=fake_clock.time)
+    for seconds in range(1, 101):
+        histogram.record(seconds * 60)
+    count, values = histogram.percentiles()
+    assert count == 100
+    assert 50 * 60 <= values[0.5] < 50 * 60 * 1.2
+    assert 99 * 60 <= values[0.99] < 99 * 60 * 1.2
+    fake_clock.sleep(3600)
+    assert histogram.percentiles() == (0, {})
+
+
+def test_tracker_measures_from_date_updated(fake_clock, caplog):
+    tracker = LatencyTracker(alert_threshold=600, clock=fake_clock.time)
+    updated = fake_clock.time() - 120
+    homework = {'id': 1, 'date_updated': updated}
+    send = tracker.wrap(lambda homework, message: True, 'tenant')
+    assert send(homework, 'ok')
+    assert tracker.observe('tenant', {'id': 2}) is None
+    count, values = tracker.report('tenant')['tenant']
+    assert count == 1
+    assert values[0.5] == pytest.approx(120, rel=0.2)
+    with caplog.at_level(logging.INFO, logger='latency'):
+        for _ in range(5):
+            tracker.observe('other', {'date_updated': updated - 3600})
+        tracker.observe('other', {'date_updated': '2023-11-14T22:13:20Z'})
+        for _ in range(200):
+            tracker.observe('tenant', {'date_updated': fake_clock.time()})
+    messages = [record.levelname for record in caplog.records]
+    assert messages == ['ERROR', 'INFO']
+    assert 'p50' in tracker.render('tenant')
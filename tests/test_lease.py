@@ -0,0 +1,109 @@
+import os
+import signal
+
+import pytest
+
+from lease import Lease, LeaseKeeper, MemoryLease, SqliteLease
+from transport import Response
+
+
+def test_sqlite_lease_fails_over_and_fences(tmp_path, fake_clock):
+    path = str(tmp_path / 'lease.sqlite3')
+    active = SqliteLease(path, 'poller', 'a', ttl=15, clock=fake_clock.time)
+    standby = SqliteLease(path, 'poller', 'b', ttl=15, clock=fake_clock.time)
+    assert active.acquire()
+    assert not standby.acquire()
+    assert active.save({'timestamp': 1})
+    fake_clock.sleep(10)
+    assert active.acquire()
+    fake_clock.sleep(10)
+    assert not standby.acquire()
+    fake_clock.sleep(6)
+    assert standby.acquire()
+    assert standby.term == active.term + 1
+    assert standby.load() == {'timestamp': 1}
+    assert not active.acquire()
+    assert not active.save({'timestamp': 2})
+    standby.release()
+    assert active.acquire()
+
+
+def test_standby_resumes_without_gap_or_duplicates(
+        monkeypatch, caplog, homework_module, fake_clock):
+    caplog.set_level('CRITICAL', logger='homework')
+    homeworks = []
+    monkeypatch.setattr(
+        homework_module, 'get_api_answer',
+        lambda timestamp: {
+            'homeworks': list(homeworks), 'current_date': fake_clock.time()
+        }
+    )
+    sent = []
+
+    def sender(homework, message):
+        sent.append(message)
+        return True
+
+    store = {}
+    processes = []
+    for holder in ('active', 'standby'):
+        state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+        keeper = LeaseKeeper(
+            MemoryLease(store, 'poller', holder, 15, fake_clock.time),
+            on_acquire=lambda data, state=state: (
+                data and state.restore(data)
+            )
+        )
+        keeper.tick()
+        processes.append((state, keeper))
+    (active_state, active), (standby_state, standby) = processes
+    assert active.leading and not standby.leading
+
+    homeworks.append({'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'})
+    homework_module.lead_cycle(sender, active_state, active)
+    homework_module.lead_cycle(sender, standby_state, standby)
+    assert len(sent) == 1
+
+    homeworks.append({'id': 2, 'homework_name': 'hw2', 'status': 'approved'})
+    fake_clock.sleep(16)
+    assert not active.leading
+    standby.tick()
+    assert standby.leading and standby.takeovers == 1
+    homework_module.lead_cycle(sender, standby_state, standby)
+    homework_module.lead_cycle(sender, active_state, active)
+    assert len(sent) == 2
+    assert 'hw2' in sent[1]
+
+
+def test_lease_requires_storage_methods():
+    class Partial(Lease):
+        def grab(self, now, expires):
+            return 1
+
+    with pytest.raises(TypeError):
+        Partial('poller')
+
+
+def test_main_releases_lease_on_sigterm(monkeypatch, tmp_path,
+                                        homework_module):
+    class Transport:
+        def get(self, url, headers, params):
+            return Response(200, b'{"homeworks": [], "current_date": 5}')
+
+    path = str(tmp_path / 'lease.sqlite3')
+    for name in homework_module.NAMES:
+        monkeypatch.setattr(homework_module, name, '1234:abcdefg')
+    monkeypatch.setattr(homework_module, 'LEASE_PATH', path)
+    monkeypatch.setattr(homework_module, 'TRANSPORT', Transport())
+    monkeypatch.setattr(
+        LeaseKeeper, 'wait',
+        lambda self, timeout: os.kill(os.getpid(), signal.SIGTERM)
+    )
+    previous = signal.getsignal(signal.SIGTERM)
+    try:
+        with pytest.raises(SystemExit):
+            homework_module.main()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+    standby = SqliteLease(path, f'poller-{homework_module.TENANT_ID}', 'b')
+    assert standby.acquire()
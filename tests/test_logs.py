@@ -0,0 +1,118 @@
+import io
+import json
+import logging
+
+from logs import JsonFormatter, SamplingFilter, TextFormatter, create_handlers
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+def test_repeats_collapse_into_summary(fake_clock):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(TextFormatter('%(message)s'))
+    sampler = SamplingFilter(interval=60, clock=fake_clock.time)
+    handler.addFilter(sampler)
+    logger = make_logger('test_logs.repeats', handler)
+    for _ in range(5):
+        logger.error('Нет новых статусов')
+        fake_clock.sleep(10)
+    logger.error('Другая ошибка')
+    fake_clock.sleep(10)
+    logger.error('Нет новых статусов')
+    lines = stream.getvalue().splitlines()
+    assert lines == [
+        'Нет новых статусов',
+        'Другая ошибка',
+        'Нет новых статусов [ещё 4 похожих сообщений подавлено за 60 с]',
+    ]
+    assert sampler.suppressed == 4
+
+
+def test_burst_and_custom_key(fake_clock):
+    sampler = SamplingFilter(interval=60, burst=2, clock=fake_clock.time)
+    records = [
+        logging.LogRecord('x', logging.DEBUG, __file__, 1,
+                          'Запрос from_date=%d', (number,), None)
+        for number in range(4)
+    ]
+    for record in records:
+        record.log_key = 'request'
+    assert [sampler.filter(record) for record in records] == [
+        True, True, False, False
+    ]
+
+
+def test_prune_limits_tracked_keys(fake_clock):
+    sampler = SamplingFilter(interval=1, max_keys=3, clock=fake_clock.time)
+    for number in range(3):
+        sampler.filter(logging.makeLogRecord({'msg': f'm{number}'}))
+    fake_clock.sleep(2)
+    sampler.filter(logging.makeLogRecord({'msg': 'new'}))
+    assert len(sampler.windows) == 1
+
+
+def test_json_formatter_writes_one_line():
+    record = logging.makeLogRecord({
+        'msg': 'Сбой\nв две строки', 'levelname': 'ERROR', 'name': 'hw',
+        'suppressed': 3, 'suppressed_for': 12.5,
+    })
+    line = JsonFormatter().format(record)
+    assert '\n' not in line
+    entry = json.loads(line)
+    assert entry['message'] == 'Сбой\nв две строки'
+    assert entry['level'] == 'ERROR'
+    assert entry['suppressed'] == 3
+
+
+def test_handlers_sample_independently(tmp_path):
+    stream = io.StringIO()
+    path = tmp_path / 'bot.log'
+    handlers = create_handlers(str(path), stream, 'jsonl', interval=60)
+    logger = logging.getLogger('test_logs.handlers')
+    logger.handlers = handlers
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.error('Повтор')
+    logger.error('Повтор')
+    for handler in handlers:
+        handler.close()
+    assert len(stream.getvalue().splitlines()) == 1
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 1
+
+
+def test_api_log_sites_hide_token_and_collapse(monkeypatch, homework_module,
+                                               fake_clock):
+    from transport import Response
+
+    class Transport:
+        def get(self, url, headers, params):
+            return Response(500, b'')
+
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(TextFormatter('%(message)s'))
+    handler.addFilter(SamplingFilter(interval=60, clock=fake_clock.time))
+    logger = logging.getLogger('homework')
+    monkeypatch.setattr(logger, 'handlers', [handler])
+    monkeypatch.setattr(logger, 'propagate', False)
+    monkeypatch.setattr(logger, 'level', logging.DEBUG)
+    monkeypatch.setattr(homework_module, 'TRANSPORT', Transport())
+    state = homework_module.create_tenant_state(
+        dict(id='t1', token='secret', chat_id=1), fake_clock.time,
+        fake_clock.sleep
+    )
+    state.retrier.policies = ()
+    for _ in range(3):
+        homework_module.run_cycle(lambda homework, message: True, state)
+        state.timestamp += 600
+    output = stream.getvalue()
+    assert 'secret' not in output and 'OAuth ***' in output
+    assert output.count('Отправка запроса') == 1
+    assert output.count('HTTP response code 500') == 1
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from telebot.apihelper import ApiTelegramException
+
+from message_store import MessageStore
+
+
+class FakeBot:
+    def __init__(self, edit_error=None):
+        self.sent = []
+        self.edited = []
+        self.edit_error = edit_error
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+        return SimpleNamespace(message_id=len(self.sent))
+
+    def edit_message_text(self, text, chat_id, message_id):
+        if self.edit_error:
+            raise ApiTelegramException('editMessageText', None, {
+                'error_code': 400,
+                'description': f'Bad Request: {self.edit_error}',
+            })
+        self.edited.append((chat_id, message_id, text))
+
+
+def test_store_persists_message_ids(tmp_path):
+    path = tmp_path / 'messages.json'
+    MessageStore(str(path)).set('12345', 7, 42)
+    assert MessageStore(str(path)).get('12345', 7) == 42
+    assert MessageStore(str(path)).get('54321', 7) is None
+
+
+def test_edit_message_sends_once_then_edits(homework_module):
+    bot = FakeBot()
+    store = MessageStore()
+    homework = {'id': 7, 'homework_name': 'hw.zip'}
+    assert homework_module.edit_message(
+        bot, store, '12345', homework, 'first'
+    )
+    assert homework_module.edit_message(
+        bot, store, '12345', homework, 'second'
+    )
+    assert bot.sent == [('12345', 'first')]
+    assert bot.edited == [('12345', 1, 'second')]
+
+
+def test_deleted_message_is_replaced(homework_module):
+    store = MessageStore()
+    store.set('12345', 7, 3)
+    homework = {'id': 7, 'homework_name': 'hw.zip'}
+    bot = FakeBot('message to edit not found')
+    assert homework_module.edit_message(
+        bot, store, '12345', homework, 'new'
+    )
+    assert bot.sent == [('12345', 'new')]
+    assert store.get('12345', 7) == 1
+    bot = FakeBot('chat not found')
+    assert not homework_module.edit_message(
+        bot, store, '12345', homework, 'lost'
+    )
+    assert bot.sent == []
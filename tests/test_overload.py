@@ -0,0 +1,84 @@
+import logging
+from functools import partial
+
+from overload import ACTIVE, DAY, IDLE, NORMAL, LoadShedder, classify
+
+NOW = 1700000000
+
+
+def work(status, updated=NOW):
+    return {'status': status, 'date_updated': updated}
+
+
+def test_classify_tenants():
+    assert classify([], None, NOW) == ACTIVE
+    assert classify([work('approved'), work('reviewing')], NOW, NOW) == ACTIVE
+    assert classify([work('rejected')], NOW, NOW) == NORMAL
+    assert classify([work('approved')], NOW, NOW) == NORMAL
+    assert classify([work('approved', NOW - 8 * DAY)], NOW, NOW) == IDLE
+    assert classify([], NOW, NOW) == IDLE
+    for updated in ('вчера', None, ['2023-11-14']):
+        assert classify([work('approved', updated)], NOW, NOW) == NORMAL
+
+
+def test_overload_stretches_and_recovers(caplog):
+    shedder = LoadShedder(600, smoothing=1.0)
+    with caplog.at_level(logging.INFO, logger='overload'):
+        assert shedder.observe(900) == 2
+        assert shedder.observe(300, lag=1200) == 4
+        assert shedder.observe(500) == 4
+        assert shedder.observe(100) == 2
+    assert 'Перегрузка' in caplog.text
+    stats = shedder.stats()
+    assert (stats['overloaded'], stats['changes'], stats['stretch']) == (
+        2, 3, 2
+    )
+    assert shedder.observe(100) == 1
+
+
+def test_shedding_skips_low_priority_tenants(fake_clock):
+    shedder = LoadShedder(600, smoothing=1.0, clock=fake_clock.time)
+    for _ in range(3):
+        shedder.observe(1200)
+    assert shedder.stretch == 8
+    polled = {ACTIVE: 0, NORMAL: 0, IDLE: 0}
+    for _ in range(16):
+        for priority in polled:
+            polled[priority] += shedder.due(priority, priority)
+        fake_clock.sleep(600)
+    assert polled == {ACTIVE: 16, NORMAL: 4, IDLE: 2}
+    assert shedder.stats()['skipped_by_priority'] == {NORMAL: 12, IDLE: 14}
+
+
+def test_failure_notifications_deferred_under_overload():
+    sent = []
+    shedder = LoadShedder(600, smoothing=1.0)
+    send = shedder.wrap_sender(lambda homework, message: sent.append(message))
+    shedder.observe(1200)
+    assert send(None, 'сбой') is False
+    send({'id': 1}, 'статус')
+    shedder.observe(0)
+    send(None, 'сбой')
+    assert sent == ['статус', 'сбой']
+    assert shedder.stats()['deferred'] == 1
+
+
+def test_main_loop_stretches_idle_tenant(homework_module, fake_clock):
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    shedder = LoadShedder(homework_module.RETRY_PERIOD, smoothing=1.0)
+    pace = partial(
+        homework_module.next_period, None, shedder, state, lambda: 0.0
+    )
+    assert pace(1) == homework_module.RETRY_PERIOD
+    state.remember([work('approved', fake_clock.time() - 30 * DAY)])
+    assert pace(2 * homework_module.RETRY_PERIOD) == (
+        2 * homework_module.RETRY_PERIOD
+    )
+    state.remember([work('approved', 'вчера') | {'id': 3}])
+    assert pace(2 * homework_module.RETRY_PERIOD) == (
+        2 * homework_module.RETRY_PERIOD
+    )
+    state.remember([work('reviewing') | {'id': 2}])
+    assert pace(2 * homework_module.RETRY_PERIOD) == (
+        homework_module.RETRY_PERIOD
+    )
@@ -0,0 +1,69 @@
+import io
+import json
+
+import pytest
+
+from benchmarks import perf
+
+
+def result(relative):
+    return dict(samples=relative, relative=relative, mean=relative[0], ci=0)
+
+
+def baseline(**scenarios):
+    return dict(
+        version=perf.FORMAT_VERSION, revision='abc',
+        scenarios={name: result(values) for name, values in scenarios.items()}
+    )
+
+
+STEADY = [1.0, 1.02, 0.98, 1.01, 0.99]
+
+
+def test_compare_separates_changes_from_noise():
+    slower = [value * 1.5 for value in STEADY]
+    faster = [value * 0.5 for value in STEADY]
+    noisy = [0.5, 2.5, 0.6, 2.4, 1.5]
+    assert perf.compare(result(STEADY), result(STEADY), 0.1)[2] == perf.NOISE
+    change, _, verdict = perf.compare(result(STEADY), result(slower), 0.1)
+    assert verdict == perf.REGRESSION and change == pytest.approx(0.5)
+    assert perf.compare(
+        result(STEADY), result(faster), 0.1
+    )[2] == perf.IMPROVEMENT
+    assert perf.compare(result(STEADY), result(noisy), 0.1)[2] == perf.NOISE
+    assert perf.compare(result(STEADY), result(slower), 0.6)[2] == perf.NOISE
+
+
+def test_compare_command_exits_non_zero_on_regression(tmp_path, capsys):
+    base = perf.save(baseline(a=STEADY, b=STEADY), str(tmp_path / 'b.json'))
+    current = perf.save(baseline(
+        a=[value * 1.3 for value in STEADY], b=STEADY, c=STEADY
+    ), str(tmp_path / 'c.json'))
+    assert perf.main(['compare', base, '--current', current]) == 1
+    output = capsys.readouterr().out
+    assert perf.REGRESSION in output and 'новый' in output
+    assert perf.main(['compare', base, '--current', base]) == 0
+
+
+def test_report_lists_every_scenario():
+    out = io.StringIO()
+    regressions = perf.report(
+        baseline(a=STEADY, b=STEADY),
+        baseline(a=STEADY, b=[value * 2 for value in STEADY]), 0.2, out
+    )
+    assert regressions == ['b']
+    lines = out.getvalue().splitlines()
+    assert [line.split()[0] for line in lines[1:3]] == ['a', 'b']
+    assert lines[-1].startswith('Регрессий: 1')
+
+
+def test_baseline_format_version_is_checked(tmp_path):
+    path = tmp_path / 'old.json'
+    path.write_text(json.dumps(dict(version=0, scenarios={})))
+    with pytest.raises(ValueError):
+        perf.load(str(path))
+
+
+def test_committed_baseline_covers_pipeline():
+    scenarios = perf.load('default')['scenarios']
+    assert set(perf.scenarios()) <= set(scenarios)
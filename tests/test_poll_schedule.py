@@ -0,0 +1,67 @@
+import pytest
+
+from poll_schedule import (
+    DAY, HOUR, HazardModel, PollSchedule, Scheduler, hour_of_week
+)
+
+MONDAY = 1699833600
+
+
+def busy_model():
+    return HazardModel.fit(
+        MONDAY + week * 7 * DAY + day * DAY + hour * HOUR + 60
+        for week in range(4) for day in range(5) for hour in range(9, 18)
+        for _ in range(5)
+    )
+
+
+def test_hour_of_week_starts_on_monday():
+    assert hour_of_week(MONDAY) == 0
+    assert hour_of_week(MONDAY + 6 * DAY + 23 * HOUR) == 167
+
+
+def test_budget_goes_to_busy_hours():
+    schedule = PollSchedule(busy_model(), budget=48)
+    for day in range(7):
+        assert sum(schedule.polls[day * 24:(day + 1) * 24]) == pytest.approx(
+            48
+        )
+    busy = schedule.interval(MONDAY + 10 * HOUR)
+    assert busy * 3 < schedule.interval(MONDAY + 4 * HOUR)
+    assert schedule.interval(MONDAY + 5 * DAY + 10 * HOUR) == pytest.approx(
+        DAY / 48
+    )
+
+
+def test_capped_hours_pass_budget_to_others():
+    schedule = PollSchedule(busy_model(), budget=100, min_interval=600)
+    monday = schedule.polls[:24]
+    assert sum(monday) == pytest.approx(100)
+    assert max(monday) == pytest.approx(6)
+    assert monday[9:18] == pytest.approx([6] * 9)
+    saturated = PollSchedule(busy_model(), budget=500, min_interval=600)
+    assert saturated.polls == pytest.approx([6] * 168)
+
+
+def test_delay_spans_hour_boundary():
+    schedule = PollSchedule(busy_model(), budget=48)
+    night = MONDAY + 8 * HOUR + 50 * 60
+    delay = schedule.delay(night)
+    assert 10 * 60 < delay < 10 * 60 + schedule.interval(MONDAY + 9 * HOUR)
+
+
+def test_scheduler_refits_daily(fake_clock):
+    calls = []
+
+    class History:
+        def transition_times(self, project, since):
+            calls.append((project, since))
+            return []
+
+    fake_clock.now = MONDAY
+    scheduler = Scheduler(History(), 24, 'bot', clock=fake_clock.time)
+    assert scheduler.delay() == pytest.approx(HOUR)
+    scheduler.delay()
+    fake_clock.sleep(DAY)
+    scheduler.delay()
+    assert [project for project, since in calls] == ['bot', 'bot']
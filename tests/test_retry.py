@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+
+from exceptions import DenialOfService, StatusCodeException
+from retry import NO_RETRY, Retrier, policy_for
+
+
+def flaky(errors):
+    errors = list(errors)
+
+    def func():
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+    return func
+
+
+def make_retrier():
+    sleeps = []
+    retrier = Retrier(
+        600, sleep=sleeps.append, clock=lambda: sum(sleeps), rng=lambda: 0
+    )
+    return retrier, sleeps
+
+
+def test_policy_table():
+    assert policy_for(StatusCodeException('', 503)).attempts > 1
+    assert policy_for(StatusCodeException('', 401)) == NO_RETRY
+    assert policy_for(DenialOfService('')) == NO_RETRY
+    assert policy_for(KeyError('homeworks')) == NO_RETRY
+    assert policy_for(ConnectionError('')).attempts > 1
+
+
+def test_transient_error_recovers_in_cycle():
+    retrier, sleeps = make_retrier()
+    func = flaky([ConnectionError('blip'), StatusCodeException('', 502)])
+    assert retrier.call(func) == 'ok'
+    assert sleeps == [1, 4]
+    stats = retrier.stats()
+    assert stats['retries'] == 2
+    assert stats['latency_saved'] == 595
+    assert stats['retries_by_error'] == {
+        'ConnectionError': 1, 'StatusCodeException': 1
+    }
+
+
+def test_permanent_error_is_not_retried():
+    retrier, sleeps = make_retrier()
+    with pytest.raises(StatusCodeException):
+        retrier.call(flaky([StatusCodeException('', 401)]))
+    assert sleeps == []
+    assert retrier.stats()['failed'] == 1
+
+
+def test_stats_are_reported_once_per_interval(caplog):
+    sleeps = []
+    retrier = Retrier(
+        600, sleep=sleeps.append, clock=lambda: sum(sleeps), rng=lambda: 0,
+        report_interval=2
+    )
+    with caplog.at_level(logging.INFO, logger='retry'):
+        for _ in range(3):
+            retrier.call(flaky([ConnectionError('blip')]))
+    reports = [
+        record.message for record in caplog.records
+        if record.message.startswith('Повторы запросов')
+    ]
+    assert reports == [
+        'Повторы запросов: вызовов 2, повторов 2, восстановлено 2, сбоев 0, '
+        "уведомления ускорены на 1198 с, по ошибкам {'ConnectionError': 2}"
+    ]
@@ -0,0 +1,131 @@
+import os
+import time
+
+from journal import Journal
+from latency import bucket, bucket_bound, format_seconds
+from overload import LoadShedder
+from shard import HashRing, Supervisor
+from transport import Response
+
+
+def test_ring_moves_few_tenants_on_resize():
+    keys = [f'tenant{number}' for number in range(3000)]
+    ring = HashRing(range(4))
+    before = {key: ring.node_for(key) for key in keys}
+    shards = ring.assign(keys)
+    assert all(600 < len(shards[node]) < 900 for node in range(4))
+    ring.add(4)
+    after = {key: ring.node_for(key) for key in keys}
+    moved = [key for key in keys if before[key] != after[key]]
+    assert all(after[key] == 4 for key in moved)
+    assert 400 < len(moved) < 800
+    ring.remove(4)
+    assert {key: ring.node_for(key) for key in keys} == before
+
+
+def crashing_worker(node, tenants, control, metrics):
+    flag = tenants[0]['flag'] if tenants else None
+    if flag and not os.path.exists(flag):
+        open(flag, 'w').close()
+        os._exit(3)
+    metrics.put(dict(node=node, tenants=len(tenants), cycles=1))
+    tenants = control.get()
+    while tenants is not None:
+        metrics.put(dict(node=node, tenants=len(tenants), cycles=2))
+        tenants = control.get()
+
+
+def wait_for(condition, timeout=1.5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_supervisor_restarts_crashed_worker(tmp_path):
+    tenants = [
+        dict(id=number, flag=str(tmp_path / f'crash{number}'))
+        for number in range(2)
+    ]
+    supervisor = Supervisor(
+        crashing_worker, tenants, 1, key=lambda tenant: tenant['id']
+    ).start()
+    try:
+        assert wait_for(lambda: (
+            supervisor.poll() or supervisor.stats()['cycles'] == 1
+        ))
+        stats = supervisor.stats()
+        assert stats['restarts'] == 1
+        assert stats['tenants'] == 2
+        supervisor.resize(2)
+        assert wait_for(lambda: (
+            supervisor.poll() or len(supervisor.metrics) == 2
+            and supervisor.stats()['tenants'] == 2
+        ))
+    finally:
+        supervisor.stop()
+
+
+def latency_worker(node, tenants, control, metrics):
+    delay = 60 if node == 0 else 3600
+    metrics.put(dict(
+        node=node, latency={bucket(delay): 9 - 8 * node}, retries=2,
+        recovered=1
+    ))
+    control.get()
+
+
+def test_supervisor_merges_worker_latency_and_retries():
+    supervisor = Supervisor(latency_worker, [], 2).start()
+    try:
+        assert wait_for(lambda: len(supervisor.stats()['per_worker']) == 2)
+        stats = supervisor.stats()
+        assert sum(stats['latency'].values()) == 10
+        assert (stats['retries'], stats['recovered']) == (4, 2)
+        assert (stats['latency_p50'], stats['latency_p95']) == tuple(
+            format_seconds(bucket_bound(bucket(delay)))
+            for delay in (60, 3600)
+        )
+    finally:
+        supervisor.stop()
+
+
+def test_tenant_state_uses_tenant_token(monkeypatch, homework_module,
+                                        fake_clock, tmp_path):
+    calls = []
+
+    class Transport:
+        def get(self, url, headers, params):
+            calls.append(headers['Authorization'])
+            return Response(200, b'{"homeworks": [], "current_date": 5}')
+
+    monkeypatch.setattr(homework_module, 'TRANSPORT', Transport())
+    journal = Journal(str(tmp_path / 'shard-0'))
+    state = homework_module.create_tenant_state(
+        dict(id='t1', token='secret', chat_id=1), fake_clock.time,
+        fake_clock.sleep, journal=journal
+    )
+    homework_module.run_cycle(lambda homework, message: True, state)
+    assert calls == ['OAuth secret']
+    assert [entry.tenant for entry in journal.entries()] == ['t1']
+    journal.close()
+    assert state.cycles == 1 and not state.old_status
+
+
+def test_supervise_rejects_single_tenant_settings(monkeypatch, caplog,
+                                                  homework_module):
+    monkeypatch.setattr(homework_module, 'EDIT_IN_PLACE', True)
+    monkeypatch.setattr(homework_module, 'POLL_BUDGET', 96)
+    monkeypatch.setattr(homework_module, 'SHARD_TENANTS', '/nonexistent')
+    with caplog.at_level('CRITICAL', logger='homework'):
+        homework_module.supervise()
+    assert 'TG_EDIT_IN_PLACE, YP_POLL_BUDGET' in caplog.text
+
+
+def test_rebalance_forgets_moved_tenants(homework_module):
+    shedder = LoadShedder(600)
+    shedder.polled.update({1: 0.0, 2: 0.0})
+    homework_module.forget_moved(
+        shedder, {1: 'worker', 2: 'worker'}, [dict(id=2)]
+    )
+    assert list(shedder.polled) == [2]
@@ -0,0 +1,91 @@
+from snapshots import (
+    ADDED, COMMENT_CHANGED, STATUS_CHANGED, UPDATED, SnapshotDiffer
+)
+
+
+def homework(status='reviewing', comment='', lesson='Спринт 1', id=1):
+    return {
+        'id': id,
+        'homework_name': f'hw{id}.zip',
+        'status': status,
+        'reviewer_comment': comment,
+        'lesson_name': lesson,
+    }
+
+
+def accept_all(differ, homeworks):
+    changes = differ.diff(homeworks)
+    for change in changes:
+        differ.accept(change)
+    return [change.kind for change in changes]
+
+
+def test_typed_diff():
+    differ = SnapshotDiffer()
+    assert accept_all(differ, [homework(), homework(id=2)]) == [ADDED, ADDED]
+    assert accept_all(differ, [homework(), homework(id=2)]) == []
+    assert accept_all(differ, [
+        homework(status='approved'),
+        homework(id=2, comment='Поправь'),
+    ]) == [STATUS_CHANGED, COMMENT_CHANGED]
+    assert accept_all(differ, [
+        homework(status='approved', lesson='Спринт 2'),
+    ]) == [UPDATED]
+
+
+def test_homework_outside_window_is_not_removed():
+    differ = SnapshotDiffer()
+    accept_all(differ, [homework(), homework(id=2)])
+    assert accept_all(differ, [homework(id=2, comment='Поправь')]) == [
+        COMMENT_CHANGED
+    ]
+    assert accept_all(differ, [homework(comment='Поправь')]) == [
+        COMMENT_CHANGED
+    ]
+
+
+def test_unaccepted_change_is_reported_again():
+    differ = SnapshotDiffer()
+    assert [change.kind for change in differ.diff([homework()])] == [ADDED]
+    assert [change.kind for change in differ.diff([homework()])] == [ADDED]
+
+
+def test_main_notifies_once_per_change(homework_module):
+    sent = []
+
+    def sender(homework, message):
+        sent.append(message)
+        return True
+
+    differ = SnapshotDiffer()
+    for status in ('reviewing', 'reviewing', 'approved'):
+        homework_module.notify_changes(
+            sender, differ, [homework(status=status)]
+        )
+    assert len(sent) == 2
+    assert sent[-1].endswith(homework_module.HOMEWORK_VERDICTS['approved'])
+
+
+def test_malformed_records_do_not_block_valid_ones(homework_module, workload,
+                                                    fake_clock, caplog):
+    caplog.set_level('CRITICAL')
+    response = workload(homeworks=50, malformed_rate=0.3).payload(
+        0, current_date=int(fake_clock.time())
+    )
+    valid = [
+        homework for homework in response['homeworks']
+        if isinstance(homework, dict) and 'homework_name' in homework
+        and homework.get('status') in homework_module.HOMEWORK_VERDICTS
+    ]
+    assert 0 < len(valid) < 50
+    assert any(
+        not isinstance(homework, dict) for homework in response['homeworks']
+    )
+    sent = []
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    state.fetch = lambda timestamp: response
+    homework_module.run_cycle(
+        lambda homework, message: sent.append(message) or True, state
+    )
+    assert len(sent) == len(valid)
+    assert not state.old_status
@@ -0,0 +1,138 @@
+import pytest
+
+from state_image import StateImage, open_image, write_image
+from watermark import WatermarkStore
+
+
+def tenant(number):
+    return {'id': f't{number}', 'token': 'token', 'chat_id': number}
+
+
+def homework(status='reviewing', number=1):
+    return {'id': number, 'homework_name': f'hw{number}.zip', 'status': status}
+
+
+def polled_state(homework_module, fake_clock, number, works):
+    state = homework_module.create_tenant_state(
+        tenant(number), fake_clock.time, fake_clock.sleep
+    )
+    state.fetch = lambda timestamp: {
+        'homeworks': works, 'current_date': int(fake_clock.time())
+    }
+    homework_module.run_cycle(lambda homework, message: True, state)
+    return state
+
+
+def test_image_round_trip_is_lazy(tmp_path, homework_module, fake_clock):
+    states = {
+        f't{number}': polled_state(
+            homework_module, fake_clock, number,
+            [homework(number=number), homework('approved', number + 100)]
+        )
+        for number in range(50)
+    }
+    states['t7'].old_status = 'сбой'
+    path = str(tmp_path / 'shard-0.img')
+    write_image(path, states, lambda state: 'active')
+    image = StateImage(path)
+    assert len(image) == 50 and 't49' in image and 't50' not in image
+
+    restored = homework_module.create_tenant_state(
+        tenant(7), fake_clock.time, image=image
+    )
+    assert restored.cold is not None and restored.differ.items == {}
+    assert (restored.timestamp, restored.old_status, restored.cycles) == (
+        states['t7'].timestamp, 'сбой', 1
+    )
+    assert homework_module.tenant_priority(restored) == 'active'
+    assert restored.cold is not None
+    assert restored.homeworks == states['t7'].homeworks
+    assert restored.cold is None
+    assert restored.differ.items == states['t7'].differ.items
+
+
+def test_unwarmed_state_is_copied_to_next_image(tmp_path, homework_module,
+                                                fake_clock):
+    first = str(tmp_path / 'first.img')
+    state = polled_state(homework_module, fake_clock, 1, [homework()])
+    write_image(first, {'t1': state})
+    restored = homework_module.create_tenant_state(
+        tenant(1), fake_clock.time, image=StateImage(first)
+    )
+    second = str(tmp_path / 'second.img')
+    write_image(second, {'t1': restored})
+    assert restored.cold is not None
+    assert StateImage(second).read('t1')['cold'].load()[0] == (
+        state.differ.items
+    )
+
+
+def test_warm_restart_sends_no_duplicates(tmp_path, homework_module,
+                                          fake_clock):
+    sent = []
+    state = polled_state(homework_module, fake_clock, 1, [homework()])
+    path = str(tmp_path / 'shard-0.img')
+    write_image(path, {'t1': state})
+    restarted = homework_module.create_tenant_state(
+        tenant(1), fake_clock.time, image=open_image(path)
+    )
+    restarted.fetch = state.fetch
+    homework_module.run_cycle(
+        lambda homework, message: sent.append(message) or True, restarted
+    )
+    assert sent == []
+    restarted.fetch = lambda timestamp: {
+        'homeworks': [homework('approved')], 'current_date': 0
+    }
+    homework_module.run_cycle(
+        lambda homework, message: sent.append(message) or True, restarted
+    )
+    assert len(sent) == 1
+
+
+def test_broken_or_missing_image_falls_back(tmp_path):
+    assert open_image(str(tmp_path / 'missing.img')) is None
+    broken = tmp_path / 'broken.img'
+    broken.write_bytes(b'not an image at all')
+    assert open_image(str(broken)) is None
+    broken.write_bytes(b'')
+    with pytest.raises(ValueError):
+        StateImage(str(broken))
+
+
+def test_newer_watermark_wins_over_image(tmp_path, homework_module,
+                                         fake_clock):
+    store = WatermarkStore(
+        str(tmp_path / 'watermarks.sqlite3'), clock=fake_clock.time
+    )
+    sent = []
+
+    def sender(homework, message):
+        sent.append(message)
+        return True
+
+    state = homework_module.create_tenant_state(
+        tenant(1), fake_clock.time, watermarks=store
+    )
+    state.fetch = lambda timestamp: {
+        'homeworks': [homework()], 'current_date': int(fake_clock.time())
+    }
+    homework_module.run_cycle(sender, state)
+    path = str(tmp_path / 'shard-0.img')
+    write_image(path, {'t1': state}, clock=fake_clock.time)
+    fake_clock.sleep(600)
+    state.fetch = lambda timestamp: {
+        'homeworks': [homework('approved')],
+        'current_date': int(fake_clock.time()),
+    }
+    homework_module.run_cycle(sender, state)
+
+    image = open_image(path, store.saved_after)
+    assert image.stale == {'t1'}
+    restarted = homework_module.create_tenant_state(
+        tenant(1), fake_clock.time, watermarks=store, image=image
+    )
+    assert restarted.cold is None
+    restarted.fetch = state.fetch
+    homework_module.run_cycle(sender, restarted)
+    assert len(sent) == 2
@@ -0,0 +1,61 @@
+import pytest
+
+from templates import MARKDOWN, PLAIN, Templates, escape_markdown
+
+
+def test_plain_ru_matches_previous_messages():
+    messages = Templates().renderer('ru', PLAIN)
+    assert messages.parse_mode is None
+    assert messages.status('hw_1.zip', 'approved') == (
+        'Изменился статус проверки работы "hw_1.zip".\n'
+        'Работа проверена: ревьюеру всё понравилось. Ура!'
+    )
+    assert messages.comment('hw_1.zip', 'Поправь тесты') == (
+        'Обновлён комментарий ревьюера к работе "hw_1.zip":\nПоправь тесты'
+    )
+    assert messages.failure('timeout') == 'Сбой в работе программы: timeout.'
+
+
+def test_markdown_escapes_template_and_values():
+    messages = Templates().renderer('en', MARKDOWN)
+    assert messages.parse_mode == 'MarkdownV2'
+    assert messages.status('hw_1.zip', 'reviewing') == (
+        'Review status of "hw\\_1\\.zip" has changed\\.\n'
+        'The reviewer has started reviewing your work\\.'
+    )
+    assert escape_markdown('a*b[c](d)!') == 'a\\*b\\[c\\]\\(d\\)\\!'
+
+
+def test_status_messages_are_cached():
+    templates = Templates(cache_size=2)
+    messages = templates.renderer('ru', PLAIN)
+    for _ in range(3):
+        messages.status('hw_1.zip', 'approved')
+    templates.renderer('en', PLAIN).status('hw_1.zip', 'approved')
+    info = templates.status.cache_info()
+    assert (info.hits, info.misses, info.maxsize) == (2, 2, 2)
+
+
+def test_unknown_locale_and_format_are_rejected():
+    with pytest.raises(ValueError):
+        Templates().renderer('de', PLAIN)
+    with pytest.raises(ValueError):
+        Templates().renderer('ru', 'html')
+
+
+def test_tenant_state_renders_in_tenant_locale(homework_module):
+    state = homework_module.create_tenant_state(
+        dict(id='t1', token='x', chat_id=1, locale='en')
+    )
+    sent = []
+    state.fetch = lambda timestamp: {
+        'homeworks': [{'homework_name': 'hw.zip', 'status': 'rejected'}],
+        'current_date': timestamp,
+    }
+    homework_module.run_cycle(
+        lambda homework, message: sent.append(message) or True, state
+    )
+    assert sent == [
+        'Review status of "hw.zip" has changed.\n'
+        'Reviewed: the reviewer left some remarks.'
+    ]
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import time
+
+import pytest
+import requests
+
+from benchmarks.fake_server import FakeServer
+from exceptions import TransportError
+from transport import AsyncTransport, create_transport
+
+
+def test_async_transport_multiplexes_requests():
+    def handler(path, query, headers):
+        body = {'homeworks': [], 'current_date': int(query['from_date'])}
+        return 200, json.dumps(body).encode()
+
+    with FakeServer(handler=handler) as server:
+        transport = AsyncTransport(connections=2)
+        responses = transport.get_many([
+            dict(url=server.url, params={'from_date': number})
+            for number in range(50)
+        ])
+        single = transport.get(server.url, params={'from_date': 7})
+        transport.close()
+
+    assert [response.json()['current_date'] for response in responses] == (
+        list(range(50))
+    )
+    assert single.json()['current_date'] == 7
+    assert server.connections_total == 2
+
+
+def test_get_api_answer_with_async_transport(monkeypatch, homework_module):
+    with FakeServer() as server:
+        transport = AsyncTransport()
+        monkeypatch.setattr(homework_module, 'ENDPOINT', server.url)
+        monkeypatch.setattr(homework_module, 'TRANSPORT', transport)
+        assert homework_module.get_api_answer(0) == {
+            'homeworks': [], 'current_date': 0
+        }
+        transport.close()
+
+
+def test_requests_transport_passes_timeout(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        requests, 'get', lambda url, **kwargs: calls.append(kwargs)
+    )
+    create_transport('requests', timeout=5).get('http://example.com')
+    assert calls[0]['timeout'] == 5
+
+
+def test_async_transport_bounds_connection_setup(monkeypatch):
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(asyncio, 'open_connection', hang)
+    transport = AsyncTransport(timeout=0.05)
+    started = time.monotonic()
+    with pytest.raises(TransportError):
+        transport.get('http://10.255.255.1/api')
+    assert time.monotonic() - started < 0.5
+    transport.close()
+
+
+def test_shard_round_prefetches_with_async_transport(monkeypatch,
+                                                     homework_module):
+    tokens = []
+
+    def handler(path, query, headers):
+        tokens.append(headers.get('authorization'))
+        body = {'homeworks': [], 'current_date': int(query['from_date'])}
+        return 200, json.dumps(body).encode()
+
+    tenants = {
+        f't{number}': {'id': f't{number}', 'token': str(number)}
+        for number in range(5)
+    }
+    with FakeServer(handler=handler) as server:
+        transport = AsyncTransport()
+        monkeypatch.setattr(homework_module, 'ENDPOINT', server.url)
+        monkeypatch.setattr(homework_module, 'TRANSPORT', transport)
+        states = [
+            homework_module.create_tenant_state(tenant)
+            for tenant in tenants.values()
+        ]
+        homework_module.prefetch_answers(tenants, states)
+        assert len(tokens) == 5
+        monkeypatch.setattr(transport, 'get', None)
+        for state in states:
+            homework_module.run_cycle(lambda homework, message: True, state)
+        transport.close()
+    assert homework_module.PREFETCHED == {}
+    assert sorted(tokens) == [f'OAuth {number}' for number in range(5)]
+    assert all(state.old_status == '' for state in states)
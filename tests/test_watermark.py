@@ -0,0 +1,110 @@
+from watermark import WatermarkStore, advance
+
+
+def homework(status='reviewing', updated='2023-11-14T22:00:00Z'):
+    return {
+        'id': 1, 'homework_name': 'hw.zip', 'status': status,
+        'date_updated': updated,
+    }
+
+
+def test_advance_moves_to_current_date_with_overlap():
+    assert advance(1000, 5000, overlap=300) == 4700
+    assert advance(1000, 1100, overlap=300) == 1000
+    assert advance(1000, None, overlap=300) == 1000
+
+
+def test_advance_holds_at_undelivered_homework():
+    pending = [homework(updated=3000), homework(updated=4000)]
+    assert advance(1000, 5000, pending, overlap=300) == 2700
+    assert advance(1000, 5000, [homework(updated=None)]) == 1000
+
+
+def test_store_round_trip_skips_unchanged(tmp_path):
+    path = str(tmp_path / 'watermarks.sqlite3')
+    store = WatermarkStore(path)
+    assert store.load('t1') is None
+    store.save('t1', {'timestamp': 10})
+    store.save('t1', {'timestamp': 10})
+    assert store.saved == {'t1': '{"timestamp": 10}'}
+    assert WatermarkStore(path).load('t1') == {'timestamp': 10}
+
+
+def test_idle_cycles_advance_watermark(monkeypatch, homework_module,
+                                       fake_clock):
+    requested = []
+
+    def get_api_answer(timestamp):
+        requested.append(timestamp)
+        return {'homeworks': [], 'current_date': int(fake_clock.time())}
+
+    monkeypatch.setattr(homework_module, 'get_api_answer', get_api_answer)
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    for _ in range(3):
+        fake_clock.sleep(homework_module.RETRY_PERIOD)
+        homework_module.run_cycle(lambda homework, message: True, state)
+    overlap = homework_module.WATERMARK_OVERLAP
+    assert state.timestamp == fake_clock.time() - overlap
+    assert requested[-1] == fake_clock.time() - 600 - overlap
+
+
+def test_restart_resumes_without_duplicates(tmp_path, monkeypatch,
+                                            homework_module, fake_clock):
+    store = WatermarkStore(str(tmp_path / 'watermarks.sqlite3'))
+    monkeypatch.setattr(homework_module, 'WATERMARKS', store)
+    work = homework(updated=int(fake_clock.time()) + 1000)
+    sent = []
+    outcome = [False]
+
+    def get_api_answer(timestamp):
+        return {
+            'homeworks': [work] if work['date_updated'] >= timestamp else [],
+            'current_date': int(fake_clock.time()),
+        }
+
+    def sender(homework, message):
+        sent.append(message)
+        return outcome[0]
+
+    monkeypatch.setattr(homework_module, 'get_api_answer', get_api_answer)
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    fake_clock.sleep(3600)
+    homework_module.run_cycle(sender, state)
+    assert state.timestamp == work['date_updated'] - 300
+
+    outcome[0] = True
+    restarted = homework_module.create_state(
+        fake_clock.time, fake_clock.sleep
+    )
+    assert restarted.timestamp == state.timestamp
+    homework_module.run_cycle(sender, restarted)
+    homework_module.run_cycle(
+        sender, homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    )
+    assert len(sent) == 2
+
+
+def test_malformed_homework_does_not_block_others(monkeypatch,
+                                                  homework_module,
+                                                  fake_clock):
+    weird = dict(homework('weird'), id=2)
+    sent = []
+
+    def get_api_answer(timestamp):
+        return {
+            'homeworks': [weird, homework('approved')],
+            'current_date': int(fake_clock.time()),
+        }
+
+    def sender(homework, message):
+        sent.append(message)
+        return True
+
+    monkeypatch.setattr(homework_module, 'get_api_answer', get_api_answer)
+    state = homework_module.create_state(fake_clock.time, fake_clock.sleep)
+    start = state.timestamp
+    for _ in range(3):
+        fake_clock.sleep(homework_module.RETRY_PERIOD)
+        homework_module.run_cycle(sender, state)
+    assert sent == [homework_module.parse_status(homework('approved'))]
+    assert state.timestamp > start
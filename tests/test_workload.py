@@ -0,0 +1,41 @@
+import pytest
+
+
+def test_payloads_are_deterministic(workload):
+    first = workload(tenants=3, homeworks=5).payload(2)
+    again = workload(tenants=1000, homeworks=5).payload(2)
+    assert first == again
+    assert workload(seed=1, homeworks=5).payload(2) != first
+
+
+def test_valid_payloads_pass_pipeline(workload, homework_module):
+    for tenant, payload in workload(tenants=20, homeworks=30).payloads():
+        for homework in homework_module.check_response(payload):
+            assert homework_module.parse_status(homework)
+
+
+def test_malformed_rate(workload, homework_module):
+    payload = workload(homeworks=2000, malformed_rate=0.1).payload(0)
+    failures = 0
+    for homework in homework_module.check_response(payload):
+        try:
+            homework_module.parse_status(homework)
+        except (KeyError, ValueError, TypeError):
+            failures += 1
+    assert 100 < failures < 300
+
+
+def test_timeline_ends_with_approval(workload):
+    events = workload(homeworks=4).timeline(0)
+    moments = [moment for moment, homework in events]
+    assert moments == sorted(moments)
+    final = {}
+    for moment, homework in events:
+        final[homework['id']] = homework['status']
+    assert set(final.values()) == {'approved'}
+
+
+@pytest.mark.parametrize('comment_length', [0, 1000])
+def test_response_size(workload, comment_length):
+    payload = workload(homeworks=10, comment_length=comment_length)
+    assert (len(payload.payload_bytes(0)) > 10000) == bool(comment_length)
@@ -0,0 +1,304 @@
+import asyncio
+import ssl
+import threading
+from collections import deque
+from urllib.parse import urlencode, urlsplit
+
+import requests
+
+from decoders import get_decoder
+from exceptions import TransportError
+
+CONNECTION_CLOSED = 'Соединение закрыто сервером: {}'
+BAD_STATUS_LINE = 'Некорректная строка статуса ответа: {!r}'
+REQUEST_TIMEOUT = 'Превышено время ожидания ответа {} сек.: {}'
+UNKNOWN_TRANSPORT = 'Неизвестный транспорт: {}. Доступные: {}'
+
+
+class Response:
+    """Ответ HTTP-сервера с телом в виде байтов."""
+
+    def __init__(self, status_code, content, headers=None):
+        """Сохраняет код ответа, тело и заголовки."""
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def json(self):
+        """Декодирует тело ответа из JSON."""
+        return get_decoder()(self.content)
+
+
+class RequestsTransport:
+    """Блокирующий транспорт на основе requests, используется по умолчанию."""
+
+    def __init__(self, timeout=30):
+        """Задаёт время ожидания соединения и ответа в секундах."""
+        self.timeout = timeout
+
+    def get(self, url, headers=None, params=None):
+        """Выполняет GET-запрос и возвращает ответ requests."""
+        return requests.get(
+            url, headers=headers, params=params, timeout=self.timeout
+        )
+
+    def close(self):
+        """Транспорт не держит ресурсов."""
+
+
+class Connection:
+    """
+    Постоянное HTTP/1.1 соединение с конвейерной отправкой запросов.
+
+    Запросы пишутся в сокет, не дожидаясь ответов на предыдущие,
+    а ответы читаются одной задачей в порядке отправки.
+    """
+
+    def __init__(self, reader, writer):
+        """Запускает задачу чтения ответов."""
+        self.reader = reader
+        self.writer = writer
+        self.waiters = deque()
+        self.closed = False
+        self.reader_task = asyncio.get_running_loop().create_task(
+            self.read_responses()
+        )
+
+    @property
+    def in_flight(self):
+        """Число запросов, ожидающих ответа."""
+        return len(self.waiters)
+
+    def send(self, request):
+        """Отправляет запрос и возвращает future с ответом."""
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        self.writer.write(request)
+        return future
+
+    async def read_responses(self):
+        """Читает ответы и раздаёт их ожидающим запросам по порядку."""
+        try:
+            while True:
+                response = await read_response(self.reader)
+                if not self.waiters:
+                    break
+                future = self.waiters.popleft()
+                if not future.done():
+                    future.set_result(response)
+                if response.headers.get('connection') == 'close':
+                    break
+        except (OSError, asyncio.IncompleteReadError, TransportError) as error:
+            self.fail(TransportError(CONNECTION_CLOSED.format(error)))
+        self.fail(TransportError(CONNECTION_CLOSED.format('EOF')))
+
+    def fail(self, error):
+        """Закрывает соединение и отменяет все ожидающие запросы."""
+        self.closed = True
+        while self.waiters:
+            future = self.waiters.popleft()
+            if not future.done():
+                future.set_exception(error)
+        self.writer.close()
+
+
+async def read_response(reader):
+    """Читает один HTTP/1.1 ответ из потока."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise TransportError(CONNECTION_CLOSED.format('EOF'))
+    parts = status_line.decode('latin-1').split(' ', 2)
+    if len(parts) < 2 or not parts[1].isdigit():
+        raise TransportError(BAD_STATUS_LINE.format(status_line))
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        content = await read_chunked(reader)
+    elif 'content-length' in headers:
+        content = await reader.readexactly(int(headers['content-length']))
+    else:
+        headers['connection'] = 'close'
+        content = await reader.read()
+    return Response(int(parts[1]), content, headers)
+
+
+async def read_chunked(reader):
+    """Читает тело ответа в кодировке chunked."""
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        if not size:
+            break
+        chunks.append(await reader.readexactly(size))
+        await reader.readline()
+    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+        pass
+    return b''.join(chunks)
+
+
+class AsyncTransport:
+    """
+    Асинхронный транспорт с мультиплексированием запросов.
+
+    Запросы многих арендаторов идут поверх нескольких постоянных
+    HTTP/1.1 соединений с конвейеризацией.
+
+    Корутина fetch используется напрямую из asyncio-кода, а методы get
+    и get_many позволяют вызывать транспорт из обычных потоков: запросы
+    выполняются в собственном цикле событий транспорта.
+    """
+
+    def __init__(self, connections=4, pipeline_depth=64, timeout=30):
+        """Задаёт число соединений на хост и глубину конвейера."""
+        self.connections = connections
+        self.pipeline_depth = pipeline_depth
+        self.timeout = timeout
+        self.pools = {}
+        self.slots = {}
+        self.locks = {}
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.connections_opened = 0
+
+    def ensure_loop(self):
+        """Запускает цикл событий транспорта в фоновом потоке."""
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(
+                    target=self.loop.run_forever,
+                    name='async-transport', daemon=True
+                )
+                self.thread.start()
+        return self.loop
+
+    async def connection(self, origin):
+        """Возвращает наименее загруженное соединение с хостом."""
+        async with self.locks.setdefault(origin, asyncio.Lock()):
+            pool = [
+                conn for conn in self.pools.get(origin, [])
+                if not conn.closed
+            ]
+            self.pools[origin] = pool
+            if len(pool) >= self.connections:
+                return min(pool, key=lambda conn: conn.in_flight)
+            scheme, host, port = origin
+            context = None
+            if scheme == 'https':
+                context = ssl.create_default_context()
+            reader, writer = await asyncio.open_connection(
+                host, port, ssl=context
+            )
+            self.connections_opened += 1
+            conn = Connection(reader, writer)
+            pool.append(conn)
+            return conn
+
+    async def exchange(self, origin, request):
+        """
+        Отправляет запрос по соединению с хостом и ждёт ответ.
+
+        Ожидание соединения, его установка с рукопожатием TLS и ответ
+        укладываются в одно время ожидания fetch.
+        """
+        conn = await self.connection(origin)
+        return await conn.send(request)
+
+    async def fetch(self, url, headers=None, params=None):
+        """Выполняет GET-запрос и возвращает Response."""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        origin = (parts.scheme, parts.hostname, port)
+        target = parts.path or '/'
+        query = '&'.join(filter(None, [parts.query, urlencode(params or {})]))
+        if query:
+            target = f'{target}?{query}'
+        lines = [
+            f'GET {target} HTTP/1.1',
+            f'Host: {parts.netloc}',
+            'Accept: application/json',
+            'Connection: keep-alive',
+        ]
+        lines += [
+            f'{name}: {value}' for name, value in (headers or {}).items()
+        ]
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        if origin not in self.slots:
+            self.slots[origin] = asyncio.Semaphore(
+                self.connections * self.pipeline_depth
+            )
+        async with self.slots[origin]:
+            for attempt in range(2):
+                try:
+                    return await asyncio.wait_for(
+                        self.exchange(origin, request), self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise TransportError(
+                        REQUEST_TIMEOUT.format(self.timeout, url)
+                    )
+                except (OSError, TransportError) as error:
+                    if attempt:
+                        raise TransportError(error) from error
+
+    def get(self, url, headers=None, params=None):
+        """Выполняет GET-запрос из обычного потока."""
+        return asyncio.run_coroutine_threadsafe(
+            self.fetch(url, headers=headers, params=params),
+            self.ensure_loop()
+        ).result()
+
+    def get_many(self, requests_params):
+        """
+        Выполняет пачку запросов конкурентно.
+
+            Параметры:
+                requests_params (list): словари с ключами url, headers, params.
+            Возвращаемое значение (list): Response или исключение
+                для каждого запроса в исходном порядке.
+        """
+        async def gather():
+            return await asyncio.gather(
+                *(self.fetch(**params) for params in requests_params),
+                return_exceptions=True
+            )
+        return asyncio.run_coroutine_threadsafe(
+            gather(), self.ensure_loop()
+        ).result()
+
+    def close(self):
+        """Закрывает соединения и останавливает цикл событий."""
+        if self.loop is None:
+            return
+
+        async def close_all():
+            for pool in self.pools.values():
+                for conn in pool:
+                    conn.writer.close()
+                    conn.reader_task.cancel()
+            self.pools.clear()
+
+        asyncio.run_coroutine_threadsafe(close_all(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = None
+
+
+TRANSPORTS = {
+    'requests': RequestsTransport,
+    'async': AsyncTransport,
+}
+
+
+def create_transport(name, timeout=30):
+    """Создаёт транспорт по имени с временем ожидания ответа timeout."""
+    if name not in TRANSPORTS:
+        raise ValueError(UNKNOWN_TRANSPORT.format(name, ', '.join(TRANSPORTS)))
+    return TRANSPORTS[name](timeout=timeout)
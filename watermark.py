@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import threading
+import time
+
+from history import parse_date
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS watermarks (
+    tenant TEXT PRIMARY KEY,
+    checkpoint TEXT NOT NULL,
+    saved_at INTEGER NOT NULL
+)
+'''
+UPSERT = '''
+INSERT INTO watermarks (tenant, checkpoint, saved_at) VALUES (?, ?, ?)
+ON CONFLICT (tenant) DO UPDATE SET
+    checkpoint = excluded.checkpoint, saved_at = excluded.saved_at
+'''
+SAVED_INDEX = '''
+CREATE INDEX IF NOT EXISTS watermarks_saved_at ON watermarks (saved_at)
+'''
+SELECT = 'SELECT checkpoint FROM watermarks WHERE tenant = ?'
+SELECT_SAVED_AFTER = 'SELECT tenant FROM watermarks WHERE saved_at >= ?'
+
+
+def advance(timestamp, current_date, pending=(), overlap=0):
+    """
+    Следующее значение from_date.
+
+    Водяной знак сдвигается к current_date сервера на каждом успешном
+    опросе, даже если изменений не было, поэтому окно ответа не растёт
+    со временем работы бота. overlap секунд перекрытия покрывают
+    расхождение часов; повторно пришедшие работы отсекает снимок.
+    Работы с недоставленными уведомлениями удерживают знак не позже
+    своего date_updated, чтобы API вернул их снова. Назад знак
+    не сдвигается.
+
+        Параметры:
+            timestamp (int): текущий from_date.
+            current_date: current_date из ответа API или None.
+            pending (iterable): работы с недоставленными уведомлениями.
+            overlap (int): перекрытие в секундах.
+        Возвращаемое значение (int): новый from_date.
+    """
+    try:
+        target = int(current_date)
+        for homework in pending:
+            updated = parse_date(homework.get('date_updated'))
+            if updated is None:
+                return timestamp
+            target = min(target, updated)
+    except (AttributeError, TypeError, ValueError):
+        return timestamp
+    return max(timestamp, target - overlap)
+
+
+class WatermarkStore:
+    """
+    Водяные знаки арендаторов в SQLite.
+
+    Вместе с from_date хранится снимок работ, поэтому после перезапуска
+    опрос продолжается с сохранённого знака, а работы из перекрытия
+    не присылаются повторно. Запись пропускается, если checkpoint
+    не изменился с прошлого сохранения.
+    """
+
+    def __init__(self, path, clock=time.time):
+        """Открывает базу и создаёт схему."""
+        self.connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False
+        )
+        self.connection.execute(SCHEMA)
+        self.connection.execute(SAVED_INDEX)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.saved = {}
+
+    def load(self, tenant):
+        """Сохранённый checkpoint арендатора или None."""
+        with self.lock:
+            row = self.connection.execute(SELECT, (str(tenant),)).fetchone()
+        if row is None:
+            return None
+        self.saved[str(tenant)] = row[0]
+        return json.loads(row[0])
+
+    def saved_after(self, moment):
+        """
+        Арендаторы, чей checkpoint сохранён не раньше moment.
+
+        saved_at хранится в целых секундах, поэтому moment округляется
+        вниз: при равенстве свежее считается хранилище.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                SELECT_SAVED_AFTER, (int(moment),)
+            ).fetchall()
+        return {tenant for tenant, in rows}
+
+    def save(self, tenant, checkpoint):
+        """Сохраняет checkpoint арендатора, если он изменился."""
+        data = json.dumps(checkpoint, ensure_ascii=False)
+        if self.saved.get(str(tenant)) == data:
+            return
+        with self.lock, self.connection:
+            self.connection.execute(
+                UPSERT, (str(tenant), data, int(self.clock()))
+            )
+        self.saved[str(tenant)] = data